@@ -2,10 +2,10 @@ import os
 import json
 import logging
 import base64
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import threading
+import contextvars
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
+from service_pool import build_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +18,27 @@ scopes = [
 
 creds = None
 service = None
+_initialized = False
+_init_lock = threading.Lock()
+
+# Per-request calendar access, e.g. the signed-in user's service in /chat
+_bound_service = contextvars.ContextVar("calendar_service", default=None)
+_bound_credentials = contextvars.ContextVar("calendar_credentials", default=None)
+
+def bind_user(user_service, user_creds):
+    """Use this service/credentials for the rest of the current context"""
+    return _bound_service.set(user_service), _bound_credentials.set(user_creds)
+
+def unbind_user(tokens):
+    service_token, creds_token = tokens
+    _bound_service.reset(service_token)
+    _bound_credentials.reset(creds_token)
+
+def bound_service():
+    return _bound_service.get()
+
+def bound_credentials():
+    return _bound_credentials.get()
 
 def load_secrets(env_var):
     """Load and decode secrets from environment variable"""
@@ -41,8 +62,10 @@ def load_secrets(env_var):
         # Handle case where value is already a dict
         return value
 
-def initialize_credentials():
-    global creds, service
+def initialize_credentials(interactive=False):
+    """Load credentials from GOOGLE_TOKEN_JSON; with interactive=True, fall back
+    to the console OAuth flow, which waits for an authorization code on stdin"""
+    global creds
     
     # 1. Try loading from GOOGLE_TOKEN_JSON
     token_data = load_secrets("GOOGLE_TOKEN_JSON")
@@ -66,8 +89,14 @@ def initialize_credentials():
         logger.error(f"Secrets structure: {list(client_secrets.keys())}")
         return False
     
+    # A server must never wait on input(); run `python api_call.py` to mint a token
+    if not interactive:
+        logger.error("No GOOGLE_TOKEN_JSON; run `python api_call.py` to authorize and create one")
+        return False
+
     # 3. Generate new token via OAuth flow
     try:
+        from google_auth_oauthlib.flow import InstalledAppFlow
         flow = InstalledAppFlow.from_client_config(
             client_secrets,
             scopes
@@ -102,13 +131,30 @@ def initialize_credentials():
         logger.error(f"Authentication failed: {str(e)}")
         return False
 
-# Initialize credentials
-if initialize_credentials() and creds and creds.valid:
-    try:
-        service = build("calendar", "v3", credentials=creds)
-        logger.info("Calendar service initialized successfully")
-    except Exception as e:
-        logger.error(f"Calendar init error: {str(e)}")
-        service = None
-else:
-    logger.error("Calendar service NOT initialized - no valid credentials")
+def default_service():
+    """The process-wide calendar service, set up on first use (or by main.warmup)"""
+    global service, _initialized
+    if _initialized:
+        return service
+    with _init_lock:
+        if _initialized:
+            return service
+        # Initialize credentials
+        if initialize_credentials() and creds and creds.valid:
+            try:
+                service = build_service(creds)
+                logger.info("Calendar service initialized successfully")
+            except Exception as e:
+                logger.error(f"Calendar init error: {str(e)}")
+                service = None
+        else:
+            logger.error("Calendar service NOT initialized - no valid credentials")
+        _initialized = True
+    return service
+
+def default_credentials():
+    default_service()
+    return creds
+
+if __name__ == "__main__":
+    initialize_credentials(interactive=True)
@@ -0,0 +1,132 @@
+"""asyncio-native Google Calendar client.
+
+Mirrors the calls function.py makes through googleapiclient (list, get,
+insert, patch, delete, freebusy) on top of one pooled, keep-alive
+httpx.AsyncClient per event loop, so concurrent requests and tool calls can
+await calendar I/O without blocking the loop.
+"""
+import time
+import asyncio
+import logging
+import weakref
+import httpx
+import httplib2
+from googleapiclient.errors import HttpError
+import api_call
+from calendar_fields import fields_for, record
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.googleapis.com/calendar/v3"
+MAX_CONNECTIONS = 20
+TIMEOUT = 10.0
+PAGE_SIZE = 250
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_http(transport=None):
+    """The shared connection pool for the running event loop"""
+    loop = asyncio.get_running_loop()
+    http = _pools.get(loop)
+    if http is None or http.is_closed:
+        http = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            transport=transport,
+        )
+        _pools[loop] = http
+    return http
+
+
+async def close_http():
+    loop = asyncio.get_running_loop()
+    http = _pools.pop(loop, None)
+    if http is not None:
+        await http.aclose()
+
+
+class AsyncCalendarClient:
+    """Calendar API calls for one set of credentials over a shared connection pool.
+
+    Errors are raised as googleapiclient HttpError so callers can handle both
+    clients the same way.
+    """
+
+    def __init__(self, credentials, http=None):
+        self.credentials = credentials
+        self.http = http or get_http()
+
+    async def _authorization(self):
+        if not self.credentials.valid:
+            # Imported on first refresh: it pulls in requests
+            from google.auth.transport.requests import Request
+            # google-auth refreshes synchronously; keep it off the event loop
+            await asyncio.to_thread(self.credentials.refresh, Request())
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def _request(self, call_site, method, path, params=None, body=None):
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        mask = fields_for(call_site)
+        if mask and "fields" not in params:
+            params["fields"] = mask
+        response = await self.http.request(
+            method, path, params=params, json=body, headers=await self._authorization()
+        )
+        if response.status_code >= 300:
+            raise HttpError(httplib2.Response({"status": response.status_code}), response.content, uri=str(response.url))
+        if not response.content:
+            return None
+        started = time.perf_counter()
+        result = response.json()
+        record(call_site, len(response.content), time.perf_counter() - started)
+        return result
+
+    async def iter_events(self, time_min, time_max=None, calendar_id="primary", page_size=PAGE_SIZE):
+        """Async generator over events overlapping [time_min, time_max), one page at a time"""
+        page_token = None
+        while True:
+            result = await self._request("events.list", "GET", f"/calendars/{calendar_id}/events", params={
+                "timeMin": time_min.isoformat(),
+                "timeMax": time_max.isoformat() if time_max else None,
+                "singleEvents": "true",
+                "orderBy": "startTime",
+                "maxResults": page_size,
+                "pageToken": page_token,
+            })
+            for event in result.get("items", []):
+                yield event
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return
+
+    async def list_events(self, time_min, time_max=None, calendar_id="primary"):
+        return [event async for event in self.iter_events(time_min, time_max, calendar_id)]
+
+    async def get_event(self, event_id, calendar_id="primary"):
+        return await self._request("events.get", "GET", f"/calendars/{calendar_id}/events/{event_id}")
+
+    async def insert_event(self, body, calendar_id="primary"):
+        return await self._request("events.insert", "POST", f"/calendars/{calendar_id}/events", body=body)
+
+    async def patch_event(self, event_id, body, calendar_id="primary"):
+        return await self._request("events.patch", "PATCH", f"/calendars/{calendar_id}/events/{event_id}", body=body)
+
+    async def delete_event(self, event_id, calendar_id="primary"):
+        await self._request("events.delete", "DELETE", f"/calendars/{calendar_id}/events/{event_id}")
+
+    async def freebusy(self, time_min, time_max, calendar_ids=("primary",)):
+        return await self._request("freebusy.query", "POST", "/freeBusy", body={
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+        })
+
+
+def current_client():
+    """Client for the credentials bound to this request, else the process-wide ones"""
+    credentials = api_call.bound_credentials() or api_call.default_credentials()
+    if credentials is None:
+        raise RuntimeError("No Google credentials available for the async calendar client")
+    return AsyncCalendarClient(credentials)
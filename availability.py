@@ -0,0 +1,244 @@
+import bisect
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import pytz
+from event_cache import parse_event_time
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+DAY_MINUTES = 24 * 60
+SLOT_STEP = 30
+
+
+def to_minutes(time_str):
+    """'HH:MM' -> minutes since midnight"""
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or touching (start, end) pairs"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(block) for block in merged]
+
+
+class DayIndex:
+    """Busy intervals of one local day, in minutes since local midnight.
+
+    Keeps the individual events (for conflict reporting) and the merged busy
+    blocks (for free/busy questions), both sorted by start.
+    """
+
+    def __init__(self, date, entries):
+        self.date = date
+        self.entries = sorted(entries, key=lambda entry: (entry['start'], entry['end']))
+        self._entry_starts = [entry['start'] for entry in self.entries]
+        self.busy = merge_intervals((entry['start'], entry['end']) for entry in self.entries)
+        self._busy_starts = [start for start, _ in self.busy]
+
+    def _first_block(self, start):
+        """Index of the first merged block ending after start"""
+        i = bisect.bisect_right(self._busy_starts, start) - 1
+        if i >= 0 and self.busy[i][1] > start:
+            return i
+        return i + 1
+
+    def is_free(self, start, end):
+        i = self._first_block(start)
+        return i == len(self.busy) or self.busy[i][0] >= end
+
+    def conflicts(self, start, end):
+        """Events overlapping [start, end)"""
+        i = self._first_block(start)
+        if i == len(self.busy) or self.busy[i][0] >= end:
+            return []
+        # Every overlapping event lies inside a block from i onwards
+        lo = bisect.bisect_left(self._entry_starts, self.busy[i][0])
+        hi = bisect.bisect_left(self._entry_starts, end)
+        return [entry for entry in self.entries[lo:hi] if entry['end'] > start]
+
+    def free_gaps(self, start, end):
+        """Yield free (gap_start, gap_end) pairs inside [start, end)"""
+        cursor = start
+        for block_start, block_end in self.busy[self._first_block(start):]:
+            if block_start >= end:
+                break
+            if block_start > cursor:
+                yield cursor, block_start
+            cursor = max(cursor, block_end)
+        if cursor < end:
+            yield cursor, end
+
+    def free_slots(self, start, end, duration, step=SLOT_STEP):
+        """Yield slot start minutes of the given duration, stepping through each gap"""
+        for gap_start, gap_end in self.free_gaps(start, end):
+            slot = gap_start
+            while slot + duration <= gap_end:
+                yield slot
+                slot += step
+
+
+def iter_timed_events(events):
+    """(start, end, event) for each timed event, in input order.
+
+    All-day events do not block time slots and are left out.
+    """
+    for event in events:
+        if not event.get('start', {}).get('dateTime') or not event.get('end', {}).get('dateTime'):
+            continue
+        event_start = parse_event_time(event['start'])
+        event_end = parse_event_time(event['end'])
+        if event_start and event_end:
+            yield event_start, event_end, event
+
+
+def timed_events(events):
+    """iter_timed_events as a list sorted by start"""
+    return sorted(iter_timed_events(events), key=lambda item: item[0])
+
+
+def index_timed_events(timed, date, tz=IST):
+    day_start = tz.localize(datetime.strptime(date, '%Y-%m-%d'))
+    entries = []
+    for event_start, event_end, event in timed:
+        start = int((event_start - day_start).total_seconds() // 60)
+        end = int((event_end - day_start).total_seconds() // 60)
+        if end <= 0 or start >= DAY_MINUTES:
+            continue
+        entries.append({
+            'name': event.get('summary', 'Untitled Event'),
+            'start': max(start, 0),
+            'end': min(end, DAY_MINUTES),
+            'display_start': event_start.astimezone(tz).strftime('%H:%M'),
+            'display_end': event_end.astimezone(tz).strftime('%H:%M'),
+        })
+    return DayIndex(date, entries)
+
+
+def build_day_index(events, date, tz=IST):
+    """Index the timed events overlapping local day `date` (YYYY-MM-DD)"""
+    return index_timed_events(timed_events(events), date, tz)
+
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+INDEX_CACHE_SIZE = 64
+
+
+def cached_day_index(key, events, date):
+    """build_day_index, memoised on a caller-supplied key (e.g. a store version)"""
+    if key is None:
+        return build_day_index(events, date)
+    cache_key = (key, date)
+    with _index_cache_lock:
+        index = _index_cache.get(cache_key)
+        if index is not None:
+            _index_cache.move_to_end(cache_key)
+            return index
+    index = build_day_index(events, date)
+    with _index_cache_lock:
+        _index_cache[cache_key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def availability_report(index, start_time, end_time):
+    start = to_minutes(start_time)
+    end = to_minutes(end_time)
+    conflicts = [
+        {'name': entry['name'], 'start': entry['display_start'], 'end': entry['display_end']}
+        for entry in index.conflicts(start, end)
+    ]
+    return {
+        'available': len(conflicts) == 0,
+        'conflicts': conflicts,
+        'checked_period': f"{start_time} - {end_time}"
+    }
+
+
+def suggest_slots(index, duration_hours, preferred_time=None, day_start="09:00", day_end="23:00", limit=5):
+    slots = [
+        format_minutes(slot)
+        for slot in index.free_slots(to_minutes(day_start), to_minutes(day_end), int(duration_hours * 60))
+    ]
+    if preferred_time:
+        pref_hour = int(preferred_time.split(':')[0])
+        slots.sort(key=lambda x: abs(int(x.split(':')[0]) - pref_hour))
+    return slots[:limit]
+
+
+def iter_free_slots(events, start_date, end_date, duration_minutes, day_start="09:00", day_end="17:00",
+                    not_before=None, step=SLOT_STEP, tz=IST):
+    """Yield (date, minutes) free slots from start_date to end_date, day by day.
+
+    `events` must be ordered by start time and may be a lazy iterator (such as
+    function.iter_events): it is only read up to the day being walked, and each
+    day's index is only built when the walk reaches it, so a caller that stops
+    after a few slots never touches the rest of the range.
+    """
+    timed = iter_timed_events(events)
+    upcoming = next(timed, None)
+    window_start = to_minutes(day_start)
+    window_end = to_minutes(day_end)
+    day = datetime.strptime(start_date, '%Y-%m-%d')
+    last_day = datetime.strptime(end_date, '%Y-%m-%d')
+    active = []
+    while day <= last_day:
+        local_start = tz.localize(day)
+        local_end = tz.localize(day + timedelta(days=1))
+        while upcoming is not None and upcoming[0] < local_end:
+            active.append(upcoming)
+            upcoming = next(timed, None)
+        active = [item for item in active if item[1] > local_start]
+
+        date = day.strftime('%Y-%m-%d')
+        earliest = window_start
+        if not_before is not None:
+            if not_before >= local_end:
+                day += timedelta(days=1)
+                continue
+            if not_before > local_start:
+                elapsed = (not_before - local_start).total_seconds() / 60
+                earliest = max(earliest, -(-int(elapsed) // step) * step)
+
+        index = index_timed_events(active, date, tz)
+        for slot in index.free_slots(earliest, window_end, duration_minutes, step):
+            yield date, slot
+        day += timedelta(days=1)
+
+
+def first_free_slots(events, start_date, end_date, duration_hours, count=3, **kwargs):
+    """The first `count` free slots in the range, stopping as soon as they are found"""
+    slots = []
+    for date, slot in iter_free_slots(events, start_date, end_date, int(duration_hours * 60), **kwargs):
+        slots.append({'date': date, 'time': format_minutes(slot)})
+        if len(slots) >= count:
+            break
+    return slots
+
+
+def find_overlaps(intervals):
+    """Yield (tag, tag) for every pair of overlapping (start, end, tag) intervals, in one sweep"""
+    ordered = sorted(enumerate(intervals), key=lambda item: item[1][0])
+    active = []
+    for seq, (start, end, tag) in ordered:
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, tag
+        heapq.heappush(active, (end, seq, tag))
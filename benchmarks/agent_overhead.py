@@ -0,0 +1,55 @@
+"""Per-turn agent setup overhead, before and after caching the compiled graph.
+
+Run from the repository root:
+
+    python -m benchmarks.agent_overhead [turns]
+
+"Rebuilt" repeats what every message used to do: create the tools, compile
+the graph and bind the tools to the model (twice, for an agent step before
+and after a tool call). "Cached" is the lookup a turn now does. No model or
+calendar calls are made.
+"""
+import os
+import sys
+import time
+import statistics
+
+# ChatGroq wants a key to be built; the benchmark never sends it a request
+os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark_only")
+
+import llm
+
+
+def rebuilt_turn():
+    graph = llm.create_agent_graph(llm.create_tools())
+    for _ in range(2):
+        llm.chat_model().bind_tools(llm.create_tools())
+    return graph
+
+
+def cached_turn():
+    graph, _ = llm.get_agent()
+    for _ in range(2):
+        llm.bound_model()
+    return graph
+
+
+def measure(turn, turns):
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        turn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(turns=200):
+    llm.get_agent()
+    for name, turn in (("rebuilt", rebuilt_turn), ("cached", cached_turn)):
+        timings = measure(turn, turns)
+        print(f"{name:>8}: mean {statistics.mean(timings):.3f} ms, "
+              f"median {statistics.median(timings):.3f} ms over {turns} turns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,156 @@
+"""End-to-end latency of a chat turn, offline.
+
+Run from the repository root:
+
+    python -m benchmarks.e2e_latency [turns] [model latency seconds] [--cold]
+
+Runs the scenarios from test_llm.py through the real agent graph, tools and
+caches, with fake_llm.ScriptedChatModel in place of Groq and
+fake_calendar.LocalCalendarHttp in place of Google Calendar. Two paths are
+timed: "agent" is llm.process_message, and "chat" is the async stack /chat
+runs (response cache, router, prefetch, agent). The response cache is
+cleared before every turn so each turn does the work; --cold also empties
+the event store, so every turn syncs the calendar again.
+
+Per scenario it reports p50/p95 turn latency, model and Calendar API calls
+per turn, and the peak memory allocated during a turn (measured in a separate
+pass, so tracing does not skew the timings).
+"""
+import sys
+import time
+import asyncio
+import logging
+import statistics
+import tracemalloc
+from datetime import datetime
+from langchain_core.messages import HumanMessage
+import api_call
+import async_calendar
+import event_cache
+import function
+import llm
+import response_cache
+from availability import IST
+from fake_calendar import build_local_service, local_async_transport, sample_events
+from fake_llm import ScriptedChatModel
+
+# Per-turn INFO logging would dominate the timings
+logging.disable(logging.INFO)
+
+# The conversations test_llm.py sends to the live services
+SCENARIOS = {
+    "book": "Schedule a meeting tomorrow at 2pm for 1 hour",
+    "agenda": "What's on my calendar tomorrow?",
+    "empty": "",
+}
+
+
+class StaticCredentials:
+    valid = True
+    token = "benchmark-token"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Harness:
+    def __init__(self, latency, cold):
+        self.cold = cold
+        self.service = build_local_service(sample_events(datetime.now(IST).strftime("%Y-%m-%d")))
+        self.http = self.service._http
+        self.model = ScriptedChatModel(latency=latency)
+        self.saved = function.service, llm._agent
+        function.service = self.service
+        llm._agent = (llm.create_agent_graph(llm.create_tools()), self.model)
+
+    def close(self):
+        function.service, llm._agent = self.saved
+        event_cache.clear_stores()
+
+    def reset(self):
+        response_cache.cache.clear()
+        if self.cold:
+            event_cache.clear_stores()
+
+    def counts(self):
+        return self.model.calls, len(self.http.requests)
+
+    def agent_turn(self, message):
+        llm.process_message([HumanMessage(content=message)])
+
+    async def chat_turn(self, message):
+        await response_cache.aprocess_message([HumanMessage(content=message)])
+
+
+def measure(harness, turn, turns, traced=False):
+    timings, model_calls, api_calls, peaks = [], [], [], []
+    for _ in range(turns):
+        harness.reset()
+        models_before, api_before = harness.counts()
+        if traced:
+            tracemalloc.reset_peak()
+            started_memory = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        turn()
+        timings.append((time.perf_counter() - started) * 1000)
+        if traced:
+            peaks.append((tracemalloc.get_traced_memory()[1] - started_memory) / 1024)
+        models_after, api_after = harness.counts()
+        model_calls.append(models_after - models_before)
+        api_calls.append(api_after - api_before)
+    return timings, model_calls, api_calls, peaks
+
+
+def report(path, scenario, timings, model_calls, api_calls, peaks):
+    print(f"{path:>6} {scenario:>7}: p50 {percentile(timings, 0.5):8.2f} ms, p95 {percentile(timings, 0.95):8.2f} ms, "
+          f"{statistics.mean(model_calls):.1f} model calls, {statistics.mean(api_calls):.1f} API calls, "
+          f"peak {statistics.mean(peaks):.0f} KiB per turn")
+
+
+def run_path(harness, path, turn_for, turns):
+    for scenario, message in SCENARIOS.items():
+        turn = turn_for(message)
+        # One untimed turn fills lazy imports and the compiled graph's caches
+        measure(harness, turn, 1)
+        timings, model_calls, api_calls, _ = measure(harness, turn, turns)
+        tracemalloc.start()
+        try:
+            peaks = measure(harness, turn, max(1, turns // 5), traced=True)[3]
+        finally:
+            tracemalloc.stop()
+        report(path, scenario, timings, model_calls, api_calls, peaks)
+
+
+async def open_local_http(http):
+    # The pool belongs to the running loop, so it is created from inside it
+    async_calendar.get_http(transport=local_async_transport(http))
+
+
+def main(turns=50, latency=0.0, cold=False):
+    harness = Harness(latency, cold)
+    try:
+        run_path(harness, "agent", lambda message: lambda: harness.agent_turn(message), turns)
+
+        # The async path shares one event loop, like a server process
+        loop = asyncio.new_event_loop()
+        tokens = api_call.bind_user(harness.service, StaticCredentials())
+        try:
+            loop.run_until_complete(open_local_http(harness.http))
+            run_path(harness, "chat", lambda message: lambda: loop.run_until_complete(harness.chat_turn(message)), turns)
+        finally:
+            api_call.unbind_user(tokens)
+            loop.run_until_complete(async_calendar.close_http())
+            loop.close()
+    finally:
+        harness.close()
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(
+        int(args[0]) if args else 50,
+        float(args[1]) if len(args) > 1 else 0.0,
+        cold="--cold" in sys.argv,
+    )
@@ -0,0 +1,81 @@
+"""Cold-start cost: importing the app, then warming it up.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time [runs] [module]
+
+Each run starts a fresh interpreter, so nothing is cached but the bytecode
+(one untimed run writes it first). Reports the median and best wall time to
+import the module (main by default) with interpreter startup subtracted, the
+heaviest imports under it from -X importtime, which lazily loaded
+dependencies were pulled in anyway, and how long main.warmup() takes.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import statistics
+
+# Loaded on first use rather than at import; listed if an import drags them in
+LAZY_MODULES = ["langchain_groq", "datefinder", "google_auth_oauthlib", "google.auth.transport.requests"]
+
+# warmup() builds ChatGroq, which wants a key; nothing is sent to Groq
+ENV = dict(os.environ, GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "gsk_benchmark_only"))
+
+
+def run(code, *flags, env=ENV):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, result
+
+
+def wall_times(code, runs):
+    run(code)
+    return [run(code)[0] for _ in range(runs)]
+
+
+def heaviest(module, limit=12):
+    """(cumulative seconds, name) for the costliest imports up to two levels below module"""
+    _, result = run(f"import {module}", "-X", "importtime")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 2 and cumulative.strip().isdigit():
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def loaded_lazy_modules(module):
+    code = f"import sys, json, {module}; print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+    return json.loads(run(code)[1].stdout.strip().splitlines()[-1])
+
+
+def warmup_seconds():
+    code = "import json, main; print(json.dumps(main.warmup()))"
+    # Warmup opens the session database; keep it out of the checkout
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(ENV, SESSION_DB=os.path.join(directory, "sessions.db"))
+        return json.loads(run(code, env=env)[1].stdout.strip().splitlines()[-1])
+
+
+def main(runs=5, module="main"):
+    baseline = statistics.median(wall_times("pass", runs))
+    timings = [seconds - baseline for seconds in wall_times(f"import {module}", runs)]
+    print(f"import {module}: median {statistics.median(timings):.3f}s, best {min(timings):.3f}s "
+          f"over {runs} fresh interpreters (startup {baseline:.3f}s excluded)")
+    print("heaviest imports (cumulative):")
+    for seconds, name in heaviest(module):
+        print(f"  {seconds:7.3f}s  {name}")
+    print(f"lazy dependencies loaded at import: {', '.join(loaded_lazy_modules(module)) or 'none'}")
+    if module == "main":
+        steps = warmup_seconds()
+        print("warmup: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in steps.items()))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5, sys.argv[2] if len(sys.argv) > 2 else "main")
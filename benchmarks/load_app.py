@@ -0,0 +1,41 @@
+"""main.app with the network swapped out, served by benchmarks.load_throughput.
+
+Every uvicorn worker that imports this module gets its own
+fake_llm.ScriptedChatModel, answering after LOAD_MODEL_LATENCY seconds, and
+a fake_calendar service holding two weeks of sample events. Everything else
+is the real stack: routing, caches, budgets, the concurrency limit and the
+session checkpoints in SESSION_DB.
+"""
+import os
+import logging
+from datetime import datetime
+import api_call
+import async_calendar
+import llm
+import main
+from availability import IST
+from fake_calendar import build_local_service, local_async_transport, sample_events
+from fake_llm import ScriptedChatModel
+
+LATENCY = float(os.getenv("LOAD_MODEL_LATENCY", "0.1"))
+
+# Per-request INFO logging would dominate the timings
+logging.disable(logging.INFO)
+
+
+class StaticCredentials:
+    valid = True
+    token = "benchmark-token"
+
+
+service = build_local_service(sample_events(datetime.now(IST).strftime("%Y-%m-%d")))
+# What warmup would have loaded from GOOGLE_TOKEN_JSON
+api_call.service, api_call.creds, api_call._initialized = service, StaticCredentials(), True
+llm._agent = (llm.create_agent_graph(llm.create_tools()), ScriptedChatModel(latency=LATENCY))
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http":
+        # The Calendar connection pool belongs to the worker's event loop
+        async_calendar.get_http(transport=local_async_transport(service._http))
+    await main.app(scope, receive, send)
@@ -0,0 +1,127 @@
+"""Chat throughput as uvicorn workers are added, offline.
+
+Run from the repository root:
+
+    python -m benchmarks.load_throughput [requests] [clients] [workers ...]
+
+For each worker count (1, 2 and 4 by default) this starts
+`uvicorn benchmarks.load_app:app --workers N`: the real app with a scripted
+model (LOAD_MODEL_LATENCY seconds per call) and a local calendar. Then
+clients concurrent connections send requests booking turns to /chat, each in
+a new session. It reports requests per second, the speedup over the first
+worker count, p50/p95 latency, and how many requests got a 503.
+
+Each worker runs at most CHAT_CONCURRENCY turns at once (2 here unless set),
+so a worker's throughput is capped at about CHAT_CONCURRENCY turns per turn
+latency. More workers raise the cap until clients or CPUs run out.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import subprocess
+import httpx
+
+MESSAGE = "Schedule a meeting tomorrow at 2pm for 1 hour"
+STARTUP_TIMEOUT = 60
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port, directory):
+    env = dict(
+        os.environ,
+        SESSION_DB=os.path.join(directory, f"sessions-{workers}.db"),
+        CHAT_CONCURRENCY=os.environ.get("CHAT_CONCURRENCY", "2"),
+        CHAT_QUEUE_TIMEOUT=os.environ.get("CHAT_QUEUE_TIMEOUT", "30"),
+        # Every request is a new booking; nothing to serve from the cache
+        RESPONSE_CACHE="0",
+    )
+    command = [sys.executable, "-m", "uvicorn", "benchmarks.load_app:app", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(command, env=env)
+
+
+def wait_until_ready(url, server):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {server.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not answer {url} within {STARTUP_TIMEOUT}s")
+
+
+async def load(url, requests, clients):
+    """(seconds, latencies of answered requests, status codes) for requests /chat calls"""
+    queue = asyncio.Queue()
+    for number in range(requests):
+        queue.put_nowait(number)
+    latencies, statuses = [], []
+
+    async def client(http):
+        while not queue.empty():
+            number = queue.get_nowait()
+            started = time.perf_counter()
+            response = await http.post("/chat", json={"session_id": f"load-{number}", "message": MESSAGE})
+            statuses.append(response.status_code)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as http:
+        # Every worker has built its agent and opened its session database before timing
+        await asyncio.gather(*(http.post("/chat", json={"session_id": f"warm-{n}", "message": MESSAGE}) for n in range(clients)))
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        return time.perf_counter() - started, latencies, statuses
+
+
+def run(workers, requests, clients, directory):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = start_server(workers, port, directory)
+    try:
+        wait_until_ready(url + "/", server)
+        return asyncio.run(load(url, requests, clients))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(requests=200, clients=16, worker_counts=(1, 2, 4)):
+    print(f"{requests} requests from {clients} clients, CHAT_CONCURRENCY={os.environ.get('CHAT_CONCURRENCY', '2')} "
+          f"per worker, model latency {os.environ.get('LOAD_MODEL_LATENCY', '0.1')}s per call, {os.cpu_count()} CPUs")
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in worker_counts:
+            seconds, latencies, statuses = run(workers, requests, clients, directory)
+            throughput = requests / seconds
+            baseline = baseline or throughput
+            print(f"{workers} worker(s): {throughput:7.1f} req/s ({throughput / baseline:.2f}x), "
+                  f"p50 {percentile(latencies or [0], 0.5) * 1000:7.1f} ms, p95 {percentile(latencies or [0], 0.95) * 1000:7.1f} ms, "
+                  f"{statuses.count(503)} busy (503), {len(statuses) - statuses.count(200) - statuses.count(503)} errors")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(
+        args[0] if args else 200,
+        args[1] if len(args) > 1 else 16,
+        tuple(args[2:]) or (1, 2, 4),
+    )
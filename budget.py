@@ -0,0 +1,117 @@
+"""Per-request limits on the agent loop.
+
+Each request may make at most AGENT_MAX_ITERATIONS rounds of tool calls,
+spend AGENT_MAX_TOKENS model tokens and run for AGENT_DEADLINE seconds. The
+counters travel in the graph state and are reset by initial_state() at the
+start of every request. When a limit is hit the graph stops calling tools and
+ends with a partial answer; the reason is kept on that last message and
+counted here.
+"""
+import os
+import time
+import logging
+import threading
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+logger = logging.getLogger(__name__)
+
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "6"))
+AGENT_DEADLINE = float(os.getenv("AGENT_DEADLINE", "30"))
+AGENT_MAX_TOKENS = int(os.getenv("AGENT_MAX_TOKENS", "24000"))
+
+ITERATIONS, DEADLINE, TOKENS = "iterations", "deadline", "tokens"
+
+CUTOFF_MESSAGES = {
+    DEADLINE: "I ran out of time before I could finish this request.",
+    TOKENS: "This request got too long for me to finish in one go.",
+    ITERATIONS: "I couldn't finish this request within the number of steps I'm allowed.",
+}
+SKIPPED_RESULT = '{"ok":false,"error":"skipped: request budget exhausted"}'
+
+_stats = {"requests": 0, "completed": 0, "stopped": {ITERATIONS: 0, DEADLINE: 0, TOKENS: 0}, "iterations": 0, "tokens": 0}
+_stats_lock = threading.Lock()
+
+
+def initial_state(conversation, deadline=None):
+    """Graph input for one request, with fresh counters"""
+    deadline = AGENT_DEADLINE if deadline is None else deadline
+    return {"messages": conversation, "iterations": 0, "tokens": 0, "deadline": time.time() + deadline, "stop_reason": None}
+
+
+def remaining(state):
+    """Seconds left before the request's deadline"""
+    deadline = state.get("deadline")
+    return float("inf") if deadline is None else deadline - time.time()
+
+
+def exhausted(state, tool_round=False):
+    """The limit this request has run into, or None.
+
+    tool_round is True when the model has just asked for another round of tools.
+    """
+    if state.get("stop_reason"):
+        return state["stop_reason"]
+    if remaining(state) <= 0:
+        return DEADLINE
+    if state.get("tokens", 0) >= AGENT_MAX_TOKENS:
+        return TOKENS
+    if tool_round and state.get("iterations", 0) > AGENT_MAX_ITERATIONS:
+        return ITERATIONS
+    return None
+
+
+def tokens_used(messages, response):
+    """Tokens billed for one model call, estimated when the provider doesn't say"""
+    # A rejected small-model attempt before this reply was paid for too
+    extra = (getattr(response, "response_metadata", None) or {}).get("escalation_tokens", 0)
+    usage = getattr(response, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"] + extra
+    return count_tokens_approximately(list(messages) + [response]) + extra
+
+
+def skipped_results(state):
+    """Tool results for calls that will not run, so the history stays valid for the next turn"""
+    last = state["messages"][-1] if state["messages"] else None
+    return [
+        ToolMessage(content=SKIPPED_RESULT, name=call["name"], tool_call_id=call["id"])
+        for call in getattr(last, "tool_calls", None) or []
+    ]
+
+
+def cutoff_message(reason, answer=None):
+    """The partial answer the graph ends with, tagged with why it stopped"""
+    content = f"{answer}\n\n{CUTOFF_MESSAGES[reason]}" if answer else CUTOFF_MESSAGES[reason]
+    return AIMessage(content=content, response_metadata={"stop_reason": reason})
+
+
+def stop_reason(messages):
+    """Why the turn ending in messages stopped early, or None if it finished"""
+    for message in reversed(messages):
+        if message.type == "ai":
+            return (getattr(message, "response_metadata", None) or {}).get("stop_reason")
+    return None
+
+
+def record(state, reason):
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["iterations"] += state.get("iterations", 0)
+        _stats["tokens"] += state.get("tokens", 0)
+        if reason:
+            _stats["stopped"][reason] += 1
+        else:
+            _stats["completed"] += 1
+    if reason:
+        logger.warning(f"Agent stopped early ({reason}) after {state.get('iterations', 0)} model calls, {state.get('tokens', 0)} tokens")
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats, stopped=dict(_stats["stopped"]))
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(requests=0, completed=0, stopped={ITERATIONS: 0, DEADLINE: 0, TOKENS: 0}, iterations=0, tokens=0)
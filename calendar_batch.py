@@ -0,0 +1,63 @@
+import logging
+from calendar_fields import instrument, fields_for
+
+logger = logging.getLogger(__name__)
+
+# Calendar API limit on requests per batch
+BATCH_LIMIT = 50
+
+
+def execute_batch(service, requests, call_site=None):
+    """Send HttpRequests through batch HTTP requests, BATCH_LIMIT per round trip.
+
+    Returns one result per request, in the same order:
+    {'ok': bool, 'response': dict or None, 'error': exception or None}.
+    A failing item does not stop the others.
+    """
+    results = [None] * len(requests)
+    if call_site:
+        requests = [instrument(call_site, request) for request in requests]
+
+    def record(request_id, response, exception):
+        index = int(request_id)
+        results[index] = {
+            'ok': exception is None,
+            'response': response,
+            'error': exception,
+        }
+
+    for offset in range(0, len(requests), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=record)
+        for index, request in enumerate(requests[offset:offset + BATCH_LIMIT], start=offset):
+            batch.add(request, request_id=str(index))
+        try:
+            batch.execute()
+        except Exception as e:
+            # The whole round trip failed; mark whatever did not come back
+            logger.error(f"Batch request failed: {e}")
+            for index in range(offset, min(offset + BATCH_LIMIT, len(requests))):
+                if results[index] is None:
+                    results[index] = {'ok': False, 'response': None, 'error': e}
+    return results
+
+
+def delete_events(service, event_ids, calendar_id="primary"):
+    requests = [service.events().delete(calendarId=calendar_id, eventId=event_id) for event_id in event_ids]
+    return execute_batch(service, requests, "events.delete")
+
+
+def insert_events(service, bodies, calendar_id="primary"):
+    requests = [
+        service.events().insert(calendarId=calendar_id, body=body, fields=fields_for("events.insert"))
+        for body in bodies
+    ]
+    return execute_batch(service, requests, "events.insert")
+
+
+def patch_events(service, changes, calendar_id="primary"):
+    """changes: (event_id, partial body) pairs"""
+    requests = [
+        service.events().patch(calendarId=calendar_id, eventId=event_id, body=body, fields=fields_for("events.patch"))
+        for event_id, body in changes
+    ]
+    return execute_batch(service, requests, "events.patch")
@@ -0,0 +1,70 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = "id,summary,start,end,recurringEventId,status"
+
+# Partial-response masks, one per call site. None means the full resource is
+# needed, e.g. update_event reads an event and writes the whole body back.
+FIELD_MASKS = {
+    "events.list": f"nextPageToken,items({EVENT_FIELDS})",
+    "events.sync": f"nextPageToken,nextSyncToken,items({EVENT_FIELDS})",
+    "events.get": None,
+    "events.insert": EVENT_FIELDS,
+    "events.update": EVENT_FIELDS,
+    "events.patch": EVENT_FIELDS,
+    "freebusy.query": "calendars",
+}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def fields_for(call_site):
+    return FIELD_MASKS.get(call_site)
+
+
+def record(call_site, response_bytes, decode_seconds):
+    with _stats_lock:
+        stats = _stats.setdefault(call_site, {"calls": 0, "response_bytes": 0, "decode_seconds": 0.0})
+        stats["calls"] += 1
+        stats["response_bytes"] += response_bytes
+        stats["decode_seconds"] += decode_seconds
+    logger.debug(f"{call_site}: {response_bytes} bytes, decoded in {decode_seconds * 1000:.2f}ms")
+
+
+def instrument(call_site, request):
+    """Record the response size and JSON decode time of an HttpRequest under call_site.
+
+    Works for requests executed on their own or inside a batch, since both
+    hand the raw response to request.postproc.
+    """
+    postproc = getattr(request, "postproc", None)
+    if postproc is None:
+        return request
+
+    def measured(resp, content):
+        started = time.perf_counter()
+        try:
+            return postproc(resp, content)
+        finally:
+            record(call_site, len(content or b""), time.perf_counter() - started)
+
+    request.postproc = measured
+    return request
+
+
+def execute(call_site, request):
+    return instrument(call_site, request).execute()
+
+
+def get_stats():
+    with _stats_lock:
+        return {call_site: dict(stats) for call_site, stats in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
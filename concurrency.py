@@ -0,0 +1,101 @@
+"""How much chat work one worker process takes on at once.
+
+/chat and /chat/stream run on the event loop's natively async paths: model
+calls, calendar reads and the router's fast path are awaited. Blocking work
+(session checkpoints, the response cache's SQLite tier, write tools without a
+coroutine, OAuth refreshes) goes to the loop's default executor through
+asyncio.to_thread and LangChain's run_in_executor; use_executor() makes that a
+pool of BLOCKING_THREADS threads.
+
+At most CHAT_CONCURRENCY turns run at once per worker. Others queue for a
+slot, and a turn that waits longer than CHAT_QUEUE_TIMEOUT seconds is refused
+with Busy, so an overloaded worker answers quickly instead of piling up
+requests. Past one process, run more workers (WEB_CONCURRENCY in start.sh).
+"""
+import os
+import time
+import asyncio
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "16"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+BLOCKING_THREADS = int(os.getenv("BLOCKING_THREADS", "32"))
+
+# One semaphore per event loop: asyncio primitives belong to the loop they're used on
+_limits = weakref.WeakKeyDictionary()
+
+_stats = {"admitted": 0, "queued": 0, "rejected": 0, "in_flight": 0, "peak_in_flight": 0, "wait_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+class Busy(Exception):
+    """No turn slot freed up within CHAT_QUEUE_TIMEOUT"""
+
+
+def use_executor(loop=None):
+    """Make a pool of BLOCKING_THREADS the loop's default executor; returns the pool"""
+    executor = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="blocking")
+    (loop or asyncio.get_running_loop()).set_default_executor(executor)
+    return executor
+
+
+def limiter():
+    loop = asyncio.get_running_loop()
+    with _stats_lock:
+        limit = _limits.get(loop)
+        if limit is None:
+            limit = _limits[loop] = asyncio.Semaphore(CHAT_CONCURRENCY)
+    return limit
+
+
+async def acquire():
+    """Wait for a turn slot; returns a function that frees it (safe to call twice)"""
+    limit = limiter()
+    started = time.perf_counter()
+    queued = limit.locked()
+    if not queued:
+        # A free slot: taken without suspending, so no other turn can get in first
+        await limit.acquire()
+    else:
+        try:
+            await asyncio.wait_for(limit.acquire(), CHAT_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            with _stats_lock:
+                _stats["rejected"] += 1
+            raise Busy(f"All {CHAT_CONCURRENCY} chat slots stayed busy for {CHAT_QUEUE_TIMEOUT:g}s")
+    waited = time.perf_counter() - started
+    with _stats_lock:
+        _stats["admitted"] += 1
+        _stats["queued"] += queued
+        _stats["wait_seconds"] += waited
+        _stats["in_flight"] += 1
+        _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+
+    released = False
+
+    def release():
+        nonlocal released
+        if released:
+            return
+        released = True
+        limit.release()
+        with _stats_lock:
+            _stats["in_flight"] -= 1
+
+    return release
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_wait_seconds"] = stats["wait_seconds"] / stats["admitted"] if stats["admitted"] else 0.0
+    stats.update(limit=CHAT_CONCURRENCY, queue_timeout=CHAT_QUEUE_TIMEOUT, blocking_threads=BLOCKING_THREADS)
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        # in_flight counts live turns, so it survives a reset
+        _stats.update(admitted=0, queued=0, rejected=0, peak_in_flight=_stats["in_flight"], wait_seconds=0.0)
@@ -0,0 +1,20 @@
+import os
+import pytest
+
+# Tests that build the real agent construct ChatGroq, which wants a key; none calls Groq
+os.environ.setdefault("GROQ_API_KEY", "gsk_test_only")
+
+import sessions
+
+
+@pytest.fixture(autouse=True)
+def session_db(tmp_path, monkeypatch):
+    """Each test's sessions live in its own temporary database, never sessions.db in
+    the checkout, and the store is closed again afterwards (the app's shutdown closes
+    it too, so the next use reopens SESSION_DB)"""
+    path = str(tmp_path / "sessions.db")
+    monkeypatch.setenv("SESSION_DB", path)
+    monkeypatch.setattr(sessions, "SESSION_DB", path)
+    sessions.close()
+    yield path
+    sessions.close()
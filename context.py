@@ -0,0 +1,130 @@
+"""Keeps the model's context bounded as a session grows.
+
+The last CONTEXT_TURNS turns (a user message and everything the agent did in
+reply) go to the model verbatim, except that tool results from turns before
+the current one are cut to TOOL_RESULT_CHARS. Older turns are folded into a
+short running summary. If the result is still over CONTEXT_TOKEN_BUDGET, more
+turns are folded, oldest first; the current turn is always kept whole.
+
+Turns are split at user messages, so an assistant tool call and its tool
+results always stay together. The summary is built from the messages
+themselves, without another model call.
+"""
+import os
+import json
+import logging
+import threading
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TURNS = int(os.getenv("CONTEXT_TURNS", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+TOOL_RESULT_CHARS = 300
+SUMMARY_TEXT_CHARS = 160
+SUMMARY_LINES = 20
+
+_stats = {"calls": 0, "tokens_in": 0, "tokens_sent": 0, "tokens_trimmed": 0, "turns_folded": 0, "last_trimmed": 0}
+_stats_lock = threading.Lock()
+
+
+def count_tokens(messages):
+    return count_tokens_approximately(messages)
+
+
+def split_turns(messages):
+    """Lists of messages, each starting at a user message (the first may not)"""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def shorten(text, limit):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def compact_tool_results(turn):
+    compacted = []
+    for message in turn:
+        if isinstance(message, ToolMessage) and len(str(message.content)) > TOOL_RESULT_CHARS:
+            message = message.model_copy(update={"content": shorten(message.content, TOOL_RESULT_CHARS)})
+        compacted.append(message)
+    return compacted
+
+
+def summarize_turn(turn):
+    """One line for a folded turn: what was asked, which tools ran, what was answered"""
+    parts = []
+    for message in turn:
+        if message.type == "human":
+            parts.append(f"User: {shorten(message.content, SUMMARY_TEXT_CHARS)}")
+        elif message.type == "ai":
+            for call in getattr(message, "tool_calls", None) or []:
+                parts.append(f"called {call['name']}({shorten(json.dumps(call['args']), SUMMARY_TEXT_CHARS)})")
+    replies = [message for message in turn if message.type == "ai" and message.content]
+    if replies:
+        parts.append(f"Assistant: {shorten(replies[-1].content, SUMMARY_TEXT_CHARS)}")
+    return "- " + "; ".join(parts) if parts else None
+
+
+def summary_message(folded):
+    lines = [line for line in (summarize_turn(turn) for turn in folded) if line]
+    if not lines:
+        return None
+    dropped = len(lines) - SUMMARY_LINES
+    lines = lines[-SUMMARY_LINES:]
+    if dropped > 0:
+        lines.insert(0, f"- ({dropped} earlier exchanges omitted)")
+    return SystemMessage(content="Summary of the earlier conversation:\n" + "\n".join(lines))
+
+
+def build_context(messages, turns=None, budget=None):
+    """The messages to send in place of messages, within the token budget"""
+    turns = CONTEXT_TURNS if turns is None else turns
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    all_turns = split_turns(list(messages))
+    keep = max(1, min(turns, len(all_turns)))
+
+    def assemble(keep):
+        folded, kept = all_turns[:-keep], all_turns[-keep:]
+        # Earlier tool output has been acted on already; the current turn still needs it whole
+        recent = [compact_tool_results(turn) for turn in kept[:-1]] + [kept[-1]] if kept else []
+        summary = summary_message(folded)
+        return ([summary] if summary else []) + [message for turn in recent for message in turn]
+
+    context = assemble(keep)
+    while keep > 1 and count_tokens(context) > budget:
+        keep -= 1
+        context = assemble(keep)
+
+    tokens_in, tokens_sent = count_tokens(messages), count_tokens(context)
+    record(tokens_in, tokens_sent, len(all_turns) - keep)
+    return context
+
+
+def record(tokens_in, tokens_sent, turns_folded):
+    trimmed = max(tokens_in - tokens_sent, 0)
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["tokens_in"] += tokens_in
+        _stats["tokens_sent"] += tokens_sent
+        _stats["tokens_trimmed"] += trimmed
+        _stats["turns_folded"] += turns_folded
+        _stats["last_trimmed"] = trimmed
+    if trimmed:
+        logger.info(f"Context: {tokens_in} -> {tokens_sent} tokens ({trimmed} trimmed, {turns_folded} turns summarised)")
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(calls=0, tokens_in=0, tokens_sent=0, tokens_trimmed=0, turns_folded=0, last_trimmed=0)
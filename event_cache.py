@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import hashlib
+import bisect
+import itertools
+import logging
+import threading
+from datetime import datetime, timedelta
+from googleapiclient.errors import HttpError
+import pytz
+from calendar_fields import execute, fields_for
+
+logger = logging.getLogger(__name__)
+
+# Set EVENT_CACHE=0 to always go straight to events.list
+CACHE_ENABLED = os.getenv("EVENT_CACHE", "1") != "0"
+
+PAGE_SIZE = 250
+
+# Store tokens are never reused, unlike id() of a dropped store
+_tokens = itertools.count(1)
+
+
+def parse_event_time(value):
+    """Parse an event start/end dict into an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        if value.get("dateTime"):
+            dt = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                dt = pytz.UTC.localize(dt)
+            return dt.astimezone(pytz.UTC)
+        if value.get("date"):
+            return pytz.UTC.localize(datetime.strptime(value["date"], "%Y-%m-%d"))
+    except ValueError:
+        logger.warning(f"Unparseable event time: {value}")
+    return None
+
+
+def event_digest(event):
+    return int.from_bytes(hashlib.blake2b(json.dumps(event, sort_keys=True).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class EventStore:
+    """In-memory copy of one calendar, kept fresh with syncToken incremental syncs.
+
+    The first query does a full sync; later queries only fetch the changes since
+    the last sync, and not even that while the copy is younger than max_staleness
+    seconds. Writes made through function.py are applied locally right away.
+
+    Only events from lookback_days before the full sync on are copied; callers
+    check covers() and go to the API for anything earlier.
+    """
+
+    def __init__(self, service, calendar_id="primary", max_staleness=30, lookback_days=30):
+        self.service = service
+        self.calendar_id = calendar_id
+        self.max_staleness = max_staleness
+        self.lookback_days = lookback_days
+        self.token = next(_tokens)
+        self.version = 0
+        self._events = {}
+        self._bounds = {}
+        self._digests = {}
+        self._fingerprint = 0
+        self._ordered = None
+        self._sync_token = None
+        self._last_sync = None
+        self._window_start = None
+        self._lock = threading.RLock()
+
+    def sync(self, force=False):
+        with self._lock:
+            if self.is_fresh() and not force:
+                return
+            if self._sync_token:
+                try:
+                    self._incremental_sync()
+                except HttpError as e:
+                    if e.resp.status != 410:
+                        raise
+                    # Sync token expired, Google wants a full resync
+                    logger.info(f"Sync token for {self.calendar_id} expired, running full sync")
+                    self._full_sync()
+            else:
+                self._full_sync()
+            self._last_sync = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._last_sync = None
+
+    def query(self, time_min, time_max):
+        """Events overlapping [time_min, time_max), ordered by start time"""
+        return self.snapshot(time_min, time_max)[2]
+
+    def snapshot(self, time_min, time_max):
+        """(token, version, events) for query(), read together under the lock;
+        (token, version) identifies the events, e.g. as a cache key"""
+        self.sync()
+        with self._lock:
+            ordered = self._ordered_events()
+            starts = [start for start, _, _ in ordered]
+            stop = bisect.bisect_left(starts, time_max)
+            return self.token, self.version, [event for _, end, event in ordered[:stop] if end > time_min]
+
+    def upcoming(self, now, max_results=10):
+        self.sync()
+        with self._lock:
+            upcoming = [event for _, end, event in self._ordered_events() if end > now]
+            return upcoming[:max_results]
+
+    def bounds(self, event_id):
+        """Parsed (start, end) of a stored event, in UTC"""
+        with self._lock:
+            return self._bounds.get(event_id)
+
+    def put(self, event):
+        with self._lock:
+            self._apply([event])
+
+    def remove(self, event_id):
+        with self._lock:
+            self._apply([{"id": event_id, "status": "cancelled"}])
+
+    def fingerprint(self):
+        """Digest of the stored events; equal across processes for equal contents"""
+        with self._lock:
+            return f"{self._fingerprint:016x}"
+
+    def covers(self, time_min):
+        """True if events from time_min on are in the synced window"""
+        with self._lock:
+            window_start = self._window_start or datetime.now(pytz.UTC) - timedelta(days=self.lookback_days)
+        return time_min >= window_start
+
+    def is_fresh(self):
+        """True while queries can be answered without any API call"""
+        return (
+            self._sync_token is not None
+            and self._last_sync is not None
+            and time.monotonic() - self._last_sync < self.max_staleness
+        )
+
+    def _full_sync(self):
+        time_min = datetime.now(pytz.UTC) - timedelta(days=self.lookback_days)
+        items, self._sync_token = self._list_all(timeMin=time_min.isoformat())
+        self._window_start = time_min
+        self._events.clear()
+        self._bounds.clear()
+        self._digests.clear()
+        self._fingerprint = 0
+        self._apply(items)
+        logger.info(f"Full sync of {self.calendar_id}: {len(self._events)} events")
+
+    def _incremental_sync(self):
+        items, self._sync_token = self._list_all(syncToken=self._sync_token)
+        self._apply(items)
+
+    def _list_all(self, **params):
+        items = []
+        page_token = None
+        while True:
+            result = execute(
+                "events.sync",
+                self.service.events().list(
+                    calendarId=self.calendar_id,
+                    singleEvents=True,
+                    maxResults=PAGE_SIZE,
+                    pageToken=page_token,
+                    fields=fields_for("events.sync"),
+                    **params,
+                ),
+            )
+            items.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items, result.get("nextSyncToken")
+
+    def _apply(self, items):
+        # version only moves when the contents do, so caches keyed on it survive empty syncs
+        changed = False
+        for item in items:
+            event_id = item.get("id")
+            if not event_id:
+                continue
+            if item.get("status") == "cancelled":
+                if self._events.pop(event_id, None) is not None:
+                    self._fingerprint ^= self._digests.pop(event_id)
+                    changed = True
+                self._bounds.pop(event_id, None)
+                continue
+            start = parse_event_time(item.get("start"))
+            end = parse_event_time(item.get("end"))
+            if not start or not end:
+                continue
+            digest = event_digest(item)
+            previous = self._digests.get(event_id)
+            if previous == digest:
+                continue
+            if previous is not None:
+                self._fingerprint ^= previous
+            self._fingerprint ^= digest
+            self._digests[event_id] = digest
+            self._events[event_id] = item
+            self._bounds[event_id] = (start, end)
+            changed = True
+        if changed:
+            self._ordered = None
+            self.version += 1
+
+    def _ordered_events(self):
+        if self._ordered is None:
+            self._ordered = sorted(
+                (self._bounds[event_id] + (event,) for event_id, event in self._events.items()),
+                key=lambda entry: entry[0],
+            )
+        return self._ordered
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(service, calendar_id="primary"):
+    """Shared EventStore for a service/calendar pair"""
+    key = (id(service), calendar_id)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or store.service is not service:
+            store = EventStore(service, calendar_id)
+            _stores[key] = store
+        return store
+
+
+def drop_stores(service):
+    """Forget the stores of a service that is going away, e.g. evicted from the ServicePool"""
+    with _stores_lock:
+        for key in [key for key, store in _stores.items() if store.service is service]:
+            del _stores[key]
+
+
+def clear_stores():
+    with _stores_lock:
+        _stores.clear()
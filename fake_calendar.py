@@ -0,0 +1,234 @@
+"""Local stand-in for the Google Calendar HTTP API.
+
+LocalCalendarHttp answers the requests googleapiclient sends for an
+in-memory set of calendars, so a real service object can be exercised offline:
+
+    service = build_local_service(events)
+"""
+import json
+import uuid
+from datetime import datetime, timedelta
+from email.parser import FeedParser
+from urllib.parse import urlparse, parse_qs, unquote
+import httplib2
+import httpx
+from googleapiclient.discovery import build
+from event_cache import parse_event_time
+
+STATUS_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found"}
+
+
+def parse_fields(mask):
+    """'a,b(c,d)' -> {'a': None, 'b': {'c': None, 'd': None}}"""
+    def parse(position):
+        selection = {}
+        name = ""
+        while position < len(mask):
+            char = mask[position]
+            if char == "(":
+                selection[name.strip()], position = parse(position + 1)
+                name = ""
+            elif char == ")":
+                break
+            elif char == ",":
+                if name.strip():
+                    selection[name.strip()] = None
+                name = ""
+            else:
+                name += char
+            position += 1
+        if name.strip():
+            selection[name.strip()] = None
+        return selection, position
+    return parse(0)[0]
+
+
+def apply_fields(payload, selection):
+    """Trim a response the way Google's partial-response `fields` parameter does"""
+    if selection is None or payload is None or "*" in selection:
+        return payload
+    if isinstance(payload, list):
+        return [apply_fields(item, selection) for item in payload]
+    if not isinstance(payload, dict):
+        return payload
+    return {key: apply_fields(payload[key], sub) for key, sub in selection.items() if key in payload}
+
+
+class LocalCalendarHttp:
+    """httplib2.Http replacement serving events, freebusy and batch requests"""
+
+    def __init__(self, events=None, calendar_id="primary"):
+        self.calendars = {}
+        self.requests = []
+        self.add_calendar(calendar_id, events or [])
+
+    def add_calendar(self, calendar_id, events):
+        calendar = self.calendars[calendar_id] = {}
+        for event in events:
+            event = dict(event)
+            event.setdefault("id", uuid.uuid4().hex)
+            calendar[event["id"]] = event
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        url = urlparse(uri)
+        if url.path.rstrip("/").endswith("/batch/calendar/v3"):
+            self.requests.append((method, "batch"))
+            return self._batch(body, headers or {})
+        status, payload = self._dispatch(method, url.path, url.query, body)
+        return self._respond(status, payload)
+
+    def _dispatch(self, method, path, query, body):
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        parts = unquote(path).split("/calendar/v3/", 1)[-1].strip("/").split("/")
+        self.requests.append((method, "/".join(parts)))
+        payload = json.loads(body) if body else None
+        status, response = self._route(method, path, parts, params, payload)
+        if status < 300 and "fields" in params:
+            response = apply_fields(response, parse_fields(params["fields"]))
+        return status, response
+
+    def _route(self, method, path, parts, params, payload):
+        if method == "POST" and parts == ["freeBusy"]:
+            return 200, self._freebusy(payload)
+        if len(parts) >= 3 and parts[0] == "calendars" and parts[2] == "events":
+            calendar = self.calendars.get(parts[1])
+            if calendar is None:
+                return self._not_found(path)
+            if len(parts) == 3 and method == "GET":
+                return 200, self._list(calendar, params)
+            if len(parts) == 3 and method == "POST":
+                return 200, self._insert(calendar, payload)
+            if len(parts) == 4:
+                return self._event(calendar, method, parts[3], payload)
+        return self._not_found(path)
+
+    def _not_found(self, path):
+        return 404, {"error": {"code": 404, "message": f"Not Found: {path}"}}
+
+    def _respond(self, status, payload):
+        content = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        response = httplib2.Response({"status": status, "content-type": "application/json"})
+        return response, content
+
+    def _batch(self, body, headers):
+        parser = FeedParser()
+        parser.feed(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        boundary = "batch_" + uuid.uuid4().hex
+        chunks = []
+        for part in parser.close().get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            method, target, _ = request_line.split(" ", 2)
+            rest = rest.replace("\r\n", "\n")
+            body = rest.split("\n\n", 1)[1] if "\n\n" in rest else ""
+            url = urlparse(target)
+            status, payload = self._dispatch(method, url.path, url.query, body.strip() or None)
+            content = "" if payload is None else json.dumps(payload)
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {STATUS_REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json\r\n\r\n{content}\r\n"
+            )
+        content = "".join(chunks) + f"--{boundary}--\r\n"
+        response = httplib2.Response({"status": 200, "content-type": f"multipart/mixed; boundary={boundary}"})
+        return response, content.encode("utf-8")
+
+    def _overlapping(self, calendar, time_min, time_max):
+        matches = []
+        for event in calendar.values():
+            start = parse_event_time(event.get("start"))
+            end = parse_event_time(event.get("end"))
+            if not start or not end:
+                continue
+            if (time_max is None or start < time_max) and (time_min is None or end > time_min):
+                matches.append((start, end, event))
+        matches.sort(key=lambda item: item[0])
+        return matches
+
+    def _list(self, calendar, params):
+        time_min = parse_event_time({"dateTime": params["timeMin"]}) if "timeMin" in params else None
+        time_max = parse_event_time({"dateTime": params["timeMax"]}) if "timeMax" in params else None
+        items = [event for _, _, event in self._overlapping(calendar, time_min, time_max)]
+        offset = int(params.get("pageToken", 0))
+        page_size = int(params.get("maxResults", 250))
+        page = {"items": items[offset:offset + page_size]}
+        if offset + page_size < len(items):
+            page["nextPageToken"] = str(offset + page_size)
+        else:
+            page["nextSyncToken"] = "local"
+        return page
+
+    def _insert(self, calendar, event):
+        event = dict(event, id=event.get("id") or uuid.uuid4().hex, status="confirmed")
+        calendar[event["id"]] = event
+        return event
+
+    def _event(self, calendar, method, event_id, payload):
+        event = calendar.get(event_id)
+        if event is None:
+            return self._not_found(event_id)
+        if method == "GET":
+            return 200, event
+        if method == "DELETE":
+            del calendar[event_id]
+            return 204, None
+        if method == "PUT":
+            calendar[event_id] = dict(payload, id=event_id)
+            return 200, calendar[event_id]
+        if method == "PATCH":
+            event.update(payload)
+            return 200, event
+        return self._not_found(event_id)
+
+    def _freebusy(self, body):
+        time_min = parse_event_time({"dateTime": body["timeMin"]})
+        time_max = parse_event_time({"dateTime": body["timeMax"]})
+        calendars = {}
+        for item in body.get("items", []):
+            calendar_id = item["id"]
+            if calendar_id not in self.calendars:
+                calendars[calendar_id] = {"busy": [], "errors": [{"domain": "global", "reason": "notFound"}]}
+                continue
+            busy = [
+                {"start": max(start, time_min).isoformat(), "end": min(end, time_max).isoformat()}
+                for start, end, event in self._overlapping(self.calendars[calendar_id], time_min, time_max)
+                if event.get("transparency") != "transparent"
+            ]
+            calendars[calendar_id] = {"busy": busy}
+        return {
+            "kind": "calendar#freeBusy",
+            "timeMin": body["timeMin"],
+            "timeMax": body["timeMax"],
+            "calendars": calendars,
+        }
+
+
+def sample_events(start_date, days=14, per_day=4, tz_offset="+05:30"):
+    """A working calendar: per_day one-hour meetings from 10:00, every other hour, for days days"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    events = []
+    for day in range(days):
+        date = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+        for slot in range(per_day):
+            hour = 10 + 2 * slot
+            events.append({
+                "id": f"sample-{date}-{hour}",
+                "summary": f"Meeting {slot + 1}",
+                "start": {"dateTime": f"{date}T{hour:02d}:00:00{tz_offset}"},
+                "end": {"dateTime": f"{date}T{hour + 1:02d}:00:00{tz_offset}"},
+            })
+    return events
+
+
+def build_local_service(events=None, calendar_id="primary"):
+    """Calendar service backed by LocalCalendarHttp; no network calls are made"""
+    http = LocalCalendarHttp(events, calendar_id)
+    return build("calendar", "v3", http=http, static_discovery=True)
+
+
+def local_async_transport(http):
+    """httpx transport answering from a LocalCalendarHttp, for async_calendar"""
+    def handle(request):
+        response, content = http.request(str(request.url), request.method, body=request.content.decode("utf-8") or None)
+        return httpx.Response(response.status, content=content, headers={"content-type": response["content-type"]})
+    return httpx.MockTransport(handle)
@@ -0,0 +1,121 @@
+"""Local stand-in for the Groq chat model.
+
+ScriptedChatModel answers from a script instead of the network, after a
+configurable delay, so the agent graph can be run and timed offline:
+
+    model = ScriptedChatModel(script=calendar_script, latency=0.2)
+    llm._agent = (llm.create_agent_graph(tools), model)
+
+A script takes the messages sent to the model and returns the AIMessage to
+reply with. calendar_script plays a well-behaved scheduling agent: it checks
+availability for the date and time in the user's message, confirms bookings,
+and then answers from the tool results.
+"""
+import re
+import time
+import uuid
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+from availability import IST
+
+TIME_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b")
+DURATION_PATTERN = re.compile(r"\bfor (\d+) hours?\b")
+ISO_DATE_PATTERN = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+BOOKING_PATTERN = re.compile(r"\b(schedule|book|set up|arrange)\b")
+
+
+def tool_call(tool, **args):
+    return {"name": tool, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}
+
+
+def mentioned_date(text, now):
+    match = ISO_DATE_PATTERN.search(text)
+    if match:
+        return match.group(0)
+    days = 1 if "tomorrow" in text else 0
+    return (now + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def mentioned_time(text, default="09:00"):
+    match = TIME_PATTERN.search(text)
+    if not match:
+        return default
+    hour = int(match.group(1)) % 12 + (12 if match.group(3) == "pm" else 0)
+    return f"{hour:02d}:{match.group(2) or '00'}"
+
+
+def current_turn(messages):
+    """The latest user message's text and the tool results since"""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            results = [message for message in messages[index + 1:] if isinstance(message, ToolMessage)]
+            return str(messages[index].content).lower().strip(), results
+    return "", []
+
+
+def calendar_script(messages, now=None):
+    """One scheduling agent step for messages"""
+    text, results = current_turn(messages)
+    if not text:
+        return AIMessage(content="Hi! What would you like to schedule?")
+    now = now or datetime.now(IST)
+    date = mentioned_date(text, now)
+
+    if BOOKING_PATTERN.search(text):
+        start = mentioned_time(text)
+        duration = int(DURATION_PATTERN.search(text).group(1)) if DURATION_PATTERN.search(text) else 1
+        end = (datetime.strptime(start, "%H:%M") + timedelta(hours=duration)).strftime("%H:%M")
+        steps = [
+            tool_call("check_availability", date=date, start_time=start, end_time=end),
+            tool_call("confirm_booking_details", date=date, time=start, name="Meeting", duration=duration),
+        ]
+        final = f"You're free then. Shall I book the meeting on {date} at {start}?"
+    else:
+        steps = [tool_call("check_availability", date=date, start_time="00:00", end_time="23:59")]
+        final = f"Here's what I found for {date}: {results[-1].content[:200] if results else 'nothing'}"
+
+    if len(results) < len(steps):
+        return AIMessage(content="", tool_calls=[steps[len(results)]])
+    return AIMessage(content=final)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replies with script(messages) after latency seconds"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    script: Callable[[list], AIMessage] = calendar_script
+    latency: float = 0.0
+    _calls: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    def bind_tools(self, tools, **kwargs):
+        # The script decides which tools to call
+        return self
+
+    def _reply(self, messages):
+        with self._lock:
+            self._calls += 1
+        return ChatResult(generations=[ChatGeneration(message=self.script(messages))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
@@ -184,6 +184,52 @@ def send_to_api(message):
     except requests.exceptions.RequestException as e:
         return f"Connection error: {str(e)}"
 
+def stream_from_api(message, placeholder):
+    """Render the reply from /chat/stream into placeholder as it arrives; returns the full reply"""
+    payload = {
+        "session_id": st.session_state.session_id,
+        "message": message
+    }
+    text = ""
+    placeholder.markdown("_Thinking..._")
+
+    try:
+        with requests.post(
+            f"{API_URL}chat/stream",
+            json=payload,
+            headers={"Accept": "text/event-stream"},
+            stream=True,
+            # The read timeout applies between events, not to the whole reply
+            timeout=(10, 60)
+        ) as response:
+            if response.status_code != 200:
+                return send_to_api(message)
+
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event["type"] == "token":
+                    text += event["content"]
+                    placeholder.markdown(text + "▌")
+                elif event["type"] == "reset":
+                    # The step is being answered again by the larger model
+                    text = ""
+                    placeholder.markdown("_Thinking..._")
+                elif event["type"] == "tool" and event["status"] == "start":
+                    # Text before a tool call is the model thinking, not the answer
+                    text = ""
+                    placeholder.markdown(f"_{event['label']}_")
+                elif event["type"] == "done":
+                    text = event["response"] or "I didn't get a response from the assistant."
+                    placeholder.markdown(text)
+                    return text
+    
+    except requests.exceptions.RequestException as e:
+        return f"Connection error: {str(e)}"
+
+    return text or "I didn't get a response from the assistant."
+
 # UI Components
 def authentication_section():
     st.title("📅 TailorTalk AI Scheduler")
@@ -253,9 +299,12 @@ def chat_interface():
         # Add user message to chat
         st.session_state.messages.append({"role": "user", "content": user_input})
         
-        # Get assistant response
-        with st.spinner("Thinking..."):
-            assistant_response = send_to_api(user_input)
+        with chat_container:
+            with st.chat_message("user", avatar="👤"):
+                st.markdown(user_input)
+            # Stream the assistant response as it is generated
+            with st.chat_message("assistant", avatar="🤖"):
+                assistant_response = stream_from_api(user_input, st.empty())
         
         # Add assistant response to chat
         st.session_state.messages.append({"role": "assistant", "content": assistant_response})
@@ -1,26 +1,85 @@
 # 
-import datefinder
-from api_call import service
+import os
+from api_call import bound_service, default_service
 from datetime import datetime, timedelta
+from itertools import islice
 from googleapiclient.errors import HttpError
 import pytz
+from event_cache import CACHE_ENABLED, get_store, parse_event_time
+from calendar_fields import execute, fields_for
+import availability
+import calendar_batch
+import async_calendar
+import prefetch
+
+# Overrides the process-wide service from api_call when set
+service = None
+
+MAX_SEARCH_DAYS = 31
+
+PAGE_SIZE = 250
+
+# "freebusy" answers availability from freebusy.query, "events" from events.list.
+# With the event cache on, events are usually already local, so that is the default.
+AVAILABILITY_SOURCE = os.getenv("AVAILABILITY_SOURCE") or ("events" if CACHE_ENABLED else "freebusy")
+AVAILABILITY_CALENDARS = os.getenv("AVAILABILITY_CALENDARS", "primary").split(",")
+
+def active_service():
+    """The calendar service bound to the current request, else the process-wide one"""
+    return bound_service() or service or default_service()
+
+def iter_events(start, end=None, page_size=PAGE_SIZE, calendar_id="primary", fields=None, calendar_service=None):
+    """Yield events overlapping [start, end) in start-time order.
+
+    Pages are requested only as the caller consumes them, so a consumer that
+    stops early never fetches the rest of the range.
+    """
+    calendar_service = calendar_service or active_service()
+    page_token = None
+    while True:
+        events_result = execute(
+            "events.list",
+            calendar_service.events().list(
+                calendarId=calendar_id,
+                timeMin=start.isoformat(),
+                timeMax=end.isoformat() if end else None,
+                singleEvents=True,
+                orderBy="startTime",
+                maxResults=page_size,
+                pageToken=page_token,
+                fields=fields or fields_for("events.list"),
+            ),
+        )
+        yield from events_result.get("items", [])
+        page_token = events_result.get("nextPageToken")
+        if not page_token:
+            return
+
+def utc_day_range(start_date, end_date):
+    """[start of start_date, end of end_date) in UTC"""
+    start_datetime = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=pytz.UTC)
+    end_datetime = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=pytz.UTC) + timedelta(days=1)
+    return start_datetime, end_datetime
+
+def stream_events(start_date, end_date):
+    """get_events as an iterator; lazily paged when the event cache is off"""
+    if CACHE_ENABLED:
+        return iter(get_events(start_date, end_date))
+    start_datetime, end_datetime = utc_day_range(start_date, end_date)
+    return iter_events(start_datetime, end_datetime, page_size=PAGE_SIZE)
 
 def get_upcoming_events(service):
     try:
-        now = datetime.utcnow().isoformat() + "Z"
         print("Getting the upcoming 10 events")
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=now,
-                maxResults=10,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        events = events_result.get("items", [])
+        if CACHE_ENABLED:
+            events = get_store(service).upcoming(datetime.now(pytz.UTC), max_results=10)
+            if not events:
+                print("No upcoming events found.")
+                return None
+            return events
+
+        now = datetime.now(pytz.UTC)
+        events = list(islice(iter_events(now, page_size=10, calendar_service=service), 10))
 
         if not events:
             print("No upcoming events found.")
@@ -32,28 +91,27 @@ def get_upcoming_events(service):
         print("An error occurred: %s" % error)
         return None
 
+def cached_events(start_date, end_date):
+    """(store token, version, events) from the event store, or None when it can't answer the range"""
+    if not CACHE_ENABLED:
+        return None
+    start_datetime, end_datetime = utc_day_range(start_date, end_date)
+    store = get_store(active_service())
+    # Dates before the store's lookback window are read from the API
+    if not store.covers(start_datetime):
+        return None
+    prefetch.wait(start_date, end_date)
+    prefetch.record_lookup(start_date, end_date, store.is_fresh())
+    return store.snapshot(start_datetime, end_datetime)
+
 def get_events(start_date, end_date):
     try:
+        snapshot = cached_events(start_date, end_date)
+        if snapshot is not None:
+            return snapshot[2]
 
-        start_datetime = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=pytz.UTC)
-        end_datetime = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=pytz.UTC) + timedelta(days=1)
-        
-        time_min = start_datetime.isoformat()
-        time_max = end_datetime.isoformat()
-        
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
-        events = events_result.get("items", [])
-        return events
+        start_datetime, end_datetime = utc_day_range(start_date, end_date)
+        return list(iter_events(start_datetime, end_datetime))
 
     except HttpError as error:
         print(f"An error occurred while fetching events: {error}")
@@ -63,7 +121,7 @@ def get_events(start_date, end_date):
         return []
 
 def list_upcoming_events():
-    events = get_upcoming_events(service)
+    events = get_upcoming_events(active_service())
     if events:
         for event in events:
             start = event["start"].get("dateTime", event["start"].get("date"))
@@ -75,7 +133,7 @@ def delete_event(event_name, start_date=None, end_date=None, confirm: bool = Tru
         if start_date and end_date:
             events = get_events(start_date, end_date)
         else:
-            events = get_upcoming_events(service)
+            events = get_upcoming_events(active_service())
 
         if not events:
             return "No events found in the specified range."
@@ -92,57 +150,103 @@ def delete_event(event_name, start_date=None, end_date=None, confirm: bool = Tru
             ]
             return f"Found {len(matching_events)} matching events:\n{', '.join(event_details)}\nConfirmation required to delete."
 
-        deleted = []
         for event in matching_events:
-            try:
-                if 'recurringEventId' in event:
-                    print(f"Warning: '{event['summary']}' is a recurring event instance. Deleting this instance only.")
-                
-                service.events().delete(calendarId="primary", eventId=event["id"]).execute()
+            if 'recurringEventId' in event:
+                print(f"Warning: '{event['summary']}' is a recurring event instance. Deleting this instance only.")
+
+        results = delete_events([event["id"] for event in matching_events])
+
+        deleted = []
+        failed = []
+        for event, result in zip(matching_events, results):
+            if result['ok']:
                 deleted.append(event["summary"])
                 print(f"Successfully deleted event: {event['summary']} (ID: {event['id']})")
-            except HttpError as e:
-                print(f"Failed to delete event '{event['summary']}': {e}")
-                return f"Failed to delete some events: {e}"
+            else:
+                failed.append(f"{event['summary']} ({result['error']})")
+                print(f"Failed to delete event '{event['summary']}': {result['error']}")
 
-        return f"Deleted {len(deleted)} events: {', '.join(deleted)}"
+        message = f"Deleted {len(deleted)} events: {', '.join(deleted)}"
+        if failed:
+            message += f"\nFailed to delete {len(failed)} events: {', '.join(failed)}"
+        return message
 
     except Exception as e:
         print(f"Unexpected error in delete_event: {e}")
         return f"An unexpected error occurred: {e}"
 
 
+def _write_through(results):
+    if CACHE_ENABLED:
+        store = get_store(active_service())
+        for result in results:
+            if result['ok']:
+                store.put(result['response'])
+    return results
+
+def delete_events(event_ids):
+    """Delete events in batched requests; returns one result per id"""
+    results = calendar_batch.delete_events(active_service(), event_ids)
+    if CACHE_ENABLED:
+        store = get_store(active_service())
+        for event_id, result in zip(event_ids, results):
+            if result['ok']:
+                store.remove(event_id)
+    return results
+
+def insert_events(bodies):
+    """Insert event bodies in batched requests; returns one result per body"""
+    return _write_through(calendar_batch.insert_events(active_service(), bodies))
+
+def patch_events(changes):
+    """Apply (event_id, partial body) changes in batched requests; returns one result per change"""
+    return _write_through(calendar_batch.patch_events(active_service(), changes))
+
+def parse_start_time(date, time):
+    """Naive start datetime for a date and time; None if it cannot be parsed"""
+    try:
+        return datetime.strptime(f"{date} {time}", '%Y-%m-%d %H:%M')
+    except ValueError:
+        # datefinder is slow to import and only needed for free-form times
+        import datefinder
+        matches = list(datefinder.find_dates(date + " " + time))
+        return matches[0] if matches else None
+
+def build_event_body(name, start_time, duration=1, description=None, location=None):
+    end_time = start_time + timedelta(hours=duration)
+    return {
+        'summary': name,
+        'location': location,
+        'description': description,
+        'start': {
+            'dateTime': start_time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'timeZone': 'Asia/Kolkata',
+        },
+        'end': {
+            'dateTime': end_time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'timeZone': 'Asia/Kolkata',
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 24 * 60},
+                {'method': 'popup', 'minutes': 10},
+            ],
+        },
+    }
 
 def create_event(date, time, name, duration=1, description=None, location=None):
     
-    start_time_str = date + " " +time
-    matches = list(datefinder.find_dates(start_time_str))
-    if len(matches):
-        start_time = matches[0]
-        end_time = start_time + timedelta(hours=duration)
-
-        event = {
-            'summary': name,
-            'location': location,
-            'description': description,
-            'start': {
-                'dateTime': start_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                'timeZone': 'Asia/Kolkata',
-            },
-            'end': {
-                'dateTime': end_time.strftime("%Y-%m-%dT%H:%M:%S"),
-                'timeZone': 'Asia/Kolkata',
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 24 * 60},
-                    {'method': 'popup', 'minutes': 10},
-                ],
-            },
-        }
+    start_time = parse_start_time(date, time)
+    if start_time:
+        event = build_event_body(name, start_time, duration, description, location)
         try:
-            event_result = service.events().insert(calendarId="primary", body=event).execute()
+            event_result = execute(
+                "events.insert",
+                active_service().events().insert(calendarId="primary", body=event, fields=fields_for("events.insert")),
+            )
+            if CACHE_ENABLED:
+                get_store(active_service()).put(event_result)
             print("Event created successfully!")
             return f"Event '{name}' created successfully for {date} at {time}"
         except HttpError as e:
@@ -152,8 +256,85 @@ def create_event(date, time, name, duration=1, description=None, location=None):
         print("Error: Invalid format. Event not created.")
         return "Error: Invalid date/time format. Event not created."
 
+def create_events_batch(events, allow_conflicts=False):
+    """Book several events at once.
+
+    Every spec is parsed and checked for conflicts (with each other and with
+    the calendar, in one sweep) before anything is written; the rest are then
+    inserted through batch requests. Conflicting specs are skipped unless
+    allow_conflicts is set.
+    """
+    try:
+        ist = pytz.timezone('Asia/Kolkata')
+        planned = []
+        invalid = []
+        for position, spec in enumerate(events, start=1):
+            if hasattr(spec, 'model_dump'):
+                spec = spec.model_dump()
+            name = spec.get('name') or "Appointment"
+            duration = spec.get('duration') or 1
+            start_time = parse_start_time(spec.get('date', ''), spec.get('time', ''))
+            if not start_time or duration <= 0:
+                invalid.append(f"#{position} {name}: invalid date/time")
+                continue
+            start = ist.localize(start_time)
+            planned.append({
+                'position': position,
+                'name': name,
+                'label': f"{name} on {start_time.strftime('%Y-%m-%d')} at {start_time.strftime('%H:%M')}",
+                'start': start,
+                'end': start + timedelta(hours=duration),
+                'body': build_event_body(name, start_time, duration, spec.get('description'), spec.get('location')),
+            })
+
+        if not planned:
+            return "No events created. " + "; ".join(invalid)
+
+        first_day = min(item['start'] for item in planned).astimezone(pytz.UTC)
+        last_day = max(item['end'] for item in planned).astimezone(pytz.UTC)
+        existing = availability.timed_events(get_events(first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')))
+
+        intervals = [(item['start'], item['end'], ('new', index)) for index, item in enumerate(planned)]
+        intervals += [(start, end, ('existing', event)) for start, end, event in existing]
+        conflicts = [[] for _ in planned]
+        for first, second in availability.find_overlaps(intervals):
+            if first[0] == 'new' and second[0] == 'new':
+                # Between two new specs the one listed first wins
+                earlier, later = sorted((first[1], second[1]))
+                conflicts[later].append(planned[earlier]['label'])
+            elif first[0] == 'new':
+                conflicts[first[1]].append(second[1].get('summary', 'Untitled Event'))
+            elif second[0] == 'new':
+                conflicts[second[1]].append(first[1].get('summary', 'Untitled Event'))
+
+        to_create = []
+        skipped = []
+        for item, clashes in zip(planned, conflicts):
+            if clashes and not allow_conflicts:
+                skipped.append(f"{item['label']} (conflicts with {', '.join(clashes)})")
+            else:
+                to_create.append(item)
+
+        results = insert_events([item['body'] for item in to_create])
+        created = [item['label'] for item, result in zip(to_create, results) if result['ok']]
+        failed = [f"{item['label']} ({result['error']})" for item, result in zip(to_create, results) if not result['ok']]
+        print(f"Batch create: {len(created)} created, {len(skipped)} skipped, {len(failed)} failed, {len(invalid)} invalid")
+
+        lines = [f"Created {len(created)} events: {', '.join(created)}"]
+        if skipped:
+            lines.append(f"Skipped {len(skipped)} conflicting events: {'; '.join(skipped)}")
+        if failed:
+            lines.append(f"Failed to create {len(failed)} events: {'; '.join(failed)}")
+        if invalid:
+            lines.append(f"Invalid: {'; '.join(invalid)}")
+        return "\n".join(lines)
+
+    except Exception as e:
+        print(f"Unexpected error in create_events_batch: {e}")
+        return f"An unexpected error occurred: {e}"
+
 def update_event(event_name, **kwargs):
-    events = get_upcoming_events(service)
+    events = get_upcoming_events(active_service())
     if events:
         matching_events = [event for event in events if event["summary"].lower() == event_name.lower()]
         if matching_events:
@@ -167,7 +348,10 @@ def update_event(event_name, **kwargs):
                 for event in matching_events:
                     event_id = event["id"]
                     try:
-                        updated_event = service.events().get(calendarId="primary", eventId=event_id).execute()
+                        updated_event = execute(
+                            "events.get",
+                            active_service().events().get(calendarId="primary", eventId=event_id, fields=fields_for("events.get")),
+                        )
                         print(event["start"].get("duration"))
                         date = kwargs.get("date")
                         start_hours, start_minutes = map(int, [event["start"]["dateTime"][11:13], event["start"]["dateTime"][14:16]])
@@ -179,6 +363,7 @@ def update_event(event_name, **kwargs):
                         else :
                             time_difference = timedelta(hours=end_hours - start_hours, minutes=end_minutes - start_minutes)
                             
+                        import datefinder
                         if date:
                             start_time_str = date + " " + updated_event["start"].get("dateTime")[11:16]   
                             matches = list(datefinder.find_dates(start_time_str))
@@ -214,7 +399,14 @@ def update_event(event_name, **kwargs):
                         if location:
                             updated_event['location'] = location
 
-                        updated_event = service.events().update(calendarId="primary", eventId=event_id, body=updated_event).execute()
+                        updated_event = execute(
+                            "events.update",
+                            active_service().events().update(
+                                calendarId="primary", eventId=event_id, body=updated_event, fields=fields_for("events.update"),
+                            ),
+                        )
+                        if CACHE_ENABLED:
+                            get_store(active_service()).put(updated_event)
                         print("Event Updated Successfully:", updated_event["summary"])
                         return f"Event '{updated_event['summary']}' updated successfully"
 
@@ -250,59 +442,79 @@ def parse_datetime_from_event(datetime_str):
         print(f"Error parsing datetime '{datetime_str}': {e}")
         return None
 
+def get_busy_blocks(start_date, end_date, calendar_ids=None):
+    """Busy ranges from freebusy.query across calendars, shaped like events.
+
+    Returns None if the query fails so callers can fall back to events.list.
+    """
+    try:
+        start_datetime, end_datetime = utc_day_range(start_date, end_date)
+        body = {
+            "timeMin": start_datetime.isoformat(),
+            "timeMax": end_datetime.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in (calendar_ids or AVAILABILITY_CALENDARS)],
+        }
+        result = execute("freebusy.query", active_service().freebusy().query(body=body, fields=fields_for("freebusy.query")))
+    except HttpError as error:
+        print(f"An error occurred while querying free/busy: {error}")
+        return None
+    return busy_blocks_from(result)
+
+def busy_blocks_from(result):
+    blocks = []
+    for calendar_id, calendar in result.get("calendars", {}).items():
+        if calendar.get("errors"):
+            print(f"Free/busy errors for calendar '{calendar_id}': {calendar['errors']}")
+            return None
+        for busy in calendar.get("busy", []):
+            blocks.append({
+                'summary': 'Busy',
+                'start': {'dateTime': busy['start']},
+                'end': {'dateTime': busy['end']},
+            })
+    # Busy lists are sorted per calendar; keep the merged list in start order too
+    blocks.sort(key=lambda block: parse_event_time(block['start']))
+    return blocks
+
+def availability_events(start_date, end_date, lazy=False):
+    """Events (or busy blocks) to answer availability from, and a cache key for their index.
+
+    With lazy=True the events come as a start-ordered iterator instead of a list.
+    """
+    if AVAILABILITY_SOURCE == "freebusy":
+        blocks = get_busy_blocks(start_date, end_date)
+        if blocks is not None:
+            return blocks, None
+        print("Falling back to events.list for availability")
+
+    if lazy:
+        return stream_events(start_date, end_date), None
+
+    snapshot = cached_events(start_date, end_date)
+    if snapshot is not None:
+        # The version read with the events, under a token no other store shares
+        token, version, events = snapshot
+        return events, (token, version)
+    # Events from outside the store don't move its version, so aren't cached under it
+    return get_events(start_date, end_date), None
+
+def previous_day(date):
+    # An IST day starts on the previous UTC day
+    return (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+
+def day_index(date):
+    """Busy-interval index for one IST day, built once per calendar version"""
+    events, key = availability_events(previous_day(date), date)
+    return availability.cached_day_index(key, events, date)
+
 def check_availability(date, start_time=None, end_time=None):
     try:
-        events = get_events(date, date) 
-        
         if not start_time:
             start_time = "09:00"
         if not end_time:
             end_time = "17:00"
-        
-        ist = pytz.timezone('Asia/Kolkata')
-        utc = pytz.UTC
-        
-        date_obj = datetime.strptime(date, '%Y-%m-%d')
-        start_datetime = datetime.strptime(f"{date} {start_time}", '%Y-%m-%d %H:%M')
-        end_datetime = datetime.strptime(f"{date} {end_time}", '%Y-%m-%d %H:%M')
-        
-        start_datetime = ist.localize(start_datetime).astimezone(utc)
-        end_datetime = ist.localize(end_datetime).astimezone(utc)
-        
-        conflicts = []
-        for event in events:
-            event_start_str = event.get('start', {}).get('dateTime', '')
-            event_end_str = event.get('end', {}).get('dateTime', '')
-            
-            if not event_start_str or not event_end_str:
-                continue
-                
-            event_start = parse_datetime_from_event(event_start_str)
-            event_end = parse_datetime_from_event(event_end_str)
-            
-            if not event_start or not event_end:
-                continue
-            
-            if event_start.tzinfo is None:
-                event_start = utc.localize(event_start)
-            if event_end.tzinfo is None:
-                event_end = utc.localize(event_end)
-            
-            if event_start < end_datetime and event_end > start_datetime:
-                display_start = event_start.astimezone(ist)
-                display_end = event_end.astimezone(ist)
-                
-                conflicts.append({
-                    'name': event.get('summary', 'Untitled Event'),
-                    'start': display_start.strftime('%H:%M'),
-                    'end': display_end.strftime('%H:%M')
-                })
-        
-        return {
-            'available': len(conflicts) == 0,
-            'conflicts': conflicts,
-            'checked_period': f"{start_time} - {end_time}"
-        }
+
+        return availability.availability_report(day_index(date), start_time, end_time)
     
     except Exception as e:
         print(f"Error in check_availability: {e}")
@@ -314,76 +526,121 @@ def check_availability(date, start_time=None, end_time=None):
 
 def suggest_time_slots(date, duration=1, preferred_time=None):
     try:
-        events = get_events(date, date)
-        
-        busy_blocks = []
-        ist = pytz.timezone('Asia/Kolkata')
-        utc = pytz.UTC
-        
-        for event in events:
-            event_start_str = event.get('start', {}).get('dateTime', '')
-            event_end_str = event.get('end', {}).get('dateTime', '')
-            
-            if not event_start_str or not event_end_str:
-                continue
-                
-            event_start = parse_datetime_from_event(event_start_str)
-            event_end = parse_datetime_from_event(event_end_str)
-            
-            if not event_start or not event_end:
-                continue
-            
-            if event_start.tzinfo is None:
-                event_start = utc.localize(event_start)
-            if event_end.tzinfo is None:
-                event_end = utc.localize(event_end)
-                
-            event_start_ist = event_start.astimezone(ist)
-            event_end_ist = event_end.astimezone(ist)
-            
-            event_date = event_start_ist.date()
-            target_date = datetime.strptime(date, '%Y-%m-%d').date()
-            
-            if event_date == target_date:
-                start_minutes = event_start_ist.hour * 60 + event_start_ist.minute
-                end_minutes = event_end_ist.hour * 60 + event_end_ist.minute
-                busy_blocks.append((start_minutes, end_minutes))
-        
-        start_minutes = 9 * 60  # 9:00 AM
-        end_minutes = 23 * 60   # 11:00 PM
-        duration_minutes = duration * 60
-        
-        available_slots = []
-        current_time = start_minutes
-        
-        while current_time + duration_minutes <= end_minutes:
-            slot_end = current_time + duration_minutes
-
-            conflicts = False
-            for busy_start, busy_end in busy_blocks:
-                if current_time < busy_end and slot_end > busy_start:
-                    conflicts = True
-                    current_time = busy_end  
-                    break
-            
-            if not conflicts:
-                hour = current_time // 60
-                minute = current_time % 60
-                available_slots.append(f"{hour:02d}:{minute:02d}")
-                current_time += 30 
-        
-        if preferred_time:
-            pref_time = parse_time_preference(preferred_time)
-            if pref_time:
-                pref_hour = int(pref_time.split(':')[0])
-                available_slots.sort(key=lambda x: abs(int(x.split(':')[0]) - pref_hour))
-        
-        return available_slots[:5]  
+        return availability.suggest_slots(day_index(date), duration, parse_time_preference(preferred_time))
     
     except Exception as e:
         print(f"Error in suggest_time_slots: {e}")
         return []
 
+def clamp_search_range(start_date, end_date):
+    """end_date capped to MAX_SEARCH_DAYS after start_date; None for an empty range"""
+    first_day = datetime.strptime(start_date, '%Y-%m-%d')
+    last_day = datetime.strptime(end_date, '%Y-%m-%d')
+    if last_day < first_day:
+        return None
+    return min(last_day, first_day + timedelta(days=MAX_SEARCH_DAYS)).strftime('%Y-%m-%d')
+
+def find_free_slots(start_date, end_date, duration=1, count=3, day_start="09:00", day_end="17:00"):
+    try:
+        end_date = clamp_search_range(start_date, end_date)
+        if not end_date:
+            return []
+
+        # One ranged fetch, starting a UTC day early to cover the first IST morning
+        events, _ = availability_events(previous_day(start_date), end_date, lazy=True)
+        return availability.first_free_slots(
+            events, start_date, end_date, duration, count,
+            day_start=day_start, day_end=day_end,
+            not_before=datetime.now(pytz.UTC),
+        )
+
+    except Exception as e:
+        print(f"Error in find_free_slots: {e}")
+        return []
+
+# Async counterparts of the read tools, for the FastAPI path. They read from
+# the event store when it is fresh and otherwise await async_calendar.
+
+async def aget_events(start_date, end_date):
+    try:
+        start_datetime, end_datetime = utc_day_range(start_date, end_date)
+        store = get_store(active_service()) if CACHE_ENABLED else None
+        # Dates before the store's lookback window are read from the API
+        if store and store.covers(start_datetime):
+            await prefetch.ready(start_date, end_date)
+            prefetch.record_lookup(start_date, end_date, store.is_fresh())
+            if store.is_fresh():
+                return store.query(start_datetime, end_datetime)
+        return await async_calendar.current_client().list_events(start_datetime, end_datetime)
+
+    except HttpError as error:
+        print(f"An error occurred while fetching events: {error}")
+        return []
+    except ValueError as error:
+        print(f"Invalid date format: {error}")
+        return []
+
+async def aget_busy_blocks(start_date, end_date, calendar_ids=None):
+    try:
+        start_datetime, end_datetime = utc_day_range(start_date, end_date)
+        result = await async_calendar.current_client().freebusy(
+            start_datetime, end_datetime, calendar_ids or AVAILABILITY_CALENDARS
+        )
+    except HttpError as error:
+        print(f"An error occurred while querying free/busy: {error}")
+        return None
+    return busy_blocks_from(result)
+
+async def aavailability_events(start_date, end_date):
+    if AVAILABILITY_SOURCE == "freebusy":
+        blocks = await aget_busy_blocks(start_date, end_date)
+        if blocks is not None:
+            return blocks
+        print("Falling back to events.list for availability")
+    return await aget_events(start_date, end_date)
+
+async def acheck_availability(date, start_time=None, end_time=None):
+    try:
+        events = await aavailability_events(previous_day(date), date)
+        return availability.availability_report(
+            availability.build_day_index(events, date), start_time or "09:00", end_time or "17:00"
+        )
+
+    except Exception as e:
+        print(f"Error in check_availability: {e}")
+        return {
+            'available': False,
+            'error': str(e),
+            'conflicts': []
+        }
+
+async def asuggest_time_slots(date, duration=1, preferred_time=None):
+    try:
+        events = await aavailability_events(previous_day(date), date)
+        return availability.suggest_slots(
+            availability.build_day_index(events, date), duration, parse_time_preference(preferred_time)
+        )
+
+    except Exception as e:
+        print(f"Error in suggest_time_slots: {e}")
+        return []
+
+async def afind_free_slots(start_date, end_date, duration=1, count=3, day_start="09:00", day_end="17:00"):
+    try:
+        end_date = clamp_search_range(start_date, end_date)
+        if not end_date:
+            return []
+        events = await aavailability_events(previous_day(start_date), end_date)
+        return availability.first_free_slots(
+            events, start_date, end_date, duration, count,
+            day_start=day_start, day_end=day_end,
+            not_before=datetime.now(pytz.UTC),
+        )
+
+    except Exception as e:
+        print(f"Error in find_free_slots: {e}")
+        return []
+
 
 def parse_time_preference(time_str):
 
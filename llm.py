@@ -1,31 +1,45 @@
-from dotenv import load_dotenv
 from typing import Optional
 import os
 import json
-print("GROQ Key:", os.getenv("GROQ_API_KEY")[:10] + "...")
-print("Google Client ID:", json.loads(os.getenv("GOOGLE_CLIENT_SECRETS"))["installed"]["client_id"][:10] + "...")
-from function import create_event, update_event, delete_event, get_events
+import hashlib
+import asyncio
+import threading
+from function import create_event, create_events_batch, update_event, delete_event, check_availability, suggest_time_slots, find_free_slots
+from function import acheck_availability, asuggest_time_slots, afind_free_slots
 from typing import Optional, TypedDict, Annotated, Sequence
 from pydantic import BaseModel, Field
-from langchain.tools import StructuredTool
+from langchain_core.tools import StructuredTool
 import pytz
 import calendar
 from datetime import datetime, timedelta
 import re
 from dateutil import parser as date_parser
-from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
-from langgraph.prebuilt import ToolNode
-
-load_dotenv()
-
-llm = ChatGroq(
-    model="qwen-qwq-32b",
-    temperature=0,
-    api_key=os.getenv("GROQ_API_KEY"),
-)
+from langchain_core.runnables import RunnableLambda
+import budget
+import context
+import tiers
+from tool_node import ParallelToolNode
+from tool_output import compact_tool
+
+MODELS = {
+    tiers.LARGE: os.getenv("GROQ_LARGE_MODEL", "qwen-qwq-32b"),
+    # Fast model for single lookups and phrasing; tiers.ModelCascade escalates to the large one
+    tiers.SMALL: os.getenv("GROQ_SMALL_MODEL", "llama-3.1-8b-instant"),
+}
+# Set MODEL_TIERS=0 to send every step to the large model
+MODEL_TIERS = os.getenv("MODEL_TIERS", "1") != "0"
+_chat_models = {}
+
+def chat_model(tier=tiers.LARGE):
+    """ChatGroq for a tier, created on first use so importing needs no API key"""
+    if tier not in _chat_models:
+        # Imported here: the Groq SDK is only needed once a model is actually built
+        from langchain_groq import ChatGroq
+        _chat_models[tier] = ChatGroq(model=MODELS[tier], temperature=0, api_key=os.getenv("GROQ_API_KEY"))
+    return _chat_models[tier]
 
 class CheckAvailabilityParameters(BaseModel):
     date: str = Field(description="date to check availability (YYYY-MM-DD)")
@@ -37,6 +51,14 @@ class SuggestTimeSlotsParameters(BaseModel):
     duration: int = Field(1, description="duration of the appointment in hours")
     preferred_time: Optional[str] = Field(description="preferred time if any (morning, afternoon, evening, or HH:MM)")
 
+class FindFreeSlotsParameters(BaseModel):
+    start_date: str = Field(description="first date to search (YYYY-MM-DD)")
+    end_date: str = Field(description="last date to search, inclusive (YYYY-MM-DD)")
+    duration: int = Field(1, description="duration of the appointment in hours")
+    count: int = Field(3, description="number of free slots to return")
+    day_start: str = Field("09:00", description="start of working hours (HH:MM)")
+    day_end: str = Field("17:00", description="end of working hours (HH:MM)")
+
 class ConfirmBookingParameters(BaseModel):
     date: str = Field(description="date of the appointment (YYYY-MM-DD)")
     time: str = Field(description="time of the appointment (HH:MM)")
@@ -65,8 +87,17 @@ class CreateEventParameters(BaseModel):
     description: Optional[str] = Field(None, description="description of the event")
     location: Optional[str] = Field(None, description="location of the event")
 
+class CreateEventsBatchParameters(BaseModel):
+    events: list[CreateEventParameters] = Field(description="events to create, one entry per occurrence")
+    allow_conflicts: bool = Field(False, description="also book events that clash with existing ones")
+
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Per-request budget counters, reset by budget.initial_state()
+    iterations: int
+    tokens: int
+    deadline: float
+    stop_reason: Optional[str]
 
 def parse_relative_date(date_str, current_time):
     date_str = date_str.lower().strip()
@@ -123,165 +154,6 @@ def parse_time_preference(time_str):
     
     return None
 
-def parse_datetime_from_event(datetime_str):
-    if not datetime_str:
-        return None
-    
-    try:
-        if datetime_str.endswith('Z'):
-
-            return datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-        elif '+' in datetime_str or datetime_str.count('-') > 2:
-         
-            return datetime.fromisoformat(datetime_str)
-        else:
-       
-            dt = datetime.fromisoformat(datetime_str)
-            return dt.replace(tzinfo=pytz.UTC)
-    except Exception as e:
-        print(f"Error parsing datetime '{datetime_str}': {e}")
-        return None
-
-def check_availability(date, start_time=None, end_time=None):
-    try:
-        events = get_events(date, date)  
-        
-        if not start_time:
-            start_time = "09:00"
-        if not end_time:
-            end_time = "17:00"
-        
-        ist = pytz.timezone('Asia/Kolkata')
-        utc = pytz.UTC
-        
- 
-        date_obj = datetime.strptime(date, '%Y-%m-%d')
-        start_datetime = datetime.strptime(f"{date} {start_time}", '%Y-%m-%d %H:%M')
-        end_datetime = datetime.strptime(f"{date} {end_time}", '%Y-%m-%d %H:%M')
-        
-   
-        start_datetime = ist.localize(start_datetime).astimezone(utc)
-        end_datetime = ist.localize(end_datetime).astimezone(utc)
-        
-        conflicts = []
-        for event in events:
-      
-            event_start_str = event.get('start', {}).get('dateTime', '')
-            event_end_str = event.get('end', {}).get('dateTime', '')
-            
-            if not event_start_str or not event_end_str:
-                continue
-                
-            event_start = parse_datetime_from_event(event_start_str)
-            event_end = parse_datetime_from_event(event_end_str)
-            
-            if not event_start or not event_end:
-                continue
-            
-            
-            if event_start.tzinfo is None:
-                event_start = utc.localize(event_start)
-            if event_end.tzinfo is None:
-                event_end = utc.localize(event_end)
-            
-   
-            if event_start < end_datetime and event_end > start_datetime:
- 
-                display_start = event_start.astimezone(ist)
-                display_end = event_end.astimezone(ist)
-                
-                conflicts.append({
-                    'name': event.get('summary', 'Untitled Event'),
-                    'start': display_start.strftime('%H:%M'),
-                    'end': display_end.strftime('%H:%M')
-                })
-        
-        return {
-            'available': len(conflicts) == 0,
-            'conflicts': conflicts,
-            'checked_period': f"{start_time} - {end_time}"
-        }
-    
-    except Exception as e:
-        print(f"Error in check_availability: {e}")
-        return {
-            'available': False,
-            'error': str(e),
-            'conflicts': []
-        }
-
-def suggest_time_slots(date, duration=1, preferred_time=None):
-    try:
-        events = get_events(date, date)
-       
-        busy_blocks = []
-        ist = pytz.timezone('Asia/Kolkata')
-        utc = pytz.UTC
-        
-        for event in events:
-            event_start_str = event.get('start', {}).get('dateTime', '')
-            event_end_str = event.get('end', {}).get('dateTime', '')
-            
-            if not event_start_str or not event_end_str:
-                continue
-                
-            event_start = parse_datetime_from_event(event_start_str)
-            event_end = parse_datetime_from_event(event_end_str)
-            
-            if not event_start or not event_end:
-                continue
-            
-            if event_start.tzinfo is None:
-                event_start = utc.localize(event_start)
-            if event_end.tzinfo is None:
-                event_end = utc.localize(event_end)
-                
-            event_start_ist = event_start.astimezone(ist)
-            event_end_ist = event_end.astimezone(ist)
-            
-            event_date = event_start_ist.date()
-            target_date = datetime.strptime(date, '%Y-%m-%d').date()
-            
-            if event_date == target_date:
-                start_minutes = event_start_ist.hour * 60 + event_start_ist.minute
-                end_minutes = event_end_ist.hour * 60 + event_end_ist.minute
-                busy_blocks.append((start_minutes, end_minutes))
-        
-        start_minutes = 9 * 60  # 9:00 AM
-        end_minutes = 23 * 60   # 11:00 PM
-        duration_minutes = duration * 60
-        
-        available_slots = []
-        current_time = start_minutes
-        
-        while current_time + duration_minutes <= end_minutes:
-            slot_end = current_time + duration_minutes
-            
-            conflicts = False
-            for busy_start, busy_end in busy_blocks:
-                if current_time < busy_end and slot_end > busy_start:
-                    conflicts = True
-                    current_time = busy_end  
-                    break
-            
-            if not conflicts:
-                hour = current_time // 60
-                minute = current_time % 60
-                available_slots.append(f"{hour:02d}:{minute:02d}")
-                current_time += 30  
-        
-        if preferred_time:
-            pref_time = parse_time_preference(preferred_time)
-            if pref_time:
-                pref_hour = int(pref_time.split(':')[0])
-                available_slots.sort(key=lambda x: abs(int(x.split(':')[0]) - pref_hour))
-        
-        return available_slots[:5] 
-    
-    except Exception as e:
-        print(f"Error in suggest_time_slots: {e}")
-        return []
-
 def confirm_booking_details(date, time, name, duration, description=None, location=None):
     date_obj = datetime.strptime(date, '%Y-%m-%d')
     formatted_date = date_obj.strftime('%A, %B %d, %Y')
@@ -310,48 +182,60 @@ def create_tools():
     return [
         StructuredTool.from_function(
             name="check_availability",
-            func=check_availability,
+            func=compact_tool("check_availability", check_availability),
+            coroutine=compact_tool("check_availability", acheck_availability),
             description="Check calendar availability for a specific date and time range",
             args_schema=CheckAvailabilityParameters,
         ),
         StructuredTool.from_function(
             name="suggest_time_slots",
-            func=suggest_time_slots,
+            func=compact_tool("suggest_time_slots", suggest_time_slots),
+            coroutine=compact_tool("suggest_time_slots", asuggest_time_slots),
             description="Suggest available time slots for booking an appointment",
             args_schema=SuggestTimeSlotsParameters,
         ),
+        StructuredTool.from_function(
+            name="find_free_slots",
+            func=compact_tool("find_free_slots", find_free_slots),
+            coroutine=compact_tool("find_free_slots", afind_free_slots),
+            description="Find the first free time slots across a range of dates within working hours",
+            args_schema=FindFreeSlotsParameters,
+        ),
         StructuredTool.from_function(
             name="confirm_booking_details",
-            func=confirm_booking_details,
+            func=compact_tool("confirm_booking_details", confirm_booking_details),
             description="Show formatted confirmation details before booking",
             args_schema=ConfirmBookingParameters,
         ),
         StructuredTool.from_function(
             name="create_event",
-            func=create_event,
+            func=compact_tool("create_event", create_event),
             description="Create an event in Google Calendar after confirmation",
             args_schema=CreateEventParameters,
         ),
+        StructuredTool.from_function(
+            name="create_events_batch",
+            func=compact_tool("create_events_batch", create_events_batch),
+            description="Create several events in Google Calendar in one call after confirmation, e.g. a standup every weekday",
+            args_schema=CreateEventsBatchParameters,
+        ),
         StructuredTool.from_function(
             name="update_event",
-            func=update_event,
+            func=compact_tool("update_event", update_event),
             description="Update an event in Google Calendar",
             args_schema=UpdateEventParameters,
         ),
         StructuredTool.from_function(
             name="delete_event",
-            func=delete_event,
+            func=compact_tool("delete_event", delete_event),
             description="Delete an event from Google Calendar",
             args_schema=DeleteEventParameters,
         ),
     ]
 
-def get_system_prompt(current_time):
-    timezone = pytz.timezone("UTC")
-    tomorrow_date = current_time + timedelta(days=1)
-    current_year = current_time.year
-    
-    return f"""You are a helpful and conversational AI scheduling assistant for booking appointments on Google Calendar.
+# Kept byte-for-byte identical across calls so the provider can cache the prompt
+# prefix; anything that changes per call goes in date_context instead
+SYSTEM_PROMPT = """You are a helpful and conversational AI scheduling assistant for booking appointments on Google Calendar.
 
 - Do NOT say the event is booked unless the create_event tool is actually called.
 - ALWAYS call the create_event tool to finalize booking.
@@ -373,6 +257,7 @@ def get_system_prompt(current_time):
 - Be conversational and friendly, not robotic
 - Always check availability first using check_availability tool
 - If conflicts exist, use suggest_time_slots to offer alternatives
+- If a whole day is busy or the user is flexible about the day, use find_free_slots over a date range instead of checking day by day
 - Use confirm_booking_details before creating any event
 - Handle relative dates like "today", "tomorrow", "next Monday"
 - Understand time preferences like "morning", "afternoon", "evening"
@@ -382,53 +267,172 @@ def get_system_prompt(current_time):
 **Available Tools:**
 - check_availability: Check if a time slot is free
 - suggest_time_slots: Find alternative available times
+- find_free_slots: Find the earliest free times across several days
 - confirm_booking_details: Show booking confirmation
 - create_event: Book the appointment (only after confirmation)
+- create_events_batch: Book several appointments at once (only after confirmation)
 - update_event: Modify existing appointments
 - delete_event: Cancel appointments
 
-Current UTC time: {current_time}
-ISO format: {current_time.astimezone(timezone).isoformat()}
-Tomorrow (ISO): {tomorrow_date.isoformat()}
-Day of the week: {calendar.day_name[current_time.astimezone(timezone).weekday()]}
-Current year: {current_year}
+Tool results are compact JSON: {"ok": true, "data": ...} or {"ok": false, "error": ...}. Lists are under "items", and "more" counts items left out. Present results to the user in friendly prose, never as JSON.
+
+The current date and time are given in a message at the end of the conversation.
 
 Always be helpful and make the booking process smooth and natural!"""
 
+def get_system_prompt(current_time=None):
+    return SYSTEM_PROMPT
+
+def date_context(current_time):
+    """Small trailing message with the volatile date information"""
+    timezone = pytz.timezone("UTC")
+    current_time = current_time.astimezone(timezone).replace(second=0, microsecond=0)
+    tomorrow_date = current_time + timedelta(days=1)
+
+    return SystemMessage(content=f"""Current UTC time: {current_time.strftime('%Y-%m-%d %H:%M')}
+ISO format: {current_time.isoformat()}
+Tomorrow (ISO): {tomorrow_date.date().isoformat()}
+Day of the week: {calendar.day_name[current_time.weekday()]}
+Current year: {current_time.year}""")
+
 def should_continue(state: AgentState):
     messages = state['messages']
     last_message = messages[-1]
     
+    if state.get("stop_reason"):
+        return "finish"
     # Check if last message has tool calls
     if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        return "tools"
+        # Another round of tools only while the request's budget lasts
+        return "finish" if budget.exhausted(state, tool_round=True) else "tools"
     else:
         return END
 
-def call_model(state: AgentState):
+def model_input(state: AgentState):
    
     messages = state['messages']
     
 
     current_time = datetime.now(pytz.timezone("UTC"))
-    system_prompt = get_system_prompt(current_time)
     
    
-    if not messages or not isinstance(messages[0], SystemMessage):
-        messages = [SystemMessage(content=system_prompt)] + list(messages)
-    
+    system = SystemMessage(content=get_system_prompt())
+    if messages and isinstance(messages[0], SystemMessage):
+        system, messages = messages[0], messages[1:]
+    # Stable prefix first, recent turns (older ones summarised), then the date
+    return [system] + context.build_context(messages) + [date_context(current_time)]
+
+_prefix_stats = {"calls": 0, "prefix_changes": 0, "prefixes": set(), "last": None}
+_prefix_lock = threading.Lock()
+
+def record_prompt_prefix(messages, model):
+    """Hash the system prompt and tool schemas sent with this call; a stable hash
+    across turns is what lets the provider reuse its cached prefix"""
+    tools = getattr(model, "kwargs", {}).get("tools")
+    prefix = json.dumps([messages[0].content, tools], sort_keys=True, default=str)
+    digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+    with _prefix_lock:
+        _prefix_stats["calls"] += 1
+        if _prefix_stats["last"] not in (None, digest):
+            _prefix_stats["prefix_changes"] += 1
+        _prefix_stats["prefixes"].add(digest)
+        _prefix_stats["last"] = digest
+    return digest
+
+def get_prompt_stats():
+    with _prefix_lock:
+        return {
+            "calls": _prefix_stats["calls"],
+            "prefix_changes": _prefix_stats["prefix_changes"],
+            "distinct_prefixes": len(_prefix_stats["prefixes"]),
+            "prefix_hash": _prefix_stats["last"],
+        }
 
-    tools = create_tools()
-    llm_with_tools = llm.bind_tools(tools)
-    
-    response = llm_with_tools.invoke(messages)
-    return {"messages": [response]}
+def model_update(state, messages, response):
+    update = {
+        "messages": [response],
+        "iterations": state.get("iterations", 0) + 1,
+        "tokens": state.get("tokens", 0) + budget.tokens_used(messages, response),
+    }
+    if not getattr(response, "tool_calls", None):
+        budget.record({**state, **update}, None)
+    return update
 
-def create_agent_graph():
+def call_model(state: AgentState):
+    # A slow tool round may have used up the time left
+    reason = budget.exhausted(state)
+    if reason:
+        return {"stop_reason": reason}
+    messages = model_input(state)
+    model = bound_model()
+    record_prompt_prefix(messages, model)
+    response = model.invoke(messages)
+    return model_update(state, messages, response)
+
+async def acall_model(state: AgentState):
+    reason = budget.exhausted(state)
+    if reason:
+        return {"stop_reason": reason}
+    messages = model_input(state)
+    model = bound_model()
+    record_prompt_prefix(messages, model)
+    left = budget.remaining(state)
+    try:
+        response = await asyncio.wait_for(model.ainvoke(messages), None if left == float("inf") else left)
+    except asyncio.TimeoutError:
+        return {"stop_reason": budget.DEADLINE}
+    return model_update(state, messages, response)
+
+FINAL_ANSWER = SystemMessage(content="You can't call any more tools for this request. Answer the user now with what you have found so far.")
+
+def finish_input(state, skipped):
+    return model_input({"messages": list(state["messages"]) + skipped}) + [FINAL_ANSWER]
+
+def finish_update(state, reason, skipped, answer):
+    budget.record(state, reason)
+    return {"messages": skipped + [budget.cutoff_message(reason, answer)], "stop_reason": reason}
+
+def earlier_answer(state):
+    last = state["messages"][-1] if state["messages"] else None
+    return last.content if getattr(last, "type", None) == "ai" and isinstance(last.content, str) and last.content else None
+
+def finish(state: AgentState):
+    """End a request that ran out of budget with a partial answer.
+
+    Tool calls that will not run get a "skipped" result. When only the step
+    limit was hit there is still time for one last model call, without tools,
+    to sum up what was found; otherwise whatever the model last said is kept.
+    """
+    reason = budget.exhausted(state, tool_round=True) or budget.ITERATIONS
+    skipped = budget.skipped_results(state)
+    answer = earlier_answer(state)
+    if reason == budget.ITERATIONS:
+        try:
+            answer = bound_model().invoke(finish_input(state, skipped)).content or answer
+        except Exception as e:
+            print(f"Error writing partial answer: {e}")
+    return finish_update(state, reason, skipped, answer)
+
+async def afinish(state: AgentState):
+    reason = budget.exhausted(state, tool_round=True) or budget.ITERATIONS
+    skipped = budget.skipped_results(state)
+    answer = earlier_answer(state)
+    if reason == budget.ITERATIONS:
+        try:
+            answer = (await bound_model().ainvoke(finish_input(state, skipped))).content or answer
+        except Exception as e:
+            print(f"Error writing partial answer: {e}")
+    return finish_update(state, reason, skipped, answer)
+
+def create_agent_graph(tools=None, checkpointer=None):
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("agent", call_model)
-    workflow.add_node("tools", ToolNode(create_tools()))
+    # Sync invoke uses call_model, ainvoke awaits acall_model and the tools' coroutines
+    workflow.add_node("agent", RunnableLambda(call_model, afunc=acall_model))
+    # Several tool calls in one step run concurrently, up to TOOL_CONCURRENCY at a time
+    workflow.add_node("tools", ParallelToolNode(tools if tools is not None else create_tools()))
+    # Reached instead of "tools" once the request's budget is used up
+    workflow.add_node("finish", RunnableLambda(finish, afunc=afinish))
     
     workflow.set_entry_point("agent")
     
@@ -437,51 +441,159 @@ def create_agent_graph():
         should_continue,
         {
             "tools": "tools",
+            "finish": "finish",
             END: END,
         }
     )
     
     workflow.add_edge("tools", "agent")
+    workflow.add_edge("finish", END)
     
-    return workflow.compile()
+    # sessions passes its SQLite checkpointer to keep per-session state
+    return workflow.compile(checkpointer=checkpointer)
+
+# One compiled graph and tool-bound model for the whole process. Both are
+# stateless between invocations (the conversation travels in the graph state),
+# so every session shares them; they are rebuilt only when the tool set changes.
+_tools = None
+_agent = None
+_agent_lock = threading.Lock()
+
+def tool_signature(tools):
+    return tuple((tool.name, tool.description, json.dumps(tool.args, sort_keys=True, default=str)) for tool in tools)
+
+def set_tools(tools):
+    """Replace the agent's tools; the graph and model are rebuilt on next use if they differ"""
+    global _tools, _agent
+    tools = list(tools)
+    with _agent_lock:
+        if _tools is None or tool_signature(tools) != tool_signature(_tools):
+            _agent = None
+        _tools = tools
+
+def get_agent():
+    """(compiled graph, tool-bound model), built on first use"""
+    global _tools, _agent
+    agent = _agent
+    if agent is not None:
+        return agent
+    with _agent_lock:
+        if _agent is None:
+            if _tools is None:
+                _tools = create_tools()
+            _agent = (create_agent_graph(_tools), bind_models(_tools))
+        return _agent
+
+def bind_models(tools):
+    if not MODEL_TIERS:
+        return chat_model().bind_tools(tools)
+    return tiers.ModelCascade(chat_model(tiers.SMALL).bind_tools(tools), chat_model().bind_tools(tools), tools)
+
+def bound_model():
+    return get_agent()[1]
 
 def process_message(conversation: list) -> tuple[list, str]:
     try:
-        initial_state = {"messages": conversation}
-        # Remove unnecessary compilation step
-        app = create_agent_graph()
+        initial_state = budget.initial_state(conversation)
+        app, _ = get_agent()
         final_state = app.invoke(initial_state)
+        return final_state["messages"], last_assistant_message(final_state["messages"])
         
-        # Extract last assistant response
-        last_assistant_message = ""
-        for msg in reversed(final_state["messages"]):
-            if msg.type == "ai" and msg.content:
-                last_assistant_message = msg.content
-                break
-        
-        return final_state["messages"], last_assistant_message
-        
     except Exception as e:
         print(f"Error processing message: {e}")
         return conversation, "Sorry, I couldn't process your request. Please try again."
 
+async def aprocess_message(conversation: list) -> tuple[list, str]:
+    """process_message for async callers; calendar reads are awaited, not blocking the loop"""
+    try:
+        app, _ = get_agent()
+        final_state = await app.ainvoke(budget.initial_state(conversation))
+        return final_state["messages"], last_assistant_message(final_state["messages"])
+
+    except Exception as e:
+        print(f"Error processing message: {e}")
+        return conversation, "Sorry, I couldn't process your request. Please try again."
+
+# Progress shown to the user while a tool runs
+TOOL_LABELS = {
+    "check_availability": "Checking calendar availability...",
+    "suggest_time_slots": "Finding available time slots...",
+    "find_free_slots": "Searching for free slots...",
+    "confirm_booking_details": "Preparing booking confirmation...",
+    "create_event": "Booking appointment...",
+    "create_events_batch": "Booking appointments...",
+    "update_event": "Updating appointment...",
+    "delete_event": "Cancelling appointment...",
+}
+
+def tool_event(name, status):
+    return {"type": "tool", "name": name, "status": status, "label": TOOL_LABELS.get(name, f"Running {name}...")}
+
+async def astream_message(conversation: list):
+    """aprocess_message as a stream of events, yielded as they happen.
+
+    {'type': 'token', 'content'} for each piece of model output,
+    {'type': 'tool', 'name', 'status': 'start' | 'end', 'label'} around tool
+    calls, {'type': 'reset'} when the small model's reply was rejected and the
+    step is answered again (drop the tokens shown so far), and last
+    {'type': 'done', 'response', 'messages'}. Tokens streamed before a tool
+    call are the model thinking out loud, not the answer.
+    """
+    messages = list(conversation)
+    try:
+        app, _ = get_agent()
+        async for mode, chunk in app.astream(budget.initial_state(conversation), stream_mode=["messages", "updates", "custom"]):
+            if mode == "custom":
+                yield chunk
+            elif mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "agent" and isinstance(message.content, str) and message.content:
+                    yield {"type": "token", "content": message.content}
+            elif "agent" in chunk:
+                # Empty when the budget ran out before the model was called
+                for message in chunk["agent"].get("messages", []):
+                    messages.append(message)
+                    for call in getattr(message, "tool_calls", None) or []:
+                        yield tool_event(call["name"], "start")
+            elif "tools" in chunk:
+                for message in chunk["tools"]["messages"]:
+                    messages.append(message)
+                    yield tool_event(message.name, "end")
+            elif "finish" in chunk:
+                messages.extend(chunk["finish"]["messages"])
+                yield {"type": "token", "content": messages[-1].content}
+
+    except Exception as e:
+        print(f"Error processing message: {e}")
+        yield {"type": "done", "response": "Sorry, I couldn't process your request. Please try again.", "messages": conversation}
+        return
+
+    yield {"type": "done", "response": last_assistant_message(messages), "messages": messages, "stop_reason": budget.stop_reason(messages[len(conversation):])}
+
+def last_assistant_message(messages):
+    for msg in reversed(messages):
+        if msg.type == "ai" and msg.content:
+            return msg.content
+    return ""
+
 def main(conversation):
     if not conversation:
         print("⚠️ No user input received.")
         return
 
-    initial_state = {
-        "messages": conversation
-    }
+    initial_state = budget.initial_state(conversation)
 
     print("Processing your request...")
     try:
-        for chunk in create_agent_graph().stream(initial_state):
-            if "agent" in chunk:
-                message = chunk["agent"]["messages"][-1]
-                if hasattr(message, 'content') and message.content:
-                    print(f"\n🤖 Assistant: {message.content}")
+        app, _ = get_agent()
+        for chunk in app.stream(initial_state):
+            if "agent" in chunk or "finish" in chunk:
+                update = chunk.get("agent") or chunk["finish"]
+                # Tool-call messages are kept too, so the saved history stays valid
+                for message in update.get("messages", []):
                     conversation.append(message)
+                    if message.type == "ai" and message.content:
+                        print(f"\n🤖 Assistant: {message.content}")
             elif "tools" in chunk:
                 for message in chunk["tools"]["messages"]:
                     print(f"🛠️ Tool executed: {message.name}")
@@ -503,12 +615,17 @@ def main(conversation):
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
     print("💬 Welcome to TailorTalk - AI Appointment Assistant!")
     print("Type 'exit' anytime to quit.\n")
 
     from langchain_core.messages import HumanMessage
+    import sessions
 
-    conversation = []
+    # The conversation carries over between runs of the CLI
+    session_id = os.getenv("CLI_SESSION", "cli")
+    conversation = sessions.history(session_id)
 
     while True:
         user_input = input("You: ")
@@ -516,5 +633,7 @@ if __name__ == "__main__":
             print("👋 Goodbye!")
             break
 
+        start = len(conversation)
         conversation.append(HumanMessage(content=user_input))
-        main(conversation)
\ No newline at end of file
+        main(conversation)
+        sessions.save(session_id, conversation[start:])
\ No newline at end of file
@@ -1,53 +1,209 @@
 # main.py
+import os
+import json
+import time
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+# The modules below read their settings from the environment as they are imported
+load_dotenv()
+
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from llm import process_message
+from llm import get_agent, get_prompt_stats
 from langchain_core.messages import HumanMessage
+import api_call
+import budget
+import async_calendar
+import concurrency
+import calendar_fields
+import context
+import event_cache
+import router
+import prefetch
+import tool_node
+import tool_output
+import tiers
+import response_cache
+import sessions
+from service_pool import ServicePool
 import uvicorn
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Ready calendar services per user, so /chat skips discovery and token refreshes
+service_pool = ServicePool(
+    scopes=api_call.scopes,
+    client_id=os.getenv("GOOGLE_CLIENT_ID"),
+    client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+    # A user's cached calendar lives as long as their pooled service
+    on_evict=event_cache.drop_stores,
+)
+
+def warmup():
+    """First-use work done once at startup, so the first request doesn't pay for it:
+    Google credentials and the calendar service, the compiled agent graph and the
+    model clients, and the session database. Returns seconds per step; a failed step is logged and left lazy."""
+    timings = {}
+    for name, step in (("calendar", api_call.default_service), ("agent", get_agent), ("sessions", sessions.graph)):
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.error(f"Warmup step {name} failed: {e}")
+        timings[name] = time.perf_counter() - started
+    logger.info("Warmup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    return timings
 
-# Session storage (in-memory, for production use Redis/Database)
-sessions = {}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Blocking work (to_thread, sync tools) shares a bounded pool
+    executor = concurrency.use_executor()
+    # Credentials, the agent graph and the tool-bound models, before the first request
+    await asyncio.to_thread(warmup)
+    yield
+    # Close the pooled keep-alive connections to the Calendar API
+    await async_calendar.close_http()
+    service_pool.close()
+    response_cache.cache.close()
+    sessions.close()
+    executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
 
 class ChatRequest(BaseModel):
     session_id: str
     message: str
+    refresh_token: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
+    # Set when the agent hit its per-request budget: "iterations", "deadline" or "tokens"
+    stop_reason: Optional[str] = None
 
 # Update the health check endpoint
 @app.get("/")
 def health_check():
     return {"status": "ok", "message": "Service is running"}
 
-@app.post("/chat")
-async def chat_endpoint(request: Request):
-    data = await request.json()
-    session_id = data.get("session_id")
-    user_message = data.get("message")
-    refresh_token = data.get("refresh_token")  # Added
-
-    # Create credentials from refresh token
-    creds = Credentials(
-        token=None,
-        refresh_token=refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=os.getenv("GOOGLE_CLIENT_ID"),
-        client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-        scopes=[
-            'https://www.googleapis.com/auth/calendar.events',
-            'https://www.googleapis.com/auth/calendar.readonly'
-        ]
+@app.get("/stats")
+def stats():
+    return {
+        "router": router.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "sessions": sessions.get_stats(),
+        "concurrency": concurrency.get_stats(),
+        "prefetch": prefetch.get_stats(),
+        "context": context.get_stats(),
+        "prompt": get_prompt_stats(),
+        "budget": budget.get_stats(),
+        "models": tiers.get_stats(),
+        "tools": tool_node.get_stats(),
+        "tool_output": tool_output.get_stats(),
+        "calendar_calls": calendar_fields.get_stats(),
+    }
+
+async def user_service(refresh_token):
+    """Pooled (service, credentials) for the request's user, None without a refresh token"""
+    if not refresh_token:
+        return None
+    # Only a cold or expired token costs an OAuth round trip, and that stays off the event loop
+    try:
+        return await asyncio.to_thread(service_pool.get, refresh_token)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Could not refresh Google credentials: {e}")
+
+async def admit():
+    """One of this worker's CHAT_CONCURRENCY turn slots, or 503 if none frees up in time"""
+    try:
+        return await concurrency.acquire()
+    except concurrency.Busy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def hold(session_id):
+    """The session, held from load to save so its turns run one at a time across
+    workers, or 409 if another turn keeps it past SESSION_LOCK_TTL"""
+    try:
+        return await sessions.acquire(session_id)
+    except sessions.SessionBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest):
+    release = await admit()
+    try:
+        user = await user_service(request.refresh_token)
+        # Use this user's service for the request's calendar calls
+        tokens = api_call.bind_user(*user) if user else None
+
+        try:
+            unlock = await hold(request.session_id)
+            try:
+                # The client sends only the new message; the rest comes from the session's checkpoint
+                history = await asyncio.to_thread(sessions.history, request.session_id)
+                conversation = history + [HumanMessage(content=request.message)]
+                messages, response = await response_cache.aprocess_message(conversation)
+                # A failed turn returns the conversation unchanged; only this turn's messages count
+                new_messages = list(messages)[len(history):]
+                await asyncio.to_thread(sessions.save, request.session_id, new_messages)
+            finally:
+                await unlock()
+        finally:
+            if tokens:
+                api_call.unbind_user(tokens)
+    finally:
+        release()
+
+    return ChatResponse(response=response, stop_reason=budget.stop_reason(new_messages))
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """/chat as Server-Sent Events: model tokens and tool progress as they happen,
+    then a final "done" event with the whole response"""
+    # Held until the stream ends; a busy worker answers 503 before streaming starts
+    release = await admit()
+    unlock = None
+    try:
+        user = await user_service(request.refresh_token)
+        unlock = await hold(request.session_id)
+        history = await asyncio.to_thread(sessions.history, request.session_id)
+    except BaseException:
+        if unlock:
+            await unlock()
+        release()
+        raise
+    conversation = history + [HumanMessage(content=request.message)]
+
+    async def finish():
+        await unlock()
+        release()
+
+    async def events():
+        tokens = api_call.bind_user(*user) if user else None
+        try:
+            async for event in response_cache.astream_message(conversation):
+                if event["type"] == "done":
+                    messages = list(event.pop("messages"))
+                    await asyncio.to_thread(sessions.save, request.session_id, messages[len(history):])
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            if tokens:
+                api_call.unbind_user(tokens)
+            await finish()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Frees the slot and the session if the client left before the stream started
+        background=BackgroundTask(finish),
     )
-    
-    # Refresh token if needed
-    if creds.expired:
-        creds.refresh(Request())
-    
-    # Build service
-    service = build('calendar', 'v3', credentials=creds)
 
 
 if __name__ == "__main__":
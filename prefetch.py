@@ -0,0 +1,144 @@
+"""Speculative event cache warm-up while the agent's first model call runs.
+
+The agent nearly always looks at the calendar for the day the user named, but
+only after a full model round trip. speculate() pulls the dates out of the
+message the same way the router does and syncs the event store on a
+background thread in the meantime, so the tool step reads the events locally.
+
+A lookup for a prefetched date that finds the store fresh is a hit; one for a
+date that was not prefetched, or before the store was warm, is a miss.
+Prefetched dates that no tool looked at are counted as wasted.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from langchain_core.messages import HumanMessage
+import availability
+import function
+
+logger = logging.getLogger(__name__)
+
+# Set PREFETCH=0 to turn speculative prefetch off
+PREFETCH_ENABLED = os.getenv("PREFETCH", "1") != "0"
+# How long an async tool waits for a prefetch already in flight
+PREFETCH_WAIT = 5.0
+
+_current = contextvars.ContextVar("prefetch", default=None)
+
+_stats = {"turns": 0, "dates": 0, "hits": 0, "misses": 0, "wasted": 0, "errors": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def candidate_dates(text, now):
+    """Dates the message refers to, in order, without duplicates"""
+    # Imported here: function imports this module, and both of these import function
+    import llm
+    import router
+    dates = []
+    for phrase in router.DATE_PATTERN.findall(text.lower()):
+        date = llm.parse_relative_date(phrase, now)
+        if date and date not in dates:
+            dates.append(date)
+    return dates
+
+
+def warm(state):
+    started = time.perf_counter()
+    try:
+        function.get_store(function.active_service()).sync()
+    except Exception as e:
+        logger.warning(f"Prefetch failed: {e}")
+        _count("errors")
+    finally:
+        state["done"].set()
+        with _stats_lock:
+            _stats["seconds"] += time.perf_counter() - started
+
+
+@contextmanager
+def speculate(conversation):
+    """Warm the event store for the dates in the latest user message while the body runs"""
+    message = conversation[-1] if conversation else None
+    if (
+        not PREFETCH_ENABLED
+        or not function.CACHE_ENABLED
+        or not isinstance(message, HumanMessage)
+        or function.active_service() is None
+    ):
+        yield
+        return
+    dates = candidate_dates(message.content, datetime.now(availability.IST))
+    if not dates:
+        yield
+        return
+
+    state = {"dates": set(dates), "used": set(), "done": threading.Event()}
+    token = _current.set(state)
+    # The copied context carries the bound user's calendar service into the thread
+    threading.Thread(target=contextvars.copy_context().run, args=(warm, state), daemon=True).start()
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        with _stats_lock:
+            _stats["turns"] += 1
+            _stats["dates"] += len(dates)
+            _stats["wasted"] += len(state["dates"] - state["used"])
+
+
+def _covered(state, start_date, end_date):
+    return {date for date in state["dates"] if start_date <= date <= end_date}
+
+
+def record_lookup(start_date, end_date, fresh):
+    """Called by the event reads behind the calendar tools"""
+    state = _current.get()
+    if state is None:
+        return
+    covered = _covered(state, start_date, end_date)
+    state["used"] |= covered
+    _count("hits" if covered and fresh else "misses")
+
+
+def _in_flight(start_date, end_date):
+    state = _current.get()
+    if state is None or state["done"].is_set() or not _covered(state, start_date, end_date):
+        return None
+    return state["done"]
+
+
+def wait(start_date, end_date):
+    """Wait for a prefetch in flight that covers these dates, rather than fetching again"""
+    done = _in_flight(start_date, end_date)
+    if done is not None:
+        done.wait(PREFETCH_WAIT)
+
+
+async def ready(start_date, end_date):
+    """wait() without blocking the event loop"""
+    done = _in_flight(start_date, end_date)
+    if done is not None:
+        await asyncio.to_thread(done.wait, PREFETCH_WAIT)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(turns=0, dates=0, hits=0, misses=0, wasted=0, errors=0, seconds=0.0)
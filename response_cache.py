@@ -0,0 +1,240 @@
+"""Cache of read-only assistant replies, in front of router/agent.
+
+A reply is cached under the calendar owner, the event store fingerprint, the
+conversation before the message, and the normalised message with its dates
+resolved ("tomorrow" becomes the date it means). Any change to the calendar changes the fingerprint, so stale
+replies are never served. Only self-contained reads are cached: the message
+names a day, does not ask for a change, does not answer a question from the
+assistant, and the turn called no tool that writes.
+
+Entries live in an in-memory LRU with a TTL, optionally backed by an SQLite
+file (RESPONSE_CACHE_DB) that is shared across restarts and workers.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from langchain_core.messages import AIMessage, HumanMessage
+import api_call
+import availability
+import budget
+import function
+import llm
+import router
+
+logger = logging.getLogger(__name__)
+
+# Set RESPONSE_CACHE=0 to disable
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Replies about "today" drop slots as the day goes on, so keep entries short-lived
+TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+DISK_PATH = os.getenv("RESPONSE_CACHE_DB")
+
+READ_TOOLS = {"check_availability", "suggest_time_slots", "find_free_slots"}
+
+
+def normalize(text):
+    text = re.sub(r"[^\w\s:-]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """LRU + TTL map of key -> reply, with an optional SQLite tier"""
+
+    def __init__(self, max_size=MAX_ENTRIES, ttl=TTL, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # The SQLite file is opened on first use, not at import
+        self.path = path
+        self._db = None
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "uncacheable": 0, "evictions": 0, "expired": 0}
+
+    def _disk(self):
+        """The SQLite connection, or None without a path; call with the lock held"""
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, stored REAL)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, stored = entry
+                if now - stored <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return response
+                del self._entries[key]
+                self.stats["expired"] += 1
+            if self._disk() is not None:
+                row = self._db.execute("SELECT response, stored FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, response):
+        stored = time.time()
+        with self._lock:
+            self._remember(key, response, stored)
+            self.stats["stores"] += 1
+            if self._disk() is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, stored))
+                self._db.execute("DELETE FROM responses WHERE stored < ?", (stored - self.ttl,))
+                self._db.commit()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key, response, stored):
+        self._entries[key] = (response, stored)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk() is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            # Nothing reopens the file after close
+            self.path = None
+
+
+cache = ResponseCache(path=DISK_PATH)
+
+
+def calendar_owner():
+    credentials = api_call.bound_credentials()
+    token = getattr(credentials, "refresh_token", None)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest() if token else "default"
+
+
+def cache_key(conversation, now=None):
+    """Key for the latest user message, or None when its reply must not be cached"""
+    if not CACHE_ENABLED or not function.CACHE_ENABLED or not conversation:
+        return None
+    message = conversation[-1]
+    if not isinstance(message, HumanMessage):
+        return None
+    text = message.content.lower()
+    previous = next((m.content for m in reversed(conversation[:-1]) if m.type == "ai" and m.content), None)
+    if router.WRITE_PATTERN.search(text) or (previous and previous.rstrip().endswith("?")):
+        return None
+
+    now = now or datetime.now(availability.IST)
+    dates = []
+
+    def resolve(match):
+        date = llm.parse_relative_date(match.group(0), now)
+        dates.append(date)
+        return date or match.group(0)
+
+    text = router.DATE_PATTERN.sub(resolve, text)
+    if not dates or not all(dates):
+        return None
+
+    service = function.active_service()
+    if service is None:
+        return None
+    store = function.get_store(service)
+    # Cheap when fresh; otherwise picks up changes made outside this process
+    store.sync()
+    # A follow-up ("what about friday?") means something else after another conversation
+    context = [[m.type, str(m.content)] for m in conversation[:-1] if m.type in ("human", "ai") and m.content]
+    key = [calendar_owner(), store.calendar_id, store.fingerprint(), context, normalize(text)]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def read_only(new_messages):
+    """True when the turn's tool calls, if any, only read the calendar"""
+    for message in new_messages:
+        for call in getattr(message, "tool_calls", None) or []:
+            if call["name"] not in READ_TOOLS:
+                return False
+    return True
+
+
+def _lookup(conversation):
+    try:
+        key = cache_key(conversation)
+    except Exception as e:
+        logger.warning(f"Response cache key failed: {e}")
+        key = None
+    if key is None:
+        cache.count("uncacheable")
+        return None, None
+    return key, cache.get(key)
+
+
+def _store(key, conversation, result):
+    messages, response = result
+    new_messages = list(messages)[len(conversation):]
+    # No new messages means the turn failed and response is an apology; a
+    # turn cut short by its budget is partial and worth asking again
+    if key and response and new_messages and read_only(new_messages) and not budget.stop_reason(new_messages):
+        cache.put(key, response)
+    return result
+
+
+def process_message(conversation):
+    """router.process_message, serving repeated read-only questions from the cache"""
+    key, response = _lookup(conversation)
+    if response is not None:
+        return list(conversation) + [AIMessage(content=response)], response
+    return _store(key, conversation, router.process_message(conversation))
+
+
+async def aprocess_message(conversation):
+    # The key may sync the event store, which is blocking I/O
+    key, response = await asyncio.to_thread(_lookup, conversation)
+    if response is not None:
+        return list(conversation) + [AIMessage(content=response)], response
+    result = await router.aprocess_message(conversation)
+    # With RESPONSE_CACHE_DB set, storing writes to SQLite
+    return await asyncio.to_thread(_store, key, conversation, result)
+
+
+async def astream_message(conversation):
+    """router.astream_message, with a cached reply sent as a single token"""
+    key, response = await asyncio.to_thread(_lookup, conversation)
+    if response is not None:
+        yield {"type": "token", "content": response}
+        yield {"type": "done", "response": response, "messages": list(conversation) + [AIMessage(content=response)]}
+        return
+    async for event in router.astream_message(conversation):
+        if event["type"] == "done":
+            await asyncio.to_thread(_store, key, conversation, (event["messages"], event["response"]))
+        yield event
+
+
+def get_stats():
+    with cache._lock:
+        stats = dict(cache.stats, entries=len(cache._entries))
+    lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return stats
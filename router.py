@@ -0,0 +1,243 @@
+"""Rule-based fast path in front of the agent for simple calendar reads.
+
+Messages like "what's on my calendar tomorrow?" or "am I free Friday at 3pm?"
+are classified with a few patterns, their day and time resolved with
+parse_relative_date / parse_time_preference, and answered straight from
+get_events / check_availability without an LLM call. Anything the router is
+not confident about goes to the agent unchanged.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from datetime import datetime
+from langchain_core.messages import AIMessage, HumanMessage
+import availability
+import function
+import llm
+import prefetch
+
+logger = logging.getLogger(__name__)
+
+# Set INTENT_ROUTER=0 to send every message to the agent
+ROUTER_ENABLED = os.getenv("INTENT_ROUTER", "1") != "0"
+CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE", "0.8"))
+
+# Hours checked when the user asks about a part of the day
+PERIOD_WINDOWS = {"morning": ("09:00", "12:00"), "afternoon": ("14:00", "17:00"), "evening": ("18:00", "21:00")}
+WORKING_HOURS = ("09:00", "17:00")
+
+WEEKDAYS = r"monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+DATE_PATTERN = re.compile(
+    rf"\b(today|tomorrow|(?:next\s+)?(?:{WEEKDAYS})|\d{{4}}-\d{{2}}-\d{{2}})\b"
+)
+TIME_PATTERN = re.compile(r"\b(\d{1,2}(?::\d{2})?\s*(?:am|pm)|\d{1,2}:\d{2}|morning|afternoon|evening)\b")
+AGENDA_PATTERN = re.compile(
+    r"\b(what(?:'s| is| do i have)|show(?: me)?|list|anything)\b.*"
+    r"\b(calendar|schedule|agenda|events?|meetings?|planned|going on)\b"
+)
+FREE_PATTERN = re.compile(r"\b(am i|are we|is my calendar)\s+(free|available|busy|open)\b|\bdo i have time\b")
+# Anything that changes the calendar is the agent's job
+WRITE_PATTERN = re.compile(
+    r"\b(book|create|add|cancel|delete|remove|move|reschedule|update|change|rename|set up|"
+    r"schedule (?:a|an|me|my|it|the))\b"
+)
+MAX_WORDS = 14
+
+_stats = {"messages": 0, "hits": 0, "fallbacks": 0, "by_intent": {}, "fast_seconds": 0.0, "agent_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def classify(message, now, previous=None):
+    """Intent of a message, or None when it is not a simple read.
+
+    Returns {'intent', 'date', 'start_time', 'end_time', 'confidence'}, with
+    intent 'agenda' or 'free'. previous is the assistant's last reply, if any.
+    """
+    text = message.lower().strip()
+    if not text or WRITE_PATTERN.search(text):
+        return None
+    if FREE_PATTERN.search(text):
+        intent = "free"
+    elif AGENDA_PATTERN.search(text):
+        intent = "agenda"
+    else:
+        return None
+
+    confidence = 1.0
+    dates = DATE_PATTERN.findall(text)
+    if len(set(dates)) > 1:
+        return None
+    date = llm.parse_relative_date(dates[0], now) if dates else now.strftime('%Y-%m-%d')
+    if not date:
+        return None
+    if not dates:
+        # "Am I free?" with no day could be about anything earlier in the chat
+        confidence -= 0.3
+
+    start_time, end_time = None, None
+    times = TIME_PATTERN.findall(text)
+    if len(times) > 1:
+        return None
+    if times:
+        if intent == "agenda":
+            confidence -= 0.3
+        start_time = llm.parse_time_preference(times[0].replace(" ", ""))
+        if not start_time or not re.fullmatch(r"\d{1,2}:\d{2}", start_time):
+            return None
+        start_time = availability.format_minutes(availability.to_minutes(start_time))
+        window = PERIOD_WINDOWS.get(times[0])
+        if window:
+            start_time, end_time = window
+        else:
+            end_time = availability.format_minutes(min(availability.to_minutes(start_time) + 60, availability.DAY_MINUTES - 1))
+
+    if len(text.split()) > MAX_WORDS:
+        confidence -= 0.3
+    if previous and previous.rstrip().endswith("?"):
+        # The assistant asked something; a short reply is probably an answer to it
+        confidence -= 0.3
+
+    return {
+        "intent": intent,
+        "date": date,
+        "start_time": start_time,
+        "end_time": end_time,
+        "confidence": round(confidence, 2),
+    }
+
+
+def format_day(date):
+    return datetime.strptime(date, '%Y-%m-%d').strftime('%A, %B %d')
+
+
+def agenda_reply(route, events):
+    lines = []
+    for event in events:
+        if event.get('start', {}).get('date') == route["date"]:
+            lines.append(f"- All day: {event.get('summary', 'Untitled Event')}")
+    index = availability.build_day_index(events, route["date"])
+    for entry in index.conflicts(0, availability.DAY_MINUTES):
+        lines.append(f"- {entry['display_start']} - {entry['display_end']}: {entry['name']}")
+    if not lines:
+        return f"You have nothing scheduled on {format_day(route['date'])}."
+    return f"Here's what's on your calendar for {format_day(route['date'])}:\n" + "\n".join(lines)
+
+
+def free_reply(route, report):
+    if report.get("error"):
+        return None
+    period = f"between {report['checked_period'].replace(' - ', ' and ')}"
+    day = format_day(route["date"])
+    if report["available"]:
+        return f"Yes, you're free on {day} {period}."
+    conflicts = "\n".join(f"- {c['name']} ({c['start']} - {c['end']})" for c in report["conflicts"])
+    return f"No, you have {len(report['conflicts'])} conflict(s) on {day} {period}:\n{conflicts}"
+
+
+def _route(conversation):
+    """Route for the latest user message if the fast path can take it"""
+    if not ROUTER_ENABLED or not conversation or not isinstance(conversation[-1], HumanMessage):
+        return None
+    previous = next((m.content for m in reversed(conversation[:-1]) if m.type == "ai" and m.content), None)
+    route = classify(conversation[-1].content, datetime.now(availability.IST), previous)
+    if route is None or route["confidence"] < CONFIDENCE_THRESHOLD:
+        return None
+    return route
+
+
+def _window(route):
+    return route["start_time"] or WORKING_HOURS[0], route["end_time"] or WORKING_HOURS[1]
+
+
+def _record(intent, seconds, fast):
+    with _stats_lock:
+        _stats["messages"] += 1
+        if fast:
+            _stats["hits"] += 1
+            _stats["by_intent"][intent] = _stats["by_intent"].get(intent, 0) + 1
+            _stats["fast_seconds"] += seconds
+        else:
+            _stats["fallbacks"] += 1
+            _stats["agent_seconds"] += seconds
+
+
+def _reply(conversation, route, response, started):
+    _record(route["intent"], time.perf_counter() - started, True)
+    logger.info(f"Fast path answered {route['intent']} for {route['date']} (confidence {route['confidence']})")
+    return list(conversation) + [AIMessage(content=response)], response
+
+
+def process_message(conversation):
+    """llm.process_message, answering simple reads without the agent"""
+    started = time.perf_counter()
+    route = _route(conversation)
+    if route:
+        if route["intent"] == "agenda":
+            response = agenda_reply(route, function.get_events(function.previous_day(route["date"]), route["date"]))
+        else:
+            response = free_reply(route, function.check_availability(route["date"], *_window(route)))
+        if response:
+            return _reply(conversation, route, response, started)
+    # Warm the calendar for the dates mentioned while the model thinks
+    with prefetch.speculate(conversation):
+        result = llm.process_message(conversation)
+    _record(None, time.perf_counter() - started, False)
+    return result
+
+
+async def _afast_path(conversation):
+    route = _route(conversation)
+    if not route:
+        return None, None
+    if route["intent"] == "agenda":
+        events = await function.aget_events(function.previous_day(route["date"]), route["date"])
+        return route, agenda_reply(route, events)
+    return route, free_reply(route, await function.acheck_availability(route["date"], *_window(route)))
+
+
+async def aprocess_message(conversation):
+    started = time.perf_counter()
+    route, response = await _afast_path(conversation)
+    if response:
+        return _reply(conversation, route, response, started)
+    with prefetch.speculate(conversation):
+        result = await llm.aprocess_message(conversation)
+    _record(None, time.perf_counter() - started, False)
+    return result
+
+
+async def astream_message(conversation):
+    """llm.astream_message, with fast-path answers sent as a single token"""
+    started = time.perf_counter()
+    route, response = await _afast_path(conversation)
+    if response:
+        messages, response = _reply(conversation, route, response, started)
+        yield {"type": "token", "content": response}
+        yield {"type": "done", "response": response, "messages": messages}
+        return
+    with prefetch.speculate(conversation):
+        async for event in llm.astream_message(conversation):
+            if event["type"] == "done":
+                _record(None, time.perf_counter() - started, False)
+            yield event
+
+
+def get_stats():
+    """Hit rate, plus the agent time the fast path saved at the average agent latency"""
+    with _stats_lock:
+        stats = dict(_stats, by_intent=dict(_stats["by_intent"]))
+    stats["hit_rate"] = stats["hits"] / stats["messages"] if stats["messages"] else 0.0
+    agent_average = stats["agent_seconds"] / stats["fallbacks"] if stats["fallbacks"] else None
+    stats["avg_agent_seconds"] = agent_average
+    stats["avg_fast_seconds"] = stats["fast_seconds"] / stats["hits"] if stats["hits"] else None
+    stats["estimated_seconds_saved"] = (
+        stats["hits"] * agent_average - stats["fast_seconds"] if agent_average is not None else None
+    )
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(messages=0, hits=0, fallbacks=0, by_intent={}, fast_seconds=0.0, agent_seconds=0.0)
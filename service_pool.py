@@ -0,0 +1,173 @@
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from collections import OrderedDict
+import httplib2
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+_discovery_doc = None
+_discovery_lock = threading.Lock()
+
+
+def discovery_document():
+    """Calendar v3 discovery document bundled with googleapiclient, read once"""
+    global _discovery_doc
+    with _discovery_lock:
+        if _discovery_doc is None:
+            _discovery_doc = get_static_doc("calendar", "v3")
+        return _discovery_doc
+
+
+def build_service(credentials):
+    """Calendar service from the bundled discovery document; makes no network calls.
+
+    Each thread gets its own authorized httplib2.Http (httplib2 is not
+    thread-safe), and keeps reusing it so connections stay alive.
+    """
+    local = threading.local()
+
+    def authorized_http():
+        if not hasattr(local, "http"):
+            local.http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        return local.http
+
+    def request_builder(http, *args, **kwargs):
+        return HttpRequest(authorized_http(), *args, **kwargs)
+
+    return build_from_document(discovery_document(), http=authorized_http(), requestBuilder=request_builder)
+
+
+class PooledService:
+    def __init__(self, credentials, service):
+        self.credentials = credentials
+        self.service = service
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refresh_if_needed(self, margin):
+        """Refresh the access token if it is missing or expires within margin seconds"""
+        with self.lock:
+            credentials = self.credentials
+            if credentials.token:
+                # google-auth keeps expiry as naive UTC
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                if credentials.expiry is None or (credentials.expiry - now).total_seconds() > margin:
+                    return False
+            # Imported on first refresh: it pulls in requests
+            from google.auth.transport.requests import Request
+            credentials.refresh(Request())
+            return True
+
+
+class ServicePool:
+    """Ready calendar services and refreshed credentials per user, LRU + idle TTL.
+
+    A background thread refreshes tokens refresh_margin seconds before they
+    expire, so requests do not wait on the OAuth round trip. on_evict(service)
+    is called for each service that leaves the pool, so state kept per service
+    (such as its event store) can go with it.
+    """
+
+    def __init__(self, scopes, client_id=None, client_secret=None, max_size=128, ttl=3600,
+                 refresh_margin=300, refresh_interval=60, on_evict=None):
+        self.scopes = scopes
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.max_size = max_size
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.refresh_interval = refresh_interval
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "background_refreshes": 0}
+
+    @staticmethod
+    def user_key(refresh_token):
+        return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+    def get(self, refresh_token):
+        """(service, credentials) for the user owning refresh_token"""
+        self._start_refresher()
+        key = self.user_key(refresh_token)
+        with self._lock:
+            self._expire_idle()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+        if entry is None:
+            credentials = Credentials(
+                token=None,
+                refresh_token=refresh_token,
+                token_uri=TOKEN_URI,
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                scopes=self.scopes,
+            )
+            entry = PooledService(credentials, build_service(credentials))
+            with self._lock:
+                entry = self._entries.setdefault(key, entry)
+                while len(self._entries) > self.max_size:
+                    self._evict(next(iter(self._entries)))
+        entry.last_used = time.monotonic()
+        entry.refresh_if_needed(0)
+        return entry.service, entry.credentials
+
+    def _expire_idle(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if now - entry.last_used > self.ttl]:
+            self._evict(key)
+
+    def _evict(self, key, counted=True):
+        """Drop an entry; call with the lock held"""
+        entry = self._entries.pop(key)
+        if counted:
+            self.stats["evictions"] += 1
+        if self.on_evict is not None:
+            self.on_evict(entry.service)
+
+    def refresh_expiring(self):
+        """Refresh every pooled token that expires within refresh_margin"""
+        with self._lock:
+            self._expire_idle()
+            entries = list(self._entries.values())
+        for entry in entries:
+            try:
+                if entry.refresh_if_needed(self.refresh_margin):
+                    self.stats["background_refreshes"] += 1
+            except Exception as e:
+                logger.warning(f"Background token refresh failed: {e}")
+
+    def _start_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="token-refresher", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh_expiring()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key, counted=False)
@@ -0,0 +1,216 @@
+"""Conversation state per session_id, checkpointed to SQLite.
+
+Each session is a LangGraph thread: its messages are the agent graph's state,
+saved by a SqliteSaver checkpointer in SESSION_DB. Clients send only the new
+message; a turn loads the thread's latest checkpoint, runs (through the agent,
+the router's fast path or the response cache) and saves the messages it
+added. Checkpoints are stored with LangGraph's msgpack serializer, and only
+the last SESSION_CHECKPOINTS per thread are kept.
+
+The database is opened on first use in WAL mode, so several uvicorn workers
+can share it, and it survives restarts. A turn holds its session from load to
+save (acquire()), so two turns for one session_id, in one worker or several,
+run one after the other instead of both starting from the same checkpoint.
+The hold is a row in session_locks that expires after SESSION_LOCK_TTL
+seconds, so a worker that dies mid-turn doesn't hold the session for good.
+"""
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+SESSION_CHECKPOINTS = int(os.getenv("SESSION_CHECKPOINTS", "2"))
+# Seconds a worker waits for another worker's write to finish
+BUSY_TIMEOUT = 30
+# Seconds a turn may hold its session; also how long another turn waits for it
+SESSION_LOCK_TTL = float(os.getenv("SESSION_LOCK_TTL", "120"))
+# Seconds between tries while another turn holds the session
+LOCK_POLL = 0.05
+
+_saver = None
+_graph = None
+_lock = threading.Lock()
+
+_stats = {
+    "loads": 0, "messages_loaded": 0, "saves": 0, "messages_saved": 0, "checkpoints_pruned": 0,
+    "lock_waits": 0, "lock_timeouts": 0,
+}
+_stats_lock = threading.Lock()
+
+
+class SessionBusy(Exception):
+    """Another turn held the session for longer than SESSION_LOCK_TTL"""
+
+
+def open_store(path=None):
+    """(Re)open the checkpoint database, SESSION_DB by default"""
+    with _lock:
+        return _open(path or SESSION_DB)
+
+
+def _open(path):
+    global _saver, _graph
+    if _saver is not None:
+        _saver.conn.close()
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+    # Readers don't block the writer, so workers can share the file
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = SqliteSaver(conn)
+    saver.setup()
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_locks "
+            "(thread_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+    # Published once set up: checkpointer() hands it out without the lock
+    _saver, _graph = saver, None
+    return saver
+
+
+def checkpointer():
+    saver = _saver
+    if saver is None:
+        # Concurrent first uses open the database once, not over each other
+        with _lock:
+            saver = _saver if _saver is not None else _open(SESSION_DB)
+    return saver
+
+
+def graph():
+    """The agent graph compiled with the checkpointer, for reading and writing thread state"""
+    global _graph
+    if _graph is None:
+        # Imported here: llm imports the modules that import this one
+        import llm
+        saver = checkpointer()
+        with _lock:
+            if _graph is None:
+                _graph = llm.create_agent_graph(checkpointer=saver)
+    return _graph
+
+
+def config(session_id):
+    return {"configurable": {"thread_id": session_id}}
+
+
+def try_lock(session_id, owner):
+    """Hold the session for owner if no other turn does; True if it's now held"""
+    saver = checkpointer()
+    # Wall-clock time: the expiry is compared across processes
+    now = time.time()
+    with saver.lock, saver.conn:
+        saver.conn.execute("DELETE FROM session_locks WHERE thread_id = ? AND expires < ?", (session_id, now))
+        taken = saver.conn.execute(
+            "INSERT OR IGNORE INTO session_locks VALUES (?, ?, ?)", (session_id, owner, now + SESSION_LOCK_TTL)
+        ).rowcount
+    return taken == 1
+
+
+def unlock(session_id, owner):
+    saver = _saver
+    # A closed store has no turns left to let in; an expired row is taken over anyway
+    if saver is None:
+        return
+    with saver.lock, saver.conn:
+        saver.conn.execute("DELETE FROM session_locks WHERE thread_id = ? AND owner = ?", (session_id, owner))
+
+
+async def acquire(session_id):
+    """Wait until no other turn, in any worker, holds the session, then hold it.
+    Returns a coroutine function that lets it go (safe to call twice); raises
+    SessionBusy if the session stays held for SESSION_LOCK_TTL"""
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + SESSION_LOCK_TTL
+    waited = False
+    while not await asyncio.to_thread(try_lock, session_id, owner):
+        if time.monotonic() >= deadline:
+            with _stats_lock:
+                _stats["lock_timeouts"] += 1
+            raise SessionBusy(f"Session {session_id} stayed busy for {SESSION_LOCK_TTL:g}s")
+        waited = True
+        await asyncio.sleep(LOCK_POLL)
+    if waited:
+        with _stats_lock:
+            _stats["lock_waits"] += 1
+
+    released = False
+
+    async def release():
+        nonlocal released
+        if released:
+            return
+        released = True
+        await asyncio.to_thread(unlock, session_id, owner)
+
+    return release
+
+
+def history(session_id):
+    """The session's messages as of its latest checkpoint"""
+    messages = list(graph().get_state(config(session_id)).values.get("messages", []))
+    with _stats_lock:
+        _stats["loads"] += 1
+        _stats["messages_loaded"] += len(messages)
+    return messages
+
+
+def save(session_id, messages):
+    """Append the messages a turn added to the session"""
+    if not messages:
+        return
+    # As if the agent node had produced them: the thread ends at END, ready for the next turn
+    graph().update_state(config(session_id), {"messages": list(messages)}, as_node="agent")
+    prune(session_id)
+    with _stats_lock:
+        _stats["saves"] += 1
+        _stats["messages_saved"] += len(messages)
+
+
+def prune(session_id, keep=None):
+    """Drop all but the newest keep checkpoints of a session"""
+    keep = SESSION_CHECKPOINTS if keep is None else keep
+    saver = checkpointer()
+    with saver.lock, saver.conn:
+        stale = [row[0] for row in saver.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (session_id, keep),
+        )]
+        for table in ("checkpoints", "writes"):
+            saver.conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id = ?",
+                [(session_id, checkpoint_id) for checkpoint_id in stale],
+            )
+    if stale:
+        with _stats_lock:
+            _stats["checkpoints_pruned"] += len(stale)
+
+
+def delete(session_id):
+    checkpointer().delete_thread(session_id)
+
+
+def close():
+    global _saver, _graph
+    with _lock:
+        if _saver is not None:
+            _saver.conn.close()
+        _saver, _graph = None, None
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(
+            loads=0, messages_loaded=0, saves=0, messages_saved=0, checkpoints_pruned=0, lock_waits=0, lock_timeouts=0
+        )
@@ -1,2 +1,4 @@
 #!/bin/bash
-uvicorn main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+# WEB_CONCURRENCY worker processes (default 1). Workers share sessions.db, and
+# each runs up to CHAT_CONCURRENCY chat turns at once.
+uvicorn main:app --host 0.0.0.0 --port $PORT --workers ${WEB_CONCURRENCY:-1}
@@ -0,0 +1,29 @@
+import llm
+
+
+def test_agent_built_once():
+    graph, model = llm.get_agent()
+    again, same_model = llm.get_agent()
+    assert graph is again and model is same_model
+    assert llm.bound_model() is model
+
+
+def test_agent_rebuilt_when_tools_change():
+    graph, _ = llm.get_agent()
+    tools = llm.create_tools()
+    try:
+        llm.set_tools(tools)
+        # Same tool set, so the compiled graph is kept
+        assert llm.get_agent()[0] is graph
+        llm.set_tools(tools[:-1])
+        smaller, _ = llm.get_agent()
+        assert smaller is not graph
+        assert "delete_event" not in smaller.nodes["tools"].bound.tools_by_name
+    finally:
+        llm.set_tools(tools)
+
+
+if __name__ == "__main__":
+    test_agent_built_once()
+    test_agent_rebuilt_when_tools_change()
+    print("Agent cache tests passed")
@@ -0,0 +1,83 @@
+import asyncio
+import api_call
+import async_calendar
+import function
+from fake_calendar import LocalCalendarHttp, local_async_transport
+
+
+class StaticCredentials:
+    valid = True
+    token = "local-token"
+
+
+events = [
+    {
+        "id": f"e{day}",
+        "summary": f"Review {day}",
+        "start": {"dateTime": f"2030-07-{day:02d}T10:00:00+05:30"},
+        "end": {"dateTime": f"2030-07-{day:02d}T11:00:00+05:30"},
+    }
+    for day in range(1, 4)
+]
+
+
+def run(coroutine_factory, http):
+    async def main():
+        async_calendar.get_http(transport=local_async_transport(http))
+        tokens = api_call.bind_user(None, StaticCredentials())
+        try:
+            return await coroutine_factory()
+        finally:
+            api_call.unbind_user(tokens)
+            await async_calendar.close_http()
+    return asyncio.run(main())
+
+
+def test_client_operations():
+    http = LocalCalendarHttp(events)
+
+    async def scenario():
+        client = async_calendar.current_client()
+        created = await client.insert_event(dict(events[0], id=None, summary="Created"))
+        patched = await client.patch_event(created["id"], {"summary": "Patched"})
+        fetched = await client.get_event(created["id"])
+        await client.delete_event("e1")
+        listed = await client.list_events(function.utc_day_range("2030-07-01", "2030-07-03")[0])
+        return patched, fetched, listed
+
+    patched, fetched, listed = run(scenario, http)
+    assert patched["summary"] == "Patched"
+    assert fetched["summary"] == "Patched"
+    assert [event["summary"] for event in listed] == ["Patched", "Review 2", "Review 3"]
+
+
+def test_concurrent_availability_checks():
+    http = LocalCalendarHttp(events)
+    saved = function.CACHE_ENABLED, function.AVAILABILITY_SOURCE
+    function.CACHE_ENABLED, function.AVAILABILITY_SOURCE = False, "events"
+    try:
+        reports = run(lambda: asyncio.gather(*[
+            function.acheck_availability(f"2030-07-{day:02d}", "09:00", "12:00") for day in range(1, 4)
+        ]), http)
+    finally:
+        function.CACHE_ENABLED, function.AVAILABILITY_SOURCE = saved
+    assert [report["conflicts"][0]["name"] for report in reports] == ["Review 1", "Review 2", "Review 3"]
+
+
+def test_errors_raise_http_error():
+    http = LocalCalendarHttp(events)
+
+    async def scenario():
+        try:
+            await async_calendar.current_client().get_event("missing")
+        except async_calendar.HttpError as e:
+            return e.resp.status
+
+    assert run(scenario, http) == 404
+
+
+if __name__ == "__main__":
+    test_client_operations()
+    test_concurrent_availability_checks()
+    test_errors_raise_http_error()
+    print("Async calendar tests passed")
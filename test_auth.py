@@ -1,4 +1,6 @@
-from api_call import service
+from api_call import default_service
+
+service = default_service()
 
 if service:
     print("✅ Google Calendar service initialized successfully")
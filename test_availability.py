@@ -0,0 +1,69 @@
+from availability import build_day_index, availability_report, suggest_slots, first_free_slots, iter_free_slots
+
+
+def make_event(summary, start, end):
+    return {
+        "summary": summary,
+        "start": {"dateTime": start},
+        "end": {"dateTime": end},
+    }
+
+
+events = [
+    make_event("Standup", "2025-07-01T10:00:00+05:30", "2025-07-01T10:30:00+05:30"),
+    make_event("Review", "2025-07-01T10:15:00+05:30", "2025-07-01T11:00:00+05:30"),
+    # 14:00-15:00 IST, given in UTC
+    make_event("Lunch talk", "2025-07-01T08:30:00Z", "2025-07-01T09:30:00Z"),
+    make_event("Yesterday", "2025-06-30T10:00:00+05:30", "2025-06-30T11:00:00+05:30"),
+    {"summary": "Holiday", "start": {"date": "2025-07-01"}, "end": {"date": "2025-07-02"}},
+]
+
+
+def test_merged_busy_blocks():
+    index = build_day_index(events, "2025-07-01")
+    assert index.busy == [(600, 660), (840, 900)]
+    assert index.is_free(540, 600)
+    assert not index.is_free(650, 700)
+    assert index.is_free(660, 840)
+    assert list(index.free_gaps(540, 1020)) == [(540, 600), (660, 840), (900, 1020)]
+
+
+def test_availability_report():
+    report = availability_report(build_day_index(events, "2025-07-01"), "10:20", "14:30")
+    assert not report["available"]
+    assert [c["name"] for c in report["conflicts"]] == ["Standup", "Review", "Lunch talk"]
+    assert report["conflicts"][2] == {"name": "Lunch talk", "start": "14:00", "end": "15:00"}
+
+
+def test_suggest_slots():
+    index = build_day_index(events, "2025-07-01")
+    assert suggest_slots(index, 1) == ["09:00", "11:00", "11:30", "12:00", "12:30"]
+    assert suggest_slots(index, 1, preferred_time="18:00")[:2] == ["18:00", "18:30"]
+
+
+def test_first_free_slots_across_days():
+    busy_day = [make_event("Offsite", "2025-07-02T09:00:00+05:30", "2025-07-02T17:00:00+05:30")]
+    # Input must be in start order
+    ordered = [events[3], events[0], events[1], events[2]] + busy_day
+    slots = first_free_slots(ordered, "2025-07-01", "2025-07-05", 2, count=3)
+    assert slots == [
+        {"date": "2025-07-01", "time": "11:00"},
+        {"date": "2025-07-01", "time": "11:30"},
+        {"date": "2025-07-01", "time": "12:00"},
+    ]
+    slots = first_free_slots(busy_day, "2025-07-02", "2025-07-05", 8, count=1)
+    assert slots == [{"date": "2025-07-03", "time": "09:00"}]
+
+
+def test_free_slot_walk_is_lazy():
+    walk = iter_free_slots([], "2025-07-01", "2030-12-31", 60)
+    assert next(walk) == ("2025-07-01", 540)
+
+
+if __name__ == "__main__":
+    test_merged_busy_blocks()
+    test_availability_report()
+    test_suggest_slots()
+    test_first_free_slots_across_days()
+    test_free_slot_walk_is_lazy()
+    print("Availability tests passed")
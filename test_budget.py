@@ -0,0 +1,104 @@
+import asyncio
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import StructuredTool
+import budget
+import llm
+import main
+import sessions
+from fastapi.testclient import TestClient
+from fake_llm import ScriptedChatModel
+
+lookups = []
+
+
+def look_again(date: str) -> str:
+    """Lookup that never satisfies the model"""
+    lookups.append(date)
+    return '{"ok":true,"data":"not sure yet"}'
+
+
+tool = StructuredTool.from_function(func=look_again, name="look_again", description="Look again")
+
+
+def looping_model(rounds, final="You look free on 2030-07-02 afternoon."):
+    replies = [
+        AIMessage(content="Checking.", tool_calls=[{"name": "look_again", "args": {"date": "2030-07-02"}, "id": f"call-{index}"}])
+        for index in range(rounds)
+    ]
+    return GenericFakeChatModel(messages=iter(replies + [AIMessage(content=final)]))
+
+
+def run(model, conversation, use_async=False, **limits):
+    saved_agent = llm._agent
+    saved_limits = budget.AGENT_MAX_ITERATIONS, budget.AGENT_MAX_TOKENS
+    budget.AGENT_MAX_ITERATIONS = limits.get("iterations", budget.AGENT_MAX_ITERATIONS)
+    budget.AGENT_MAX_TOKENS = limits.get("tokens", budget.AGENT_MAX_TOKENS)
+    llm._agent = (llm.create_agent_graph([tool]), model)
+    lookups.clear()
+    try:
+        if use_async:
+            return asyncio.run(llm.aprocess_message(conversation))
+        return llm.process_message(conversation)
+    finally:
+        llm._agent = saved_agent
+        budget.AGENT_MAX_ITERATIONS, budget.AGENT_MAX_TOKENS = saved_limits
+
+
+def test_iteration_limit_ends_with_partial_answer():
+    budget.reset_stats()
+    messages, response = run(looping_model(3), [HumanMessage(content="am I free on 2030-07-02?")], iterations=2)
+    assert len(lookups) == 2
+    assert response.startswith("You look free on 2030-07-02 afternoon.")
+    assert budget.CUTOFF_MESSAGES[budget.ITERATIONS] in response
+    assert budget.stop_reason(messages) == budget.ITERATIONS
+    # The third round of tool calls was skipped but still answered, so the history stays valid
+    assert messages[-2].type == "tool" and messages[-2].content == budget.SKIPPED_RESULT
+    assert budget.get_stats()["stopped"][budget.ITERATIONS] == 1
+
+
+def test_token_limit_stops_before_tools():
+    budget.reset_stats()
+    messages, response = run(looping_model(3), [HumanMessage(content="am I free on 2030-07-02?")], use_async=True, tokens=1)
+    assert lookups == []
+    assert response == "Checking.\n\n" + budget.CUTOFF_MESSAGES[budget.TOKENS]
+    assert budget.stop_reason(messages) == budget.TOKENS
+
+
+def test_deadline_and_normal_completion():
+    budget.reset_stats()
+    state = budget.initial_state([HumanMessage(content="hello")], deadline=0)
+    assert budget.exhausted(state) == budget.DEADLINE
+    assert llm.should_continue(dict(state, stop_reason=budget.DEADLINE)) == "finish"
+
+    messages, response = run(looping_model(1), [HumanMessage(content="am I free on 2030-07-02?")])
+    assert response == "You look free on 2030-07-02 afternoon."
+    assert budget.stop_reason(messages) is None
+    stats = budget.get_stats()
+    assert stats["completed"] == 1 and stats["iterations"] == 2 and stats["tokens"] > 0
+
+
+def test_failed_turn_reports_no_stop_reason():
+    def unavailable(messages):
+        raise RuntimeError("model unavailable")
+
+    saved = llm._agent
+    llm._agent = (llm.create_agent_graph([tool]), ScriptedChatModel(script=unavailable))
+    # The previous turn ran out of time
+    sessions.save("cut", [HumanMessage(content="am I free?"), budget.cutoff_message(budget.DEADLINE, "Partly checked.")])
+    try:
+        with TestClient(main.app) as client:
+            reply = client.post("/chat", json={"session_id": "cut", "message": "hello again"}).json()
+    finally:
+        llm._agent = saved
+
+    assert reply["response"].startswith("Sorry")
+    assert reply["stop_reason"] is None
+
+
+if __name__ == "__main__":
+    test_iteration_limit_ends_with_partial_answer()
+    test_token_limit_stops_before_tools()
+    test_deadline_and_normal_completion()
+    test_failed_turn_reports_no_stop_reason()
+    print("Budget tests passed")
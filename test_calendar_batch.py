@@ -0,0 +1,65 @@
+import calendar_batch
+import function
+from fake_calendar import build_local_service
+
+
+def make_body(day, summary="Standup"):
+    return {
+        "summary": summary,
+        "start": {"dateTime": f"2025-07-{day:02d}T10:00:00+05:30"},
+        "end": {"dateTime": f"2025-07-{day:02d}T10:30:00+05:30"},
+    }
+
+
+def test_insert_is_split_into_batches_of_50():
+    service = build_local_service()
+    results = calendar_batch.insert_events(service, [make_body(1 + i % 28, f"Event {i}") for i in range(60)])
+    assert all(result["ok"] for result in results)
+    assert [result["response"]["summary"] for result in results] == [f"Event {i}" for i in range(60)]
+    assert [request for request in service._http.requests if request[1] == "batch"] == [("POST", "batch")] * 2
+    assert len(service._http.calendars["primary"]) == 60
+
+
+def test_partial_failures_are_reported_per_item():
+    service = build_local_service([dict(make_body(1), id="a"), dict(make_body(2), id="b")])
+    results = calendar_batch.delete_events(service, ["a", "missing", "b"])
+    assert [result["ok"] for result in results] == [True, False, True]
+    assert results[1]["error"].resp.status == 404
+    assert service._http.calendars["primary"] == {}
+
+
+def test_patch_events():
+    service = build_local_service([dict(make_body(1), id="a")])
+    results = calendar_batch.patch_events(service, [("a", {"summary": "Renamed"})])
+    assert results[0]["response"]["summary"] == "Renamed"
+    assert results[0]["response"]["start"]["dateTime"].startswith("2025-07-01")
+
+
+def test_create_events_batch_skips_conflicts():
+    service = build_local_service([dict(make_body(8, "Dentist"), id="dentist")])
+    saved = function.service, function.CACHE_ENABLED
+    function.service, function.CACHE_ENABLED = service, False
+    try:
+        result = function.create_events_batch([
+            {"date": f"2025-07-{day:02d}", "time": "10:00", "name": "Standup", "duration": 1}
+            for day in range(7, 12)
+        ] + [
+            {"date": "2025-07-07", "time": "10:30", "name": "Overlap"},
+            {"date": "someday", "time": "soon", "name": "Broken"},
+        ])
+    finally:
+        function.service, function.CACHE_ENABLED = saved
+    assert result.startswith("Created 4 events")
+    assert "Standup on 2025-07-08 at 10:00 (conflicts with Dentist)" in result
+    assert "Overlap on 2025-07-07 at 10:30 (conflicts with Standup on 2025-07-07 at 10:00)" in result
+    assert "#7 Broken: invalid date/time" in result
+    assert len(service._http.calendars["primary"]) == 5
+    assert [request for request in service._http.requests if request[1] == "batch"] == [("POST", "batch")]
+
+
+if __name__ == "__main__":
+    test_insert_is_split_into_batches_of_50()
+    test_partial_failures_are_reported_per_item()
+    test_patch_events()
+    test_create_events_batch_skips_conflicts()
+    print("Batch tests passed")
@@ -0,0 +1,53 @@
+from datetime import datetime
+import pytz
+import calendar_fields
+import function
+from fake_calendar import build_local_service
+
+
+events = [
+    {
+        "id": f"e{i}",
+        "summary": f"Meeting {i}",
+        "description": "Agenda and dial-in details " * 20,
+        "attendees": [{"email": f"person{j}@example.com", "responseStatus": "accepted"} for j in range(10)],
+        "start": {"dateTime": f"2030-07-01T{9 + i:02d}:00:00+05:30"},
+        "end": {"dateTime": f"2030-07-01T{9 + i:02d}:30:00+05:30"},
+    }
+    for i in range(5)
+]
+
+
+def list_bytes(fields):
+    service = build_local_service(events)
+    calendar_fields.reset_stats()
+    saved = function.service
+    function.service = service
+    try:
+        listed = list(function.iter_events(datetime(2030, 7, 1, tzinfo=pytz.UTC), fields=fields))
+    finally:
+        function.service = saved
+    assert [event["id"] for event in listed] == [f"e{i}" for i in range(5)]
+    return calendar_fields.get_stats()["events.list"]["response_bytes"], listed
+
+
+def test_list_uses_field_mask():
+    masked_bytes, listed = list_bytes(None)
+    full_bytes, _ = list_bytes("*")
+    assert set(listed[0]) == {"id", "summary", "start", "end"}
+    assert masked_bytes * 5 < full_bytes
+
+
+def test_batch_requests_are_instrumented():
+    service = build_local_service()
+    calendar_fields.reset_stats()
+    function.calendar_batch.insert_events(service, [dict(events[0], id=None)] * 3)
+    stats = calendar_fields.get_stats()["events.insert"]
+    assert stats["calls"] == 3
+    assert stats["response_bytes"] > 0
+
+
+if __name__ == "__main__":
+    test_list_uses_field_mask()
+    test_batch_requests_are_instrumented()
+    print("Field mask tests passed")
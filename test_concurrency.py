@@ -0,0 +1,101 @@
+import asyncio
+import httpx
+from langchain_core.messages import AIMessage
+import concurrency
+import llm
+import main
+from fake_llm import ScriptedChatModel
+
+
+def settings(limit, timeout):
+    saved = concurrency.CHAT_CONCURRENCY, concurrency.CHAT_QUEUE_TIMEOUT
+    concurrency.CHAT_CONCURRENCY, concurrency.CHAT_QUEUE_TIMEOUT = limit, timeout
+    return saved
+
+
+def chat_concurrently(count, latency):
+    """Responses to count simultaneous /chat turns, each one model call of latency seconds"""
+    saved = llm._agent
+    model = ScriptedChatModel(script=lambda messages: AIMessage(content="Done."), latency=latency)
+    llm._agent = (llm.create_agent_graph(llm.create_tools()), model)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/chat", json={"session_id": f"c{n}", "message": "hello"}) for n in range(count)
+            ))
+
+    try:
+        return asyncio.run(run())
+    finally:
+        llm._agent = saved
+
+
+def test_slots_queue_then_refuse():
+    saved = settings(1, 0.05)
+
+    async def run():
+        release = await concurrency.acquire()
+        try:
+            await concurrency.acquire()
+            raise AssertionError("a second turn got a slot")
+        except concurrency.Busy:
+            pass
+        release()
+        # Freeing twice must not hand out an extra slot
+        release()
+        again = await concurrency.acquire()
+        try:
+            await concurrency.acquire()
+            raise AssertionError("a double release freed two slots")
+        except concurrency.Busy:
+            pass
+        again()
+
+    try:
+        concurrency.reset_stats()
+        asyncio.run(run())
+        stats = concurrency.get_stats()
+        assert stats["admitted"] == 2 and stats["rejected"] == 2 and stats["in_flight"] == 0
+    finally:
+        concurrency.CHAT_CONCURRENCY, concurrency.CHAT_QUEUE_TIMEOUT = saved
+
+
+def test_turns_overlap_up_to_the_limit():
+    saved = settings(4, 10)
+    try:
+        concurrency.reset_stats()
+        responses = chat_concurrently(4, 0.2)
+        assert all(response.json()["response"] == "Done." for response in responses)
+        parallel = concurrency.get_stats()
+
+        concurrency.CHAT_CONCURRENCY = 1
+        concurrency.reset_stats()
+        responses = chat_concurrently(4, 0.2)
+        assert all(response.status_code == 200 for response in responses)
+        serial = concurrency.get_stats()
+    finally:
+        concurrency.CHAT_CONCURRENCY, concurrency.CHAT_QUEUE_TIMEOUT = saved
+
+    # All four turns ran at once under a limit of four; under a limit of one, three waited
+    assert parallel["peak_in_flight"] == 4 and parallel["queued"] == 0
+    assert serial["peak_in_flight"] == 1 and serial["queued"] == 3 and serial["admitted"] == 4
+
+
+def test_busy_worker_answers_503():
+    saved = settings(1, 0.05)
+    try:
+        responses = chat_concurrently(2, 0.3)
+    finally:
+        concurrency.CHAT_CONCURRENCY, concurrency.CHAT_QUEUE_TIMEOUT = saved
+
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    busy = next(response for response in responses if response.status_code == 503)
+    assert busy.headers["retry-after"] == "1"
+
+
+if __name__ == "__main__":
+    test_slots_queue_then_refuse()
+    test_turns_overlap_up_to_the_limit()
+    test_busy_worker_answers_503()
+    print("Concurrency tests passed")
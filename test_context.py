@@ -0,0 +1,54 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+import context
+
+
+def turn(index, tool_output="ok"):
+    return [
+        HumanMessage(content=f"question {index}"),
+        AIMessage(content="", tool_calls=[{"name": "check_availability", "args": {"date": f"2030-07-{index:02d}"}, "id": f"call-{index}"}]),
+        ToolMessage(content=tool_output, tool_call_id=f"call-{index}", name="check_availability"),
+        AIMessage(content=f"answer {index}"),
+    ]
+
+
+def test_recent_turns_kept_and_older_summarised():
+    messages = [message for index in range(1, 7) for message in turn(index, "x" * 1000)]
+    sent = context.build_context(messages, turns=2, budget=100000)
+
+    assert isinstance(sent[0], SystemMessage)
+    summary = sent[0].content
+    assert "User: question 1" in summary and "called check_availability" in summary and "answer 4" in summary
+    assert "question 5" not in summary
+    assert [m.content for m in sent[1:] if m.type == "human"] == ["question 5", "question 6"]
+    tool_results = [m.content for m in sent if isinstance(m, ToolMessage)]
+    # The previous turn's tool output is compacted, the current one is whole
+    assert len(tool_results[0]) == context.TOOL_RESULT_CHARS
+    assert len(tool_results[1]) == 1000
+
+
+def test_budget_folds_more_turns_and_keeps_pairs():
+    messages = [message for index in range(1, 7) for message in turn(index, "y" * 1000)]
+    context.reset_stats()
+    sent = context.build_context(messages, turns=4, budget=300)
+
+    assert context.count_tokens(sent) < context.count_tokens(messages)
+    # Every tool result still follows the assistant message that asked for it
+    call_ids = {call["id"] for m in sent if m.type == "ai" for call in m.tool_calls}
+    assert all(m.tool_call_id in call_ids for m in sent if isinstance(m, ToolMessage))
+    assert sent[-4:] == messages[-4:]
+
+    stats = context.get_stats()
+    assert stats["calls"] == 1 and stats["turns_folded"] == 5
+    assert stats["tokens_trimmed"] == stats["last_trimmed"] > 0
+
+
+def test_short_conversation_untouched():
+    messages = turn(1)
+    assert context.build_context(messages) == messages
+
+
+if __name__ == "__main__":
+    test_recent_turns_kept_and_older_summarised()
+    test_budget_folds_more_turns_and_keeps_pairs()
+    test_short_conversation_untouched()
+    print("Context tests passed")
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+import pytz
+import event_cache
+import function
+from event_cache import EventStore
+from fake_calendar import build_local_service
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeEvents:
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def list(self, **params):
+        self.calendar.list_calls.append(params)
+        if params.get("syncToken"):
+            items, self.calendar.changes = self.calendar.changes, []
+        else:
+            items = list(self.calendar.items)
+        return FakeRequest({"items": items, "nextSyncToken": "token"})
+
+
+class FakeService:
+    def __init__(self, items):
+        self.items = items
+        self.changes = []
+        self.list_calls = []
+
+    def events(self):
+        return FakeEvents(self)
+
+
+def make_event(event_id, start, end, summary="Meeting"):
+    return {
+        "id": event_id,
+        "summary": summary,
+        "start": {"dateTime": start},
+        "end": {"dateTime": end},
+    }
+
+
+def test_full_then_incremental_sync():
+    service = FakeService([
+        make_event("a", "2025-07-01T10:00:00Z", "2025-07-01T11:00:00Z"),
+        make_event("b", "2025-07-02T10:00:00Z", "2025-07-02T11:00:00Z"),
+    ])
+    store = EventStore(service, max_staleness=0)
+    day_start = datetime(2025, 7, 1, tzinfo=pytz.UTC)
+    day_end = datetime(2025, 7, 2, tzinfo=pytz.UTC)
+
+    assert [e["id"] for e in store.query(day_start, day_end)] == ["a"]
+    assert "syncToken" not in service.list_calls[0]
+
+    service.changes = [
+        {"id": "a", "status": "cancelled"},
+        make_event("c", "2025-07-01T09:00:00Z", "2025-07-01T09:30:00Z"),
+    ]
+    assert [e["id"] for e in store.query(day_start, day_end)] == ["c"]
+    assert service.list_calls[-1]["syncToken"] == "token"
+
+
+def test_fresh_store_answers_from_memory():
+    service = FakeService([make_event("a", "2025-07-01T10:00:00Z", "2025-07-01T11:00:00Z")])
+    store = EventStore(service, max_staleness=60)
+    day_start = datetime(2025, 7, 1, tzinfo=pytz.UTC)
+    day_end = datetime(2025, 7, 2, tzinfo=pytz.UTC)
+
+    store.query(day_start, day_end)
+    store.put(make_event("b", "2025-07-01T12:00:00Z", "2025-07-01T13:00:00Z"))
+    store.remove("a")
+
+    assert [e["id"] for e in store.query(day_start, day_end)] == ["b"]
+    assert len(service.list_calls) == 1
+
+
+def test_version_and_fingerprint_track_contents():
+    service = FakeService([make_event("a", "2025-07-01T10:00:00Z", "2025-07-01T11:00:00Z")])
+    store = EventStore(service, max_staleness=0)
+    store.sync()
+    version, fingerprint = store.version, store.fingerprint()
+
+    # An empty incremental sync leaves both alone
+    store.sync()
+    assert (store.version, store.fingerprint()) == (version, fingerprint)
+
+    store.put(make_event("a", "2025-07-01T10:00:00Z", "2025-07-01T11:00:00Z", "Renamed"))
+    assert store.version == version + 1 and store.fingerprint() != fingerprint
+
+    # Same contents, same fingerprint, whatever the order they arrived in
+    other = EventStore(FakeService([make_event("a", "2025-07-01T10:00:00Z", "2025-07-01T11:00:00Z", "Renamed")]))
+    other.sync()
+    assert other.fingerprint() == store.fingerprint()
+
+
+def test_dates_before_the_lookback_come_from_the_api():
+    day = (datetime.now(pytz.UTC) - timedelta(days=90)).strftime("%Y-%m-%d")
+    old = {
+        "id": "review",
+        "summary": "Quarterly review",
+        "start": {"dateTime": f"{day}T10:00:00+05:30"},
+        "end": {"dateTime": f"{day}T11:00:00+05:30"},
+    }
+    saved = function.service, function.CACHE_ENABLED
+    function.service, function.CACHE_ENABLED = build_local_service([old]), True
+    try:
+        assert [event["id"] for event in function.get_events(day, day)] == ["review"]
+        assert function.check_availability(day, "10:00", "11:00")["available"] is False
+        assert "Deleted 1 events" in function.delete_event("Quarterly review", day, day)
+        # The store itself never held the old event
+        assert not function.get_store(function.service).covers(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=pytz.UTC))
+    finally:
+        function.service, function.CACHE_ENABLED = saved
+        event_cache.clear_stores()
+
+
+def test_day_index_cache_is_per_store():
+    def meeting(event_id, summary):
+        return {
+            "id": event_id,
+            "summary": summary,
+            "start": {"dateTime": "2030-07-02T10:00:00+05:30"},
+            "end": {"dateTime": "2030-07-02T11:00:00+05:30"},
+        }
+
+    saved = function.service, function.CACHE_ENABLED
+    function.CACHE_ENABLED = True
+    try:
+        function.service = build_local_service([meeting("a", "Alice's standup")])
+        first = function.get_store(function.service)
+        assert function.check_availability("2030-07-02", "10:00", "11:00")["conflicts"][0]["name"] == "Alice's standup"
+        event_cache.drop_stores(function.service)
+
+        # A new user's store is also at version 1, but never shares the old one's token
+        function.service = build_local_service([meeting("b", "Bob's review")])
+        second = function.get_store(function.service)
+        report = function.check_availability("2030-07-02", "10:00", "11:00")
+        assert second.token != first.token and second.version == first.version
+        assert report["conflicts"][0]["name"] == "Bob's review"
+
+        start, end = function.utc_day_range("2030-07-01", "2030-07-02")
+        token, version, events = second.snapshot(start, end)
+        assert (token, version) == (second.token, second.version) and [event["id"] for event in events] == ["b"]
+    finally:
+        function.service, function.CACHE_ENABLED = saved
+        event_cache.clear_stores()
+
+
+if __name__ == "__main__":
+    test_full_then_incremental_sync()
+    test_fresh_store_answers_from_memory()
+    test_version_and_fingerprint_track_contents()
+    test_dates_before_the_lookback_come_from_the_api()
+    test_day_index_cache_is_per_store()
+    print("Event cache tests passed")
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import subprocess
+from langchain_core.messages import HumanMessage
+import event_cache
+import function
+import llm
+from fake_calendar import build_local_service, sample_events
+from fake_llm import ScriptedChatModel
+
+
+def run_turn(model, message):
+    saved = function.service, llm._agent
+    function.service = build_local_service(sample_events("2030-07-01", days=3))
+    llm._agent = (llm.create_agent_graph(llm.create_tools()), model)
+    try:
+        return llm.process_message([HumanMessage(content=message)])
+    finally:
+        function.service, llm._agent = saved
+        event_cache.clear_stores()
+
+
+def test_scripted_booking_turn():
+    model = ScriptedChatModel()
+    messages, response = run_turn(model, "Schedule a meeting on 2030-07-02 at 2pm for 1 hour")
+    assert model.calls == 3
+    assert [message.name for message in messages if message.type == "tool"] == ["check_availability", "confirm_booking_details"]
+    availability = json.loads(messages[2].content)
+    # sample_events books 10, 12, 14 and 16 o'clock
+    assert availability["data"]["free"] is False
+    assert response == "You're free then. Shall I book the meeting on 2030-07-02 at 14:00?"
+
+
+def test_scripted_agenda_turn():
+    model = ScriptedChatModel()
+    messages, response = run_turn(model, "What's on my calendar on 2030-07-03?")
+    assert model.calls == 2
+    assert response.startswith("Here's what I found for 2030-07-03:") and "Meeting 1" in response
+
+
+def test_llm_imports_without_credentials():
+    env = {key: value for key, value in os.environ.items() if key not in ("GROQ_API_KEY", "GOOGLE_CLIENT_SECRETS")}
+    result = subprocess.run([sys.executable, "-c", "import llm"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+
+if __name__ == "__main__":
+    test_scripted_booking_turn()
+    test_scripted_agenda_turn()
+    test_llm_imports_without_credentials()
+    print("Fake LLM tests passed")
@@ -0,0 +1,74 @@
+import function
+from fake_calendar import build_local_service
+
+
+events = [
+    {
+        "id": "standup",
+        "summary": "Standup",
+        "start": {"dateTime": "2025-07-01T10:00:00+05:30"},
+        "end": {"dateTime": "2025-07-01T10:30:00+05:30"},
+    },
+    {
+        "id": "focus",
+        "summary": "Focus time",
+        "transparency": "transparent",
+        "start": {"dateTime": "2025-07-01T11:00:00+05:30"},
+        "end": {"dateTime": "2025-07-01T12:00:00+05:30"},
+    },
+]
+
+
+def run_with(service, source, check):
+    saved = function.service, function.AVAILABILITY_SOURCE, function.CACHE_ENABLED
+    function.service, function.AVAILABILITY_SOURCE, function.CACHE_ENABLED = service, source, False
+    try:
+        return check()
+    finally:
+        function.service, function.AVAILABILITY_SOURCE, function.CACHE_ENABLED = saved
+
+
+def test_freebusy_availability():
+    service = build_local_service(events)
+    report = run_with(service, "freebusy", lambda: function.check_availability("2025-07-01", "09:00", "12:00"))
+    assert report["conflicts"] == [{"name": "Busy", "start": "10:00", "end": "10:30"}]
+    assert ("POST", "freeBusy") in service._http.requests
+    assert not any(path.endswith("/events") for _, path in service._http.requests)
+
+
+def test_freebusy_multiple_calendars():
+    service = build_local_service(events)
+    service._http.add_calendar("team", [{
+        "summary": "Team sync",
+        "start": {"dateTime": "2025-07-01T09:00:00+05:30"},
+        "end": {"dateTime": "2025-07-01T10:00:00+05:30"},
+    }])
+    blocks = run_with(service, "freebusy", lambda: function.get_busy_blocks("2025-06-30", "2025-07-01", ["primary", "team"]))
+    assert len(blocks) == 2
+    assert len([request for request in service._http.requests if request[1] == "freeBusy"]) == 1
+
+
+def test_events_fallback():
+    service = build_local_service(events)
+    slots = run_with(service, "events", lambda: function.suggest_time_slots("2025-07-01", 1))
+    assert slots[:2] == ["09:00", "12:00"]
+    assert not any(path == "freeBusy" for _, path in service._http.requests)
+
+
+def test_freebusy_error_falls_back_to_events():
+    service = build_local_service(events)
+    saved = function.AVAILABILITY_CALENDARS
+    function.AVAILABILITY_CALENDARS = ["missing"]
+    try:
+        report = run_with(service, "freebusy", lambda: function.check_availability("2025-07-01", "09:00", "12:00"))
+    finally:
+        function.AVAILABILITY_CALENDARS = saved
+    assert [conflict["name"] for conflict in report["conflicts"]] == ["Standup", "Focus time"]
+
+
+if __name__ == "__main__":
+    test_freebusy_availability()
+    test_freebusy_multiple_calendars()
+    test_events_fallback()
+    test_freebusy_error_falls_back_to_events()
+    print("Free/busy tests passed")
@@ -0,0 +1,64 @@
+from datetime import datetime
+import pytz
+import function
+from fake_calendar import build_local_service
+
+
+def make_events(count):
+    return [
+        {
+            "id": f"e{i}",
+            "summary": f"Meeting {i}",
+            "start": {"dateTime": f"2030-07-{1 + i // 8:02d}T{9 + i % 8:02d}:00:00+05:30"},
+            "end": {"dateTime": f"2030-07-{1 + i // 8:02d}T{9 + i % 8:02d}:45:00+05:30"},
+        }
+        for i in range(count)
+    ]
+
+
+def list_calls(service):
+    return [request for request in service._http.requests if request[1] == "calendars/primary/events"]
+
+
+def test_iter_events_follows_page_tokens():
+    service = build_local_service(make_events(40))
+    saved = function.service
+    function.service = service
+    try:
+        events = list(function.iter_events(datetime(2030, 7, 1, tzinfo=pytz.UTC), page_size=15))
+    finally:
+        function.service = saved
+    assert [event["id"] for event in events] == [f"e{i}" for i in range(40)]
+    assert len(list_calls(service)) == 3
+
+
+def test_iter_events_is_lazy():
+    service = build_local_service(make_events(40))
+    saved = function.service
+    function.service = service
+    try:
+        first = next(function.iter_events(datetime(2030, 7, 1, tzinfo=pytz.UTC), page_size=15))
+    finally:
+        function.service = saved
+    assert first["id"] == "e0"
+    assert len(list_calls(service)) == 1
+
+
+def test_find_free_slots_stops_paging_early():
+    # Every working hour from July 1 to July 5 is booked (8 events a day)
+    service = build_local_service(make_events(40))
+    saved = function.service, function.CACHE_ENABLED, function.AVAILABILITY_SOURCE, function.PAGE_SIZE
+    function.service, function.CACHE_ENABLED, function.AVAILABILITY_SOURCE, function.PAGE_SIZE = service, False, "events", 10
+    try:
+        slots = function.find_free_slots("2030-07-01", "2030-07-31", duration=1, count=1, day_end="18:00")
+    finally:
+        function.service, function.CACHE_ENABLED, function.AVAILABILITY_SOURCE, function.PAGE_SIZE = saved
+    assert slots == [{"date": "2030-07-01", "time": "16:45"}]
+    assert len(list_calls(service)) == 1
+
+
+if __name__ == "__main__":
+    test_iter_events_follows_page_tokens()
+    test_iter_events_is_lazy()
+    test_find_free_slots_stops_paging_early()
+    print("iter_events tests passed")
@@ -0,0 +1,68 @@
+import time
+from datetime import datetime
+from langchain_core.messages import AIMessage, HumanMessage
+import availability
+import event_cache
+import function
+import llm
+import prefetch
+import router
+from fake_calendar import build_local_service
+
+events = [
+    {
+        "id": "standup",
+        "summary": "Standup",
+        "start": {"dateTime": "2030-07-02T10:00:00+05:30"},
+        "end": {"dateTime": "2030-07-02T10:30:00+05:30"},
+    },
+]
+
+
+def test_candidate_dates():
+    now = availability.IST.localize(datetime(2030, 7, 1, 8, 0))
+    assert prefetch.candidate_dates("Tomorrow or next friday, or tomorrow again", now) == ["2030-07-02", "2030-07-12"]
+    assert prefetch.candidate_dates("sometime soon", now) == []
+
+
+def run(message, tool_date):
+    """A turn whose 'model' takes a moment and then checks tool_date"""
+    def process_message(conversation):
+        time.sleep(0.1)
+        report = function.check_availability(tool_date, "09:00", "12:00")
+        return list(conversation) + [AIMessage(content=str(report["available"]))], str(report["available"])
+
+    saved = function.service, function.CACHE_ENABLED, llm.process_message
+    function.service, function.CACHE_ENABLED = build_local_service(events), True
+    llm.process_message = process_message
+    event_cache.clear_stores()
+    prefetch.reset_stats()
+    try:
+        _, response = router.process_message([HumanMessage(content=message)])
+        return response, function.service._http.requests
+    finally:
+        function.service, function.CACHE_ENABLED, llm.process_message = saved
+        event_cache.clear_stores()
+
+
+def test_prefetch_warms_store_for_tool_step():
+    response, requests = run("Could we fit a call in on 2030-07-02?", "2030-07-02")
+    assert response == "False"
+    # The prefetch's sync was the only calendar call; the tool read locally
+    assert len(requests) == 1
+    stats = prefetch.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 0 and stats["wasted"] == 0
+    assert stats["turns"] == 1 and stats["dates"] == 1
+
+
+def test_unused_prefetch_is_counted():
+    run("Could we fit a call in on 2030-07-02?", "2030-07-05")
+    stats = prefetch.get_stats()
+    assert stats["hits"] == 0 and stats["misses"] == 1 and stats["wasted"] == 1
+
+
+if __name__ == "__main__":
+    test_candidate_dates()
+    test_prefetch_warms_store_for_tool_step()
+    test_unused_prefetch_is_counted()
+    print("Prefetch tests passed")
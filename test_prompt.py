@@ -0,0 +1,43 @@
+from datetime import datetime
+import pytz
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+import llm
+
+
+def test_prefix_is_stable_and_date_trails():
+    first = llm.model_input({"messages": [HumanMessage(content="hi")]})
+    second = llm.model_input({"messages": [HumanMessage(content="hi"), AIMessage(content="hello"), HumanMessage(content="book")]})
+
+    assert first[0].content == second[0].content == llm.SYSTEM_PROMPT
+    assert isinstance(first[-1], SystemMessage) and first[-1].content.startswith("Current UTC time:")
+    assert "Current UTC time" not in llm.SYSTEM_PROMPT
+
+    _, model = llm.get_agent()
+    assert llm.record_prompt_prefix(first, model) == llm.record_prompt_prefix(second, model)
+
+
+def test_date_context():
+    now = pytz.UTC.localize(datetime(2030, 7, 1, 9, 30, 12, 345678))
+    content = llm.date_context(now).content
+    assert "Current UTC time: 2030-07-01 09:30\n" in content
+    assert "Tomorrow (ISO): 2030-07-02" in content and "Day of the week: Monday" in content
+    assert "345678" not in content
+
+
+def test_prefix_changes_are_counted():
+    _, model = llm.get_agent()
+    messages = llm.model_input({"messages": [HumanMessage(content="hi")]})
+    before = llm.get_prompt_stats()
+    llm.record_prompt_prefix(messages, model)
+    llm.record_prompt_prefix(messages, model)
+    assert llm.get_prompt_stats()["prefix_changes"] == before["prefix_changes"]
+    llm.record_prompt_prefix([SystemMessage(content="different")] + messages[1:], model)
+    llm.record_prompt_prefix(messages, model)
+    assert llm.get_prompt_stats()["prefix_changes"] == before["prefix_changes"] + 2
+
+
+if __name__ == "__main__":
+    test_prefix_is_stable_and_date_trails()
+    test_date_context()
+    test_prefix_changes_are_counted()
+    print("Prompt tests passed")
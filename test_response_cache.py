@@ -0,0 +1,133 @@
+import os
+import tempfile
+from langchain_core.messages import AIMessage, HumanMessage
+import event_cache
+import function
+import llm
+import response_cache
+from response_cache import ResponseCache
+from fake_calendar import build_local_service
+
+events = [
+    {
+        "id": "standup",
+        "summary": "Standup",
+        "start": {"dateTime": "2030-07-02T10:00:00+05:30"},
+        "end": {"dateTime": "2030-07-02T10:30:00+05:30"},
+    },
+]
+
+QUESTION = "Suggest a few slots for a call on 2030-07-02!"
+
+
+def agent_turn(tool, calls):
+    def process_message(conversation):
+        calls.append(conversation[-1].content)
+        reply = [
+            AIMessage(content="", tool_calls=[{"name": tool, "args": {}, "id": "call-1"}]),
+            AIMessage(content=f"reply {len(calls)}"),
+        ]
+        return list(conversation) + reply, reply[-1].content
+    return process_message
+
+
+def run(check, tool="suggest_time_slots"):
+    calls = []
+    saved = function.service, function.CACHE_ENABLED, llm.process_message
+    function.service, function.CACHE_ENABLED = build_local_service(events), True
+    llm.process_message = agent_turn(tool, calls)
+    event_cache.clear_stores()
+    response_cache.cache = ResponseCache()
+    try:
+        return check(), calls
+    finally:
+        function.service, function.CACHE_ENABLED, llm.process_message = saved
+        event_cache.clear_stores()
+
+
+def ask(message, history=()):
+    return response_cache.process_message(list(history) + [HumanMessage(content=message)])[1]
+
+
+def test_repeated_read_is_served_from_cache():
+    def check():
+        first = ask(QUESTION)
+        # Same question, different punctuation and case
+        second = ask("suggest a few slots for a call on 2030-07-02")
+        return first, second, response_cache.get_stats()
+
+    (first, second, stats), calls = run(check)
+    assert first == second == "reply 1"
+    assert len(calls) == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["stores"] == 1
+
+
+def test_calendar_change_invalidates():
+    def check():
+        ask(QUESTION)
+        function.create_event("2030-07-02", "15:00", "Dentist")
+        return ask(QUESTION)
+
+    reply, calls = run(check)
+    assert reply == "reply 2" and len(calls) == 2
+
+
+def test_uncacheable_turns():
+    def check():
+        # No day named, a reply to the assistant's question, and a write
+        ask("suggest a few slots")
+        ask(QUESTION, [HumanMessage(content="hi"), AIMessage(content="Which day?")])
+        ask(QUESTION)
+        return ask(QUESTION)
+
+    reply, calls = run(check, tool="create_event")
+    assert reply == "reply 4" and len(calls) == 4
+    assert response_cache.get_stats()["uncacheable"] == 2
+
+
+def test_follow_ups_are_cached_per_conversation():
+    slots = [HumanMessage(content=QUESTION), AIMessage(content="Here are three slots.")]
+    lunch = [HumanMessage(content="Is 2030-07-02 good for lunch!"), AIMessage(content="You're free at noon.")]
+
+    def check():
+        first = ask("what about 2030-07-03", slots)
+        # Same words after a different conversation: not the same question
+        other = ask("what about 2030-07-03", lunch)
+        again = ask("what about 2030-07-03", slots)
+        return first, other, again
+
+    (first, other, again), calls = run(check)
+    assert first == again == "reply 1" and other == "reply 2"
+    assert len(calls) == 2
+
+
+def test_disk_tier_and_ttl():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "responses.db")
+        cache = ResponseCache(path=path)
+        cache.put("key", "cached reply")
+        cache.close()
+
+        restarted = ResponseCache(path=path)
+        assert restarted.get("key") == "cached reply"
+        assert restarted.stats["disk_hits"] == 1
+        restarted.close()
+
+        expired = ResponseCache(path=path, ttl=0)
+        assert expired.get("key") is None
+        expired.close()
+
+    small = ResponseCache(max_size=1)
+    small.put("a", "1")
+    small.put("b", "2")
+    assert small.get("a") is None and small.get("b") == "2"
+    assert small.stats["evictions"] == 1
+
+
+if __name__ == "__main__":
+    test_repeated_read_is_served_from_cache()
+    test_calendar_change_invalidates()
+    test_uncacheable_turns()
+    test_follow_ups_are_cached_per_conversation()
+    test_disk_tier_and_ttl()
+    print("Response cache tests passed")
@@ -0,0 +1,92 @@
+from datetime import datetime
+from langchain_core.messages import AIMessage, HumanMessage
+import availability
+import function
+import llm
+import router
+from fake_calendar import build_local_service
+
+# A Monday
+now = availability.IST.localize(datetime(2030, 7, 1, 8, 0))
+
+events = [
+    {
+        "id": "standup",
+        "summary": "Standup",
+        "start": {"dateTime": "2030-07-02T10:00:00+05:30"},
+        "end": {"dateTime": "2030-07-02T10:30:00+05:30"},
+    },
+    {
+        "id": "offsite",
+        "summary": "Offsite",
+        "start": {"date": "2030-07-02"},
+        "end": {"date": "2030-07-03"},
+    },
+]
+
+
+def test_classify():
+    route = router.classify("Am I free tomorrow at 3pm?", now)
+    assert route == {"intent": "free", "date": "2030-07-02", "start_time": "15:00", "end_time": "16:00", "confidence": 1.0}
+    route = router.classify("what's on my calendar next friday", now)
+    assert route["intent"] == "agenda" and route["date"] == "2030-07-12"
+    assert router.classify("am I free tomorrow afternoon", now)["start_time"] == "14:00"
+
+    # Writes, mixed days and unparseable times go to the agent
+    assert router.classify("book a meeting tomorrow at 3pm", now) is None
+    assert router.classify("am I free today or tomorrow?", now) is None
+    assert router.classify("am I free tomorrow at 3:30pm?", now) is None
+    assert router.classify("thanks!", now) is None
+    # Low confidence without a day, or when answering the assistant's question
+    assert router.classify("am I free at 3pm?", now)["confidence"] < router.CONFIDENCE_THRESHOLD
+    assert router.classify("am I free tomorrow?", now, "Which day works for you?")["confidence"] < router.CONFIDENCE_THRESHOLD
+
+
+def run(messages):
+    saved = function.service, function.CACHE_ENABLED, llm.process_message
+    agent_calls = []
+    function.service, function.CACHE_ENABLED = build_local_service(events), False
+    llm.process_message = lambda conversation: agent_calls.append(conversation) or (conversation, "agent reply")
+    router.reset_stats()
+    try:
+        replies = [router.process_message([HumanMessage(content=message)])[1] for message in messages]
+        return replies, agent_calls
+    finally:
+        function.service, function.CACHE_ENABLED, llm.process_message = saved
+
+
+def test_fast_path_answers():
+    replies, agent_calls = run([
+        "What's on my calendar on 2030-07-02?",
+        "am I free on 2030-07-02 at 10am?",
+        "am I free on 2030-07-02 at 3pm?",
+        "please book a haircut on 2030-07-02 at 3pm",
+    ])
+    assert "- All day: Offsite" in replies[0] and "- 10:00 - 10:30: Standup" in replies[0]
+    assert replies[1].startswith("No, you have 1 conflict(s)") and "Standup (10:00 - 10:30)" in replies[1]
+    assert replies[2].startswith("Yes, you're free")
+    assert replies[3] == "agent reply" and len(agent_calls) == 1
+
+    stats = router.get_stats()
+    assert stats["hits"] == 3 and stats["fallbacks"] == 1
+    assert stats["hit_rate"] == 0.75
+    assert stats["by_intent"] == {"agenda": 1, "free": 2}
+
+
+def test_fast_path_keeps_conversation():
+    conversation = [HumanMessage(content="am I free on 2030-07-02 at 3pm?")]
+    saved = function.service, function.CACHE_ENABLED
+    function.service, function.CACHE_ENABLED = build_local_service(events), False
+    try:
+        messages, response = router.process_message(conversation)
+    finally:
+        function.service, function.CACHE_ENABLED = saved
+    assert isinstance(messages[-1], AIMessage) and messages[-1].content == response
+    assert messages[:-1] == conversation
+
+
+if __name__ == "__main__":
+    test_classify()
+    test_fast_path_answers()
+    test_fast_path_keeps_conversation()
+    print("Router tests passed")
@@ -0,0 +1,114 @@
+import time
+from datetime import datetime, timedelta, timezone
+import event_cache
+import service_pool
+from service_pool import ServicePool
+
+
+class FakeCredentials:
+    """Credentials whose refresh hands out a token valid for lifetime seconds"""
+    lifetime = 3600
+    refreshes = 0
+
+    def __init__(self, token=None, refresh_token=None, **kwargs):
+        self.token = token
+        self.refresh_token = refresh_token
+        self.expiry = None
+
+    def refresh(self, request):
+        FakeCredentials.refreshes += 1
+        self.token = f"access-{FakeCredentials.refreshes}"
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.expiry = now + timedelta(seconds=self.lifetime)
+
+
+def make_pool(**kwargs):
+    service_pool.Credentials = FakeCredentials
+    FakeCredentials.refreshes = 0
+    FakeCredentials.lifetime = 3600
+    return ServicePool(scopes=["calendar"], refresh_interval=3600, **kwargs)
+
+
+def restore():
+    from google.oauth2.credentials import Credentials
+    service_pool.Credentials = Credentials
+
+
+def test_reuses_service_per_user():
+    pool = make_pool()
+    try:
+        service, creds = pool.get("token-a")
+        again, same_creds = pool.get("token-a")
+        other, _ = pool.get("token-b")
+        assert service is again and creds is same_creds
+        assert other is not service
+        assert hasattr(service, "events")
+        # One refresh per user; the second request reused the valid token
+        assert FakeCredentials.refreshes == 2
+        assert pool.stats["hits"] == 1 and pool.stats["misses"] == 2
+    finally:
+        pool.close()
+        restore()
+
+
+def test_lru_and_idle_eviction():
+    pool = make_pool(max_size=2, ttl=60)
+    try:
+        first, _ = pool.get("token-a")
+        pool.get("token-b")
+        pool.get("token-a")
+        pool.get("token-c")
+        # token-b was least recently used
+        assert pool.stats["evictions"] == 1
+        assert pool.get("token-a")[0] is first
+        assert pool.stats["misses"] == 3
+
+        pool._entries[pool.user_key("token-a")].last_used = time.monotonic() - 120
+        assert pool.get("token-a")[0] is not first
+    finally:
+        pool.close()
+        restore()
+
+
+def test_background_refresh_before_expiry():
+    pool = make_pool(refresh_margin=300)
+    try:
+        FakeCredentials.lifetime = 100
+        _, creds = pool.get("token-a")
+        token = creds.token
+        FakeCredentials.lifetime = 3600
+        pool.refresh_expiring()
+        assert creds.token != token
+        assert pool.stats["background_refreshes"] == 1
+        # Fresh tokens are left alone
+        pool.refresh_expiring()
+        assert pool.stats["background_refreshes"] == 1
+    finally:
+        pool.close()
+        restore()
+
+
+def test_eviction_drops_the_event_store():
+    event_cache.clear_stores()
+    pool = make_pool(max_size=1, on_evict=event_cache.drop_stores)
+    try:
+        first, _ = pool.get("token-a")
+        event_cache.get_store(first)
+        second, _ = pool.get("token-b")
+        store = event_cache.get_store(second)
+        # token-a's service left the pool, and its calendar copy with it
+        assert [s.service for s in event_cache._stores.values()] == [second]
+        pool.close()
+        assert store not in event_cache._stores.values()
+    finally:
+        pool.close()
+        restore()
+        event_cache.clear_stores()
+
+
+if __name__ == "__main__":
+    test_reuses_service_per_user()
+    test_lru_and_idle_eviction()
+    test_background_refresh_before_expiry()
+    test_eviction_drops_the_event_store()
+    print("Service pool tests passed")
@@ -0,0 +1,119 @@
+import os
+import asyncio
+import tempfile
+import httpx
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+import llm
+import main
+import sessions
+from fake_llm import ScriptedChatModel
+
+seen = []
+
+
+def remembering_script(messages):
+    """Replies with how many user messages the model was sent"""
+    questions = [message for message in messages if isinstance(message, HumanMessage)]
+    seen.append(len(questions))
+    return AIMessage(content=f"That's message {len(questions)}.")
+
+
+def test_sessions_survive_a_restart():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.db")
+        sessions.open_store(path)
+        sessions.save("alice", [HumanMessage(content="hello"), AIMessage(content="Hi!")])
+        sessions.save("alice", [HumanMessage(content="book lunch"), AIMessage(content="Which day?")])
+        sessions.save("bob", [HumanMessage(content="hey")])
+        sessions.close()
+
+        sessions.open_store(path)
+        try:
+            assert [message.content for message in sessions.history("alice")] == ["hello", "Hi!", "book lunch", "Which day?"]
+            assert [message.content for message in sessions.history("bob")] == ["hey"]
+            assert sessions.history("nobody") == []
+            # Older checkpoints are pruned as the session grows
+            rows = sessions.checkpointer().conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = 'alice'").fetchone()[0]
+            assert rows <= sessions.SESSION_CHECKPOINTS
+        finally:
+            sessions.close()
+
+
+def test_chat_sends_only_the_new_message():
+    saved = llm._agent
+    llm._agent = (llm.create_agent_graph(llm.create_tools()), ScriptedChatModel(script=remembering_script))
+    seen.clear()
+    try:
+        with TestClient(main.app) as client:
+            first = client.post("/chat", json={"session_id": "s1", "message": "hello there"}).json()
+            second = client.post("/chat", json={"session_id": "s1", "message": "and again"}).json()
+            other = client.post("/chat", json={"session_id": "s2", "message": "hi"}).json()
+            # Read before the app shuts down and closes the store
+            saved_types = [message.type for message in sessions.history("s1")]
+    finally:
+        llm._agent = saved
+
+    assert first["response"] == "That's message 1."
+    # The second turn saw the first one, loaded from the checkpoint
+    assert second["response"] == "That's message 2."
+    assert other["response"] == "That's message 1."
+    assert saved_types == ["human", "ai", "human", "ai"]
+
+
+def test_overlapping_turns_keep_both():
+    saved = llm._agent
+    model = ScriptedChatModel(script=remembering_script, latency=0.2)
+    llm._agent = (llm.create_agent_graph(llm.create_tools()), model)
+    seen.clear()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/chat", json={"session_id": "s1", "message": "first"}),
+                client.post("/chat", json={"session_id": "s1", "message": "second"}),
+            )
+
+    try:
+        responses = asyncio.run(run())
+        saved_messages = [message.content for message in sessions.history("s1")]
+        held = sessions.checkpointer().conn.execute("SELECT COUNT(*) FROM session_locks").fetchone()[0]
+    finally:
+        llm._agent = saved
+
+    assert all(response.status_code == 200 for response in responses)
+    # The turns ran one after the other: the later one saw the earlier one's messages
+    assert sorted(response.json()["response"] for response in responses) == ["That's message 1.", "That's message 2."]
+    assert seen == [1, 2]
+    assert sorted(saved_messages[::2]) == ["first", "second"]
+    assert saved_messages[1::2] == ["That's message 1.", "That's message 2."]
+    assert held == 0
+
+
+def test_session_lock_expires():
+    saved = sessions.SESSION_LOCK_TTL
+    try:
+        assert sessions.try_lock("s1", "a")
+        assert not sessions.try_lock("s1", "b")
+        # Another session isn't held up
+        assert sessions.try_lock("s2", "b")
+        # Only the holder lets go
+        sessions.unlock("s1", "b")
+        assert not sessions.try_lock("s1", "b")
+        sessions.unlock("s1", "a")
+        assert sessions.try_lock("s1", "b")
+
+        # A holder that never lets go (a worker that died) is taken over once its hold expires
+        sessions.SESSION_LOCK_TTL = -1
+        assert sessions.try_lock("s3", "dead")
+        assert sessions.try_lock("s3", "c")
+    finally:
+        sessions.SESSION_LOCK_TTL = saved
+
+
+if __name__ == "__main__":
+    test_sessions_survive_a_restart()
+    test_chat_sends_only_the_new_message()
+    test_overlapping_turns_keep_both()
+    test_session_lock_expires()
+    print("Session tests passed")
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import builtins
+import subprocess
+import api_call
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_import_has_no_side_effects():
+    code = (
+        "import sys, json, main, api_call; "
+        "print(json.dumps({'initialized': api_call._initialized, 'creds': api_call.creds is not None, "
+        "'lazy': [name for name in ('langchain_groq', 'datefinder', 'google_auth_oauthlib') if name in sys.modules]}))"
+    )
+    # No stdin: an import that prompted for an OAuth code would fail here
+    result = subprocess.run([sys.executable, "-c", code], cwd=here, stdin=subprocess.DEVNULL,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    state = json.loads(result.stdout.strip().splitlines()[-1])
+    assert state == {"initialized": False, "creds": False, "lazy": []}
+
+
+def test_default_service_never_prompts():
+    def no_input(prompt=""):
+        raise AssertionError("default_service asked for input")
+
+    saved = builtins.input, api_call._initialized, api_call.service, api_call.creds
+    secrets = os.environ.get("GOOGLE_CLIENT_SECRETS")
+    builtins.input, api_call._initialized = no_input, False
+    os.environ["GOOGLE_CLIENT_SECRETS"] = '{"installed": {"client_id": "test-only"}}'
+    try:
+        # Client secrets but no GOOGLE_TOKEN_JSON: a server logs and carries on
+        assert api_call.default_service() is None
+        assert api_call._initialized
+    finally:
+        builtins.input, api_call._initialized, api_call.service, api_call.creds = saved
+        if secrets is None:
+            del os.environ["GOOGLE_CLIENT_SECRETS"]
+        else:
+            os.environ["GOOGLE_CLIENT_SECRETS"] = secrets
+
+
+def test_warmup_builds_the_agent():
+    import llm
+    import main
+    saved = llm._agent
+    llm._agent = None
+    try:
+        timings = main.warmup()
+        assert set(timings) == {"calendar", "agent", "sessions"}
+        assert llm._agent is not None
+    finally:
+        llm._agent = saved
+
+
+if __name__ == "__main__":
+    test_import_has_no_side_effects()
+    test_default_service_never_prompts()
+    test_warmup_builds_the_agent()
+    print("Startup tests passed")
@@ -0,0 +1,68 @@
+import json
+import asyncio
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+import event_cache
+import function
+import llm
+import main
+import sessions
+from fake_calendar import build_local_service
+
+events = [
+    {
+        "id": "standup",
+        "summary": "Standup",
+        "start": {"dateTime": "2030-07-02T10:00:00+05:30"},
+        "end": {"dateTime": "2030-07-02T10:30:00+05:30"},
+    },
+]
+
+
+def test_agent_tokens_stream():
+    graph, model = llm.get_agent()
+    fake = GenericFakeChatModel(messages=iter([AIMessage(content="You are free all afternoon.")]))
+    saved = llm._agent
+    llm._agent = (graph, fake)
+
+    async def collect():
+        return [event async for event in llm.astream_message([HumanMessage(content="hello")])]
+
+    try:
+        streamed = asyncio.run(collect())
+    finally:
+        llm._agent = saved
+
+    tokens = [event["content"] for event in streamed if event["type"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "You are free all afternoon."
+    done = streamed[-1]
+    assert done["type"] == "done" and done["response"] == "You are free all afternoon."
+    assert done["messages"][-1].content == done["response"]
+
+
+def test_stream_endpoint():
+    saved = function.service, function.CACHE_ENABLED
+    function.service, function.CACHE_ENABLED = build_local_service(events), True
+    # A freshly synced store answers the async path without the HTTP client
+    function.get_store(function.service).sync()
+    try:
+        with TestClient(main.app) as client:
+            response = client.post("/chat/stream", json={"session_id": "stream", "message": "am I free on 2030-07-02 at 10am?"})
+            saved_reply = sessions.history("stream")[-1].content
+    finally:
+        function.service, function.CACHE_ENABLED = saved
+        event_cache.clear_stores()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    streamed = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [event["type"] for event in streamed] == ["token", "done"]
+    assert "Standup" in streamed[-1]["response"]
+    assert saved_reply == streamed[-1]["response"]
+
+
+if __name__ == "__main__":
+    test_agent_tokens_stream()
+    test_stream_endpoint()
+    print("Streaming tests passed")
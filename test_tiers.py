@@ -0,0 +1,87 @@
+import asyncio
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+import budget
+import llm
+import tiers
+from fake_llm import ScriptedChatModel
+
+tools = llm.create_tools()
+
+
+def fake(*replies):
+    return GenericFakeChatModel(messages=iter(replies))
+
+
+def lookup(args, call_id="call-1"):
+    return AIMessage(content="", tool_calls=[{"name": "check_availability", "args": args, "id": call_id}])
+
+
+def test_simple_steps_stay_on_the_small_model():
+    tiers.reset_stats()
+    cascade = tiers.ModelCascade(fake(lookup({"date": "2030-07-02", "start_time": "10:00", "end_time": "11:00"})), fake(), tools)
+    response = cascade.invoke([HumanMessage(content="am I free on 2030-07-02 at 10am?")])
+    assert response.tool_calls[0]["name"] == "check_availability"
+    assert response.response_metadata["model_tier"] == tiers.SMALL
+    stats = tiers.get_stats()
+    assert stats[tiers.SMALL]["calls"] == 1 and stats[tiers.LARGE]["calls"] == 0 and stats["escalations"] == 0
+
+
+def test_invalid_small_reply_escalates():
+    tiers.reset_stats()
+    # check_availability needs a date
+    small = fake(lookup({"start_time": "10:00"}))
+    large = fake(lookup({"date": "2030-07-02", "start_time": "10:00", "end_time": "11:00"}))
+    messages = [HumanMessage(content="am I free at 10am on 2030-07-02?")]
+    response = asyncio.run(tiers.ModelCascade(small, large, tools).ainvoke(messages))
+    assert response.tool_calls[0]["args"]["date"] == "2030-07-02"
+    assert response.response_metadata["model_tier"] == tiers.LARGE and response.response_metadata["escalated"]
+    # The rejected attempt counts against the request's token budget
+    assert budget.tokens_used(messages, response) > response.response_metadata["escalation_tokens"] > 0
+    stats = tiers.get_stats()
+    assert stats["escalations"] == 1 and stats["escalation_rate"] == 1.0
+
+    tiers.reset_stats()
+    # A small model that errors escalates too
+    response = tiers.ModelCascade(fake(), fake(AIMessage(content="You're free.")), tools).invoke(messages)
+    assert response.content == "You're free." and tiers.get_stats()[tiers.SMALL]["errors"] == 1
+
+
+def test_planning_goes_to_the_large_model():
+    assert tiers.choose([HumanMessage(content="move all my meetings on 2030-07-02 to the afternoon")]) == tiers.LARGE
+    assert tiers.choose([HumanMessage(content="book a call on 2030-07-02 and 2030-07-03")]) == tiers.LARGE
+    rounds = [HumanMessage(content="am I free on 2030-07-02?")]
+    for index in range(tiers.PLANNING_ROUNDS):
+        rounds += [lookup({"date": "2030-07-02"}, f"call-{index}"), ToolMessage(content="{}", tool_call_id=f"call-{index}")]
+    assert tiers.choose(rounds[:3]) == tiers.SMALL
+    assert tiers.choose(rounds) == tiers.LARGE
+
+
+def test_escalation_retracts_streamed_tokens():
+    def guess(messages):
+        return AIMessage(content="Booking it now", tool_calls=[{"name": "book_it", "args": {}, "id": "call-1"}])
+
+    large = ScriptedChatModel(script=lambda messages: AIMessage(content="You're free all day."))
+    saved = llm._agent
+    llm._agent = (llm.create_agent_graph(tools), tiers.ModelCascade(ScriptedChatModel(script=guess), large, tools))
+
+    async def collect():
+        return [event async for event in llm.astream_message([HumanMessage(content="hello")])]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        llm._agent = saved
+
+    kinds = [event["type"] if event["type"] != "token" else event["content"] for event in events]
+    # The rejected reply was streamed, then taken back before the large model's answer
+    assert kinds == ["Booking it now", "reset", "You're free all day.", "done"]
+    assert events[-1]["response"] == "You're free all day."
+
+
+if __name__ == "__main__":
+    test_simple_steps_stay_on_the_small_model()
+    test_invalid_small_reply_escalates()
+    test_planning_goes_to_the_large_model()
+    test_escalation_retracts_streamed_tokens()
+    print("Model tier tests passed")
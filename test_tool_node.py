@@ -0,0 +1,73 @@
+import time
+import asyncio
+import threading
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+import tool_node
+from tool_node import ParallelToolNode
+
+running = {"now": 0, "peak": 0}
+lock = threading.Lock()
+
+
+def enter():
+    with lock:
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+
+
+def leave():
+    with lock:
+        running["now"] -= 1
+
+
+def check_day(date: str) -> str:
+    """Slow blocking lookup"""
+    enter()
+    time.sleep(0.1)
+    leave()
+    return f"free on {date}"
+
+
+async def acheck_day(date: str) -> str:
+    enter()
+    await asyncio.sleep(0.1)
+    leave()
+    return f"free on {date}"
+
+
+tool = StructuredTool.from_function(func=check_day, coroutine=acheck_day, name="check_day", description="Check a day")
+dates = ["2030-07-01", "2030-07-02", "2030-07-03", "2030-07-04", "2030-07-05"]
+calls = AIMessage(content="", tool_calls=[
+    {"name": "check_day", "args": {"date": date}, "id": f"call-{index}"} for index, date in enumerate(dates)
+])
+
+
+def check_results(result):
+    assert [message.content for message in result["messages"]] == [f"free on {date}" for date in dates]
+    assert [message.tool_call_id for message in result["messages"]] == [f"call-{index}" for index in range(len(dates))]
+    # The five calls overlapped, never more than two at a time
+    assert running["peak"] == 2
+    stats = tool_node.get_stats()
+    assert stats["tools"]["check_day"]["calls"] == 5 and stats["parallel_steps"] == 1
+    assert stats["tool_seconds"] > stats["step_seconds"]
+
+
+def test_sync_calls_run_in_parallel():
+    tool_node.reset_stats()
+    running["peak"] = 0
+    node = ParallelToolNode([tool], max_concurrency=2)
+    check_results(node.invoke({"messages": [calls]}))
+
+
+def test_async_calls_run_in_parallel():
+    tool_node.reset_stats()
+    running["peak"] = 0
+    node = ParallelToolNode([tool], max_concurrency=2)
+    check_results(asyncio.run(node.ainvoke({"messages": [calls]})))
+
+
+if __name__ == "__main__":
+    test_sync_calls_run_in_parallel()
+    test_async_calls_run_in_parallel()
+    print("Tool node tests passed")
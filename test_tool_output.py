@@ -0,0 +1,76 @@
+import json
+import asyncio
+import event_cache
+import function
+import llm
+import tool_output
+from fake_calendar import build_local_service
+
+events = [
+    {
+        "id": f"meeting-{hour}",
+        "summary": f"Meeting {hour}",
+        "start": {"dateTime": f"2030-07-02T{hour:02d}:00:00+05:30"},
+        "end": {"dateTime": f"2030-07-02T{hour:02d}:30:00+05:30"},
+    }
+    for hour in range(8, 20)
+]
+
+
+def test_availability_is_compact_and_capped():
+    tool_output.reset_stats()
+    raw = {
+        "available": False,
+        "conflicts": [{"name": f"Meeting {hour}", "start": f"{hour:02d}:00", "end": f"{hour:02d}:30"} for hour in range(8, 20)],
+        "checked_period": "2030-07-02 08:00 to 20:00",
+    }
+    text = tool_output.compact("check_availability", raw)
+    result = json.loads(text)
+    assert result["ok"] is True and result["data"]["free"] is False
+    assert result["data"]["conflicts"]["items"][0] == ["Meeting 8", "08:00", "08:30"]
+    assert len(result["data"]["conflicts"]["items"]) == 8 and result["data"]["conflicts"]["more"] == 4
+    stats = tool_output.get_stats()["check_availability"]
+    assert stats["calls"] == 1 and stats["tokens"] < stats["raw_tokens"]
+
+
+def test_errors_and_prose_share_the_schema():
+    assert json.loads(tool_output.compact("check_availability", {"error": "Calendar unavailable"})) == {"ok": False, "error": "Calendar unavailable"}
+    assert json.loads(tool_output.compact("create_event", "Error creating event: quota"))["ok"] is False
+    confirmation = json.loads(tool_output.compact("confirm_booking_details", llm.confirm_booking_details("2030-07-02", "14:00", "Review", 1)))
+    assert confirmation["ok"] is True
+    assert "**" not in confirmation["data"] and "📅" not in confirmation["data"]
+    assert "Title: Review" in confirmation["data"]
+    slots = json.loads(tool_output.compact("find_free_slots", [{"date": "2030-07-02", "time": f"{hour:02d}:00"} for hour in range(9, 17)]))
+    assert slots["data"] == {"items": [["2030-07-02", f"{hour:02d}:00"] for hour in range(9, 14)], "more": 3}
+
+
+def test_character_cap_keeps_valid_json():
+    text = tool_output.compact("update_event", "Updated " + "x" * 2000)
+    result = json.loads(text)
+    assert len(text) <= tool_output.LIMITS["update_event"][1] and result["truncated"] is True
+
+
+def test_agent_tools_return_compact_results():
+    saved = function.service, function.CACHE_ENABLED
+    function.service, function.CACHE_ENABLED = build_local_service(events), True
+    function.get_store(function.service).sync()
+    tools = {tool.name: tool for tool in llm.create_tools()}
+    args = {"date": "2030-07-02", "start_time": "08:00", "end_time": "20:00"}
+    try:
+        sync_result = tools["check_availability"].invoke(args)
+        async_result = asyncio.run(tools["check_availability"].ainvoke(args))
+    finally:
+        function.service, function.CACHE_ENABLED = saved
+        event_cache.clear_stores()
+
+    assert sync_result == async_result
+    result = json.loads(sync_result)
+    assert result["ok"] is True and result["data"]["conflicts"]["more"] == 4
+
+
+if __name__ == "__main__":
+    test_availability_is_compact_and_capped()
+    test_errors_and_prose_share_the_schema()
+    test_character_cap_keeps_valid_json()
+    test_agent_tools_return_compact_results()
+    print("Tool output tests passed")
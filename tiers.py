@@ -0,0 +1,181 @@
+"""Small model first, large model when the step needs it.
+
+Most agent steps are simple: pull the date and time out of a message and
+call a tool, or turn a tool result into a sentence. ModelCascade sends those
+to a small, fast model. A step goes to the large model when the turn looks
+like multi-step planning (several dates, recurring or bulk changes, or a
+loop that has already needed two tool rounds), or when the small model's
+reply fails validation: an unknown tool, arguments that don't match the
+tool's schema, or nothing at all. That is an escalation. Anything the small
+model already streamed is then retracted with a {"type": "reset"} event.
+"""
+import re
+import time
+import logging
+import threading
+from langchain_core.messages import HumanMessage
+from langgraph.config import get_stream_writer
+from pydantic import ValidationError
+import budget
+
+logger = logging.getLogger(__name__)
+
+SMALL, LARGE = "small", "large"
+
+# Words that usually mean more than one booking, or a change that needs planning
+PLANNING_PATTERN = re.compile(
+    r"\b(every|each|daily|weekly|weekdays|recurring|series|reschedule|move|shift|all (?:my|of|the)|both|swap)\b"
+)
+# Tool rounds in one turn after which the loop is planning, not a lookup
+PLANNING_ROUNDS = 2
+
+_stats = {tier: {"calls": 0, "errors": 0, "seconds": 0.0} for tier in (SMALL, LARGE)}
+_stats["escalations"] = 0
+_stats_lock = threading.Lock()
+
+
+def current_turn(messages):
+    """The latest user message and the AI messages after it"""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index], [message for message in messages[index + 1:] if message.type == "ai"]
+    return None, [message for message in messages if message.type == "ai"]
+
+
+def choose(messages):
+    """SMALL or LARGE for the next step of the conversation in messages"""
+    # Imported here: router imports llm, which builds the cascade
+    import router
+    question, replies = current_turn(messages)
+    text = question.content.lower() if question is not None and isinstance(question.content, str) else ""
+    rounds = sum(1 for message in replies if getattr(message, "tool_calls", None))
+    if rounds >= PLANNING_ROUNDS or PLANNING_PATTERN.search(text) or len(router.DATE_PATTERN.findall(text)) >= 2:
+        return LARGE
+    return SMALL
+
+
+def problems(response, tools):
+    """Why a reply can't be used as it is; empty when it is fine"""
+    found = [f"malformed tool call {call.get('name')}" for call in getattr(response, "invalid_tool_calls", None) or []]
+    for call in getattr(response, "tool_calls", None) or []:
+        tool = tools.get(call["name"])
+        if tool is None:
+            found.append(f"unknown tool {call['name']}")
+            continue
+        schema = tool.args_schema
+        if schema is not None and hasattr(schema, "model_validate"):
+            try:
+                schema.model_validate(call["args"])
+            except ValidationError as e:
+                found.append(f"{call['name']}: {e.error_count()} invalid arguments")
+    if not found and not getattr(response, "tool_calls", None) and not response.content:
+        found.append("empty reply")
+    return found
+
+
+class ModelCascade:
+    """Tool-bound small and large models behind one invoke()/ainvoke()"""
+
+    def __init__(self, small, large, tools):
+        self.small = small
+        self.large = large
+        self.tools = {tool.name: tool for tool in tools}
+        # What record_prompt_prefix hashes: the tools bound to both tiers
+        self.kwargs = getattr(large, "kwargs", {})
+
+    def invoke(self, messages):
+        tier, wasted = choose(messages), 0
+        if tier == SMALL:
+            started = time.perf_counter()
+            try:
+                response = self.small.invoke(messages)
+            except Exception as e:
+                small_failed(started, e)
+            else:
+                wasted = self.rejected(started, messages, response)
+                if not wasted:
+                    return tagged(response, SMALL)
+            retract()
+        started = time.perf_counter()
+        response = self.large.invoke(messages)
+        record(LARGE, time.perf_counter() - started)
+        return tagged(response, LARGE, escalated=tier == SMALL, wasted=wasted)
+
+    async def ainvoke(self, messages):
+        tier, wasted = choose(messages), 0
+        if tier == SMALL:
+            started = time.perf_counter()
+            try:
+                response = await self.small.ainvoke(messages)
+            except Exception as e:
+                small_failed(started, e)
+            else:
+                wasted = self.rejected(started, messages, response)
+                if not wasted:
+                    return tagged(response, SMALL)
+            retract()
+        started = time.perf_counter()
+        response = await self.large.ainvoke(messages)
+        record(LARGE, time.perf_counter() - started)
+        return tagged(response, LARGE, escalated=tier == SMALL, wasted=wasted)
+
+    def rejected(self, started, messages, response):
+        """Tokens spent on a small-model reply that can't be used, 0 if it can"""
+        record(SMALL, time.perf_counter() - started)
+        found = problems(response, self.tools)
+        if not found:
+            return 0
+        logger.info(f"Small model reply rejected, escalating: {'; '.join(found)}")
+        return budget.tokens_used(messages, response)
+
+
+def retract():
+    """Tell stream consumers to drop what the small model streamed this step"""
+    try:
+        write = get_stream_writer()
+    except RuntimeError:
+        # Called outside a graph run, so nothing was streamed
+        return
+    write({"type": "reset"})
+
+
+def small_failed(started, error):
+    record(SMALL, time.perf_counter() - started, failed=True)
+    logger.info(f"Small model failed, escalating: {error}")
+
+
+def tagged(response, tier, escalated=False, wasted=0):
+    """Mark which tier answered; budget.tokens_used adds the tokens of a rejected attempt"""
+    metadata = dict(response.response_metadata or {}, model_tier=tier)
+    if escalated:
+        metadata.update(escalated=True, escalation_tokens=wasted)
+        with _stats_lock:
+            _stats["escalations"] += 1
+    response.response_metadata = metadata
+    return response
+
+
+def record(tier, seconds, failed=False):
+    with _stats_lock:
+        stats = _stats[tier]
+        stats["calls"] += 1
+        stats["errors"] += int(failed)
+        stats["seconds"] += seconds
+
+
+def get_stats():
+    with _stats_lock:
+        stats = {tier: dict(_stats[tier]) for tier in (SMALL, LARGE)}
+        escalations = _stats["escalations"]
+    for tier_stats in stats.values():
+        tier_stats["mean_seconds"] = tier_stats["seconds"] / tier_stats["calls"] if tier_stats["calls"] else 0.0
+    stats["escalations"] = escalations
+    stats["escalation_rate"] = escalations / stats[SMALL]["calls"] if stats[SMALL]["calls"] else 0.0
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for tier in (SMALL, LARGE):
+            _stats[tier].update(calls=0, errors=0, seconds=0.0)
+        _stats["escalations"] = 0
@@ -0,0 +1,99 @@
+"""ToolNode that runs one step's tool calls concurrently, capped, and times them.
+
+When the model asks for several tools in one message (say check_availability
+for three dates), the calls run at the same time: sync tools on a thread pool
+that carries the request's context (so the bound user's calendar service is
+used), async tools as concurrent tasks. At most TOOL_CONCURRENCY run at once
+per step, and results keep the order of the tool calls.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Optional
+from langchain_core.runnables.config import get_config_list, get_executor_for_config
+from langgraph.prebuilt import ToolNode
+from langgraph.store.base import BaseStore
+
+logger = logging.getLogger(__name__)
+
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+
+_stats = {"steps": 0, "parallel_steps": 0, "step_seconds": 0.0, "tool_seconds": 0.0, "tools": {}}
+_stats_lock = threading.Lock()
+
+
+def record_tool(name, seconds, failed=False):
+    with _stats_lock:
+        stats = _stats["tools"].setdefault(name, {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0})
+        stats["calls"] += 1
+        stats["errors"] += int(failed)
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        _stats["tool_seconds"] += seconds
+    logger.debug(f"Tool {name} took {seconds * 1000:.1f}ms")
+
+
+def record_step(calls, seconds):
+    with _stats_lock:
+        _stats["steps"] += 1
+        _stats["parallel_steps"] += int(calls > 1)
+        _stats["step_seconds"] += seconds
+
+
+def get_stats():
+    """Per-tool timings; tool_seconds above step_seconds is time saved by running in parallel"""
+    with _stats_lock:
+        return dict(_stats, tools={name: dict(stats) for name, stats in _stats["tools"].items()})
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(steps=0, parallel_steps=0, step_seconds=0.0, tool_seconds=0.0, tools={})
+
+
+class ParallelToolNode(ToolNode):
+    def __init__(self, tools, *, max_concurrency=None, **kwargs):
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max_concurrency or TOOL_CONCURRENCY
+
+    # store is injected by langgraph, which matches on this annotation
+    def _func(self, input, config, *, store: Optional[BaseStore]):
+        started = time.perf_counter()
+        tool_calls, input_type = self._parse_input(input, store)
+        config_list = get_config_list(config, len(tool_calls))
+        # The executor copies the context, so bound services follow each call
+        with get_executor_for_config({**config, "max_concurrency": self.max_concurrency}) as executor:
+            outputs = list(executor.map(self._run_one, tool_calls, [input_type] * len(tool_calls), config_list))
+        record_step(len(tool_calls), time.perf_counter() - started)
+        return self._combine_tool_outputs(outputs, input_type)
+
+    async def _afunc(self, input, config, *, store: Optional[BaseStore]):
+        started = time.perf_counter()
+        tool_calls, input_type = self._parse_input(input, store)
+        limit = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(call):
+            async with limit:
+                return await self._arun_one(call, input_type, config)
+
+        outputs = await asyncio.gather(*(run(call) for call in tool_calls))
+        record_step(len(tool_calls), time.perf_counter() - started)
+        return self._combine_tool_outputs(outputs, input_type)
+
+    def _run_one(self, call, input_type, config):
+        started = time.perf_counter()
+        output = super()._run_one(call, input_type, config)
+        record_tool(call["name"], time.perf_counter() - started, _failed(output))
+        return output
+
+    async def _arun_one(self, call, input_type, config):
+        started = time.perf_counter()
+        output = await super()._arun_one(call, input_type, config)
+        record_tool(call["name"], time.perf_counter() - started, _failed(output))
+        return output
+
+
+def _failed(output):
+    return getattr(output, "status", None) == "error"
@@ -0,0 +1,129 @@
+"""Compact, schema-stable tool results for the model.
+
+Every tool in llm.create_tools returns through compact(): one line of
+minified JSON, {"ok": true, "data": ...} or {"ok": false, "error": "..."}.
+Lists are cut to the tool's item cap with a "more" count, prose is stripped
+of emoji and markdown, and the whole result is held to the tool's character
+cap. Output tokens are logged per call, next to what the raw result would
+have cost, so the saving per agent loop can be measured.
+"""
+import re
+import json
+import asyncio
+import logging
+import functools
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (max list items, max characters) per tool
+LIMITS = {
+    "check_availability": (8, 600),
+    "suggest_time_slots": (5, 300),
+    "find_free_slots": (5, 400),
+    "confirm_booking_details": (0, 500),
+    "create_event": (0, 300),
+    "create_events_batch": (20, 1200),
+    "update_event": (0, 300),
+    "delete_event": (10, 600),
+}
+DEFAULT_LIMITS = (10, 800)
+CHARS_PER_TOKEN = 4
+
+MARKUP = re.compile(r"[*_`#━]+|[\U0001F000-\U0001FAFF☀-➿️]")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def approx_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def plain(text):
+    """Prose without emoji, markdown or runs of whitespace"""
+    return " ".join(MARKUP.sub("", text).split())
+
+
+def cap_list(items, limit):
+    if len(items) <= limit:
+        return {"items": items}
+    return {"items": items[:limit], "more": len(items) - limit}
+
+
+def shape(name, result, limit):
+    """The data for one tool's result, or an error string"""
+    if isinstance(result, dict):
+        if result.get("error"):
+            return None, str(result["error"])
+        if "available" in result:
+            conflicts = [[c["name"], c["start"], c["end"]] for c in result.get("conflicts", [])]
+            return dict({"free": result["available"], "period": result.get("checked_period")},
+                        conflicts=cap_list(conflicts, limit)), None
+        return result, None
+    if isinstance(result, list):
+        items = [[slot["date"], slot["time"]] if isinstance(slot, dict) else slot for slot in result]
+        return cap_list(items, limit), None
+    text = plain(str(result))
+    if re.match(r"(error|an unexpected error|failed)\b", text, re.IGNORECASE):
+        return None, text
+    if name == "confirm_booking_details" or "\n" not in str(result):
+        return text, None
+    # Multi-line results (e.g. create_events_batch) keep one entry per line
+    return cap_list([plain(line) for line in str(result).splitlines() if line.strip()], limit), None
+
+
+def compact(name, result):
+    limit, max_chars = LIMITS.get(name, DEFAULT_LIMITS)
+    data, error = shape(name, result, limit)
+    payload = {"ok": True, "data": data} if error is None else {"ok": False, "error": error}
+    text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+    if len(text) > max_chars:
+        # Still valid JSON: fall back to the text of the result, cut to size
+        body = error if error is not None else data
+        if not isinstance(body, str):
+            body = json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str)
+        key = "data" if error is None else "error"
+        keep = max_chars
+        while True:
+            text = json.dumps({"ok": error is None, key: body[:keep] + "...", "truncated": True},
+                              ensure_ascii=False, separators=(",", ":"))
+            if len(text) <= max_chars or keep == 0:
+                break
+            keep = max(keep - (len(text) - max_chars), 0)
+    record(name, result, text)
+    return text
+
+
+def record(name, result, text):
+    raw = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str)
+    raw_tokens, tokens = approx_tokens(raw), approx_tokens(text)
+    with _stats_lock:
+        stats = _stats.setdefault(name, {"calls": 0, "raw_tokens": 0, "tokens": 0})
+        stats["calls"] += 1
+        stats["raw_tokens"] += raw_tokens
+        stats["tokens"] += tokens
+    logger.info(f"Tool {name} output: {tokens} tokens (raw {raw_tokens})")
+
+
+def compact_tool(name, func):
+    """Wrap a tool function (sync or async) so its result goes through compact()"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return compact(name, await func(*args, **kwargs))
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return compact(name, func(*args, **kwargs))
+    return wrapper
+
+
+def get_stats():
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()